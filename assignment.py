@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Assegnamento uno-a-uno a peso massimo su un grafo bipartito sparso.
+
+Algoritmo ungherese a cammini minimi aumentanti (Jonker-Volgenant) con
+Dijkstra sugli soli archi presenti: ogni riga ha la sua lista di archi
+(colonna, peso) e in più una colonna fittizia privata a peso 0, così una
+riga può restare non assegnata quando tutti i suoi candidati servono
+meglio ad altre righe. Il risultato massimizza la somma dei pesi.
+
+Complessità tipica O(n * k log n) con k archi per riga: la ricerca di
+ogni cammino si ferma alla prima colonna libera estratta dalla coda.
+"""
+import heapq
+from typing import List, Optional, Sequence, Tuple
+
+
+def max_weight_matching(edges: Sequence[Sequence[Tuple[int, float]]],
+                        n_cols: Optional[int] = None) -> List[Optional[int]]:
+    """
+    edges[r] = lista di (colonna, peso) della riga r (pesi > 0).
+    Restituisce per ogni riga la colonna assegnata o None.
+    A parità di peso totale il risultato è deterministico.
+    """
+    n_rows = len(edges)
+    if n_cols is None:
+        n_cols = 1 + max((c for row in edges for c, _ in row), default=-1)
+
+    # Costi = -peso; la colonna fittizia della riga r è n_cols + r (costo 0)
+    adj: List[List[Tuple[int, float]]] = []
+    for r, row in enumerate(edges):
+        best = {}
+        for c, w in row:
+            if w > 0 and (c not in best or -w < best[c]):
+                best[c] = -w
+        adj.append(sorted(best.items()) + [(n_cols + r, 0.0)])
+
+    # Potenziali iniziali: costi ridotti cost - u - v tutti >= 0
+    u = [min(cost for _, cost in row) for row in adj]
+    v = [0.0] * (n_cols + n_rows)
+    col_owner: List[int] = [-1] * (n_cols + n_rows)
+    row_col: List[int] = [-1] * n_rows
+
+    for root in range(n_rows):
+        dist = {}
+        pred = {}
+        final = {}
+        heap = []
+        for c, cost in adj[root]:
+            d = cost - u[root] - v[c]
+            if c not in dist or d < dist[c]:
+                dist[c] = d
+                pred[c] = root
+                heapq.heappush(heap, (d, c))
+
+        sink = -1
+        shortest = 0.0
+        while heap:
+            d, c = heapq.heappop(heap)
+            if c in final or d > dist[c]:
+                continue
+            final[c] = d
+            owner = col_owner[c]
+            if owner == -1:
+                sink, shortest = c, d
+                break
+            # La colonna è occupata: il cammino prosegue dalla sua riga (arco stretto)
+            for c2, cost in adj[owner]:
+                if c2 in final:
+                    continue
+                nd = d + cost - u[owner] - v[c2]
+                if c2 not in dist or nd < dist[c2]:
+                    dist[c2] = nd
+                    pred[c2] = owner
+                    heapq.heappush(heap, (nd, c2))
+
+        # Aggiornamento potenziali (mantiene costi ridotti >= 0 e archi assegnati stretti)
+        u[root] += shortest
+        for c, d in final.items():
+            if c == sink:
+                continue
+            delta = shortest - d
+            v[c] -= delta
+            u[col_owner[c]] += delta
+
+        # Inversione del cammino aumentante
+        c = sink
+        while True:
+            r = pred[c]
+            previous = row_col[r]
+            row_col[r] = c
+            col_owner[c] = r
+            if r == root:
+                break
+            c = previous
+
+    return [c if 0 <= c < n_cols else None for c in row_col]
@@ -0,0 +1 @@
+"""Benchmark del progetto (eseguibili con `python -m benchmarks.<nome>`)"""
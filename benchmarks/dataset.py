@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Generatore di dataset sintetici FPEDIA / FSTATS di qualunque dimensione.
+
+Produce tabelle con la stessa forma dei file grezzi della pipeline
+(`_giocatori.csv` per FPEDIA, il CSV dell'API per FSTATS con i nomi di
+colonna originali), quindi utilizzabili da `process_*_data` in poi.
+
+- nomi, squadre e ruoli vengono da `benchmarks.matching.genera_dataset`
+  (nomi reali ricombinati, formati diversi tra le fonti, verità nota)
+- le altre colonne sono righe reali dello stesso ruolo ricampionate per
+  intero, così le correlazioni (gol/xG, presenze/minuti, ...) restano
+  quelle vere; i valori decimali positivi ricevono un rumore moltiplicativo
+  per non avere migliaia di copie identiche
+
+Uso:
+    python -m benchmarks.dataset --n 5000 --output data/synthetic
+"""
+import argparse
+import os
+import re
+from typing import Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from benchmarks.matching import carica_giocatori_reali, genera_dataset
+
+FPEDIA_ANALYSIS = "data/output/fpedia_analysis.xlsx"
+FSTATS_ANALYSIS = "data/output/FSTATS_analysis.xlsx"
+
+# Colonne calcolate dalla pipeline: non esistono nei file grezzi
+COLONNE_CALCOLATE = ["Convenienza Potenziale", "Convenienza", "Prezzo Massimo Consigliato"]
+
+# Colonne che arrivano da genera_dataset (identità del giocatore)
+COLONNE_IDENTITA = ["Nome", "Squadra", "Ruolo", "fantacalcioPlayerId"]
+
+# Inverso della rinomina di data_processor.process_FSTATS_data
+RINOMINA_FSTATS_GREZZO = {
+    "Nome": "name",
+    "Squadra": "team",
+    "Ruolo": "fantacalcioPosition",
+    "presences": "appearances",
+    "avg": "pagella",
+    "fanta_avg": "fantacalcioRanking",
+}
+
+# Deviazione standard del rumore log-normale sui valori decimali
+RUMORE = 0.05
+
+
+def carica_reali(path: str) -> pd.DataFrame:
+    """File di analisi reale senza colonne calcolate né duplicati (Ruolo.1, ...)"""
+    df = pd.read_excel(path)
+    duplicate = [c for c in df.columns if re.fullmatch(r".+\.\d+", str(c)) and str(c).rsplit(".", 1)[0] in df.columns]
+    return df.drop(columns=COLONNE_CALCOLATE + duplicate, errors="ignore")
+
+
+def _ricampiona(identita: pd.DataFrame, reali: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Per ogni riga di `identita` prende una riga reale dello stesso ruolo
+    (tutte le colonne tranne quelle di identità) e aggiunge il rumore.
+    """
+    attributi = reali.drop(columns=[c for c in COLONNE_IDENTITA if c in reali.columns])
+    posizioni = np.empty(len(identita), dtype=np.int64)
+    per_ruolo = reali.groupby("Ruolo").indices
+    tutte = np.arange(len(reali))
+    for ruolo, righe in identita.groupby("Ruolo").indices.items():
+        candidate = per_ruolo.get(ruolo, tutte)
+        posizioni[righe] = candidate[rng.integers(0, len(candidate), len(righe))]
+    campione = attributi.take(posizioni).reset_index(drop=True)
+
+    for col in campione.columns:
+        if campione[col].dtype.kind != "f":
+            continue
+        valori = campione[col].to_numpy(copy=True)
+        positivi = valori > 0
+        valori[positivi] *= np.exp(rng.normal(0.0, RUMORE, positivi.sum()))
+        # Percentuali e indici restano nel range osservato
+        massimo = reali[col].max()
+        campione[col] = np.round(np.minimum(valori, massimo) if massimo > 0 else valori, 2)
+    return pd.concat([identita.reset_index(drop=True), campione], axis=1)
+
+
+def genera_fonti(n: int, seed: int = 42, reali_fpedia: Optional[pd.DataFrame] = None,
+                 reali_fstats: Optional[pd.DataFrame] = None
+                 ) -> Tuple[pd.DataFrame, pd.DataFrame, Set[Tuple[int, int]]]:
+    """
+    (df_fpedia, df_fstats, verità) grezzi con circa n giocatori per lato.
+    La verità è l'insieme delle coppie (posizione FPEDIA, posizione FSTATS).
+    """
+    if reali_fpedia is None:
+        reali_fpedia = carica_reali(FPEDIA_ANALYSIS)
+    if reali_fstats is None:
+        reali_fstats = carica_reali(FSTATS_ANALYSIS)
+    rng = np.random.default_rng(seed)
+    giocatori = carica_giocatori_reali(FSTATS_ANALYSIS)
+    id_fpedia, id_fstats, verita = genera_dataset(n, seed=seed, reali=giocatori)
+
+    df_fpedia = _ricampiona(id_fpedia, reali_fpedia, rng)
+    slug = (df_fpedia["Nome"].str.lower().str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+            + "-" + df_fpedia.index.astype(str))
+    df_fpedia.insert(0, "URL", config.BASEURL_FPEDIA + "/" + slug + "/")
+
+    df_fstats = _ricampiona(id_fstats, reali_fstats, rng)
+    df_fstats["fantacalcioTeamName"] = df_fstats["Squadra"].str.extract(r"'name': '([^']*)'", expand=False)
+    df_fstats = df_fstats.rename(columns=RINOMINA_FSTATS_GREZZO)
+    return df_fpedia, df_fstats, verita
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset sintetici FPEDIA / FSTATS")
+    parser.add_argument("--n", type=int, default=500, help="giocatori per fonte")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="data/synthetic", help="cartella di destinazione")
+    args = parser.parse_args()
+
+    df_fpedia, df_fstats, verita = genera_fonti(args.n, seed=args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    # Stessi nomi e separatori dei file grezzi in config.py
+    fpedia_path = os.path.join(args.output, os.path.basename(config.GIOCATORI_CSV))
+    fstats_path = os.path.join(args.output, os.path.basename(config.PLAYERS_CSV))
+    df_fpedia.to_csv(fpedia_path, index=False)
+    df_fstats.to_csv(fstats_path, index=False, sep=";")
+    print(f"FPEDIA: {len(df_fpedia)} giocatori -> {fpedia_path}")
+    print(f"FSTATS: {len(df_fstats)} giocatori -> {fstats_path}")
+    print(f"Coppie vere: {len(verita)}")
+
+
+if __name__ == "__main__":
+    main()
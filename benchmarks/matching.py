@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Benchmark sintetico del matching nomi di PerfectExcelMerger.
+
+Parte dai giocatori reali (nomi FSTATS "Nome Cognome" e squadre) e genera
+due liste con verità nota e le differenze che si vedono davvero tra le fonti:
+- lato FPEDIA cognome prima e maiuscolo, accenti tolti, soprannomi (solo
+  cognome o iniziale puntata), trasferimenti (squadra diversa)
+- lato FSTATS squadra come JSON, accenti, qualche giocatore assente in FPEDIA
+Oltre ai giocatori reali i nomi vengono ricombinati, quindi la dimensione
+va da 500 a 50k.
+
+Per ogni configurazione del matcher riporta tempo, coppie/s (prodotto
+cartesiano equivalente), confronti effettivi, picco di memoria,
+precision/recall e numero di match forzati (score < 0.1).
+
+Uso:
+    python -m benchmarks.matching --sizes 500 2000 --configs greedy optimal
+"""
+import argparse
+import json
+import logging
+import random
+import time
+import tracemalloc
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from perfect_excel_merger import PerfectExcelMerger
+
+FSTATS_ANALYSIS = "data/output/FSTATS_analysis.xlsx"
+
+RUOLI_FPEDIA = {"P": "POR", "D": "DIF", "C": "CEN", "A": "ATT"}
+
+# Probabilità delle perturbazioni lato FPEDIA / FSTATS
+PERTURBAZIONI = {
+    "cognome_prima": 0.9,
+    "accenti": 0.15,
+    "soprannome": 0.05,
+    "trasferimento": 0.04,
+    "solo_fpedia": 0.08,
+    "solo_fstats": 0.02,
+}
+
+# Configurazioni del merger confrontate (kwargs di PerfectExcelMerger)
+CONFIGURAZIONI = {
+    "greedy": {},
+    "greedy_scan": {"use_blocking": False},
+    "optimal": {"assignment": "optimal"},
+    "partition": {"partition_by_team": True},
+    "fuzzy_k10": {"fuzzy_k": 10},
+}
+
+# Oltre questa dimensione la scansione completa non viene eseguita
+LIMITE_SCANSIONE = 2000
+
+_ACCENTI = {"a": "à", "e": "è", "i": "ì", "o": "ò", "u": "ù", "c": "ć", "s": "š", "z": "ž"}
+
+
+def carica_giocatori_reali(path: str = FSTATS_ANALYSIS) -> pd.DataFrame:
+    """Nome, cognome, squadra e ruolo dei giocatori reali FSTATS"""
+    df = pd.read_excel(path, usecols=["Nome", "Ruolo", "fantacalcioTeamName"])
+    df = df.dropna(subset=["Nome", "fantacalcioTeamName"])
+    parti = df["Nome"].astype(str).str.split(" ", n=1)
+    return pd.DataFrame({
+        "nome": parti.str[0],
+        "cognome": parti.str[1].fillna(""),
+        "squadra": df["fantacalcioTeamName"].astype(str),
+        "ruolo": df["Ruolo"].astype(str),
+    }).reset_index(drop=True)
+
+
+def _accenta(testo: str, rng: random.Random) -> str:
+    posizioni = [i for i, c in enumerate(testo) if c in _ACCENTI]
+    if not posizioni:
+        return testo
+    i = rng.choice(posizioni)
+    return testo[:i] + _ACCENTI[testo[i]] + testo[i + 1:]
+
+
+def _entita(reali: pd.DataFrame, n: int, rng: random.Random) -> List[Tuple[str, str, str, str]]:
+    """n giocatori distinti: prima quelli reali, poi ricombinazioni nome/cognome"""
+    entita = list(reali[["nome", "cognome", "squadra", "ruolo"]].itertuples(index=False, name=None))
+    entita = entita[:n]
+    visti = {(nome, cognome) for nome, cognome, _, _ in entita}
+    nomi = reali["nome"].tolist()
+    cognomi = [c for c in reali["cognome"].tolist() if c]
+    squadre = sorted(reali["squadra"].unique())
+    ruoli = reali["ruolo"].tolist()
+    while len(entita) < n:
+        nome, cognome = rng.choice(nomi), rng.choice(cognomi)
+        if (nome, cognome) in visti:
+            # Doppi cognomi per allargare lo spazio dei nomi
+            cognome = f"{cognome} {rng.choice(cognomi)}"
+            if (nome, cognome) in visti:
+                continue
+        visti.add((nome, cognome))
+        entita.append((nome, cognome, rng.choice(squadre), rng.choice(ruoli)))
+    return entita
+
+
+def genera_dataset(n: int, seed: int = 42, reali: Optional[pd.DataFrame] = None,
+                   perturbazioni: Optional[Dict[str, float]] = None
+                   ) -> Tuple[pd.DataFrame, pd.DataFrame, Set[Tuple[int, int]]]:
+    """
+    Genera (df_fpedia, df_fstats, verità) con circa n giocatori per lato.
+    La verità è l'insieme delle coppie (posizione FPEDIA, posizione FSTATS).
+    """
+    rng = random.Random(seed)
+    p = dict(PERTURBAZIONI, **(perturbazioni or {}))
+    if reali is None:
+        reali = carica_giocatori_reali()
+    squadre = sorted(reali["squadra"].unique())
+    uuid_squadre = {s: str(uuid.UUID(int=rng.getrandbits(128))) for s in squadre}
+
+    # Le ultime entità esistono solo su FPEDIA (il file più grande)
+    entita = _entita(reali, n + int(n * p["solo_fpedia"]), rng)
+
+    fpedia_rows, fstats_rows, coppie = [], [], []
+    for player_id, (nome, cognome, squadra, ruolo) in enumerate(entita[:n]):
+        in_fpedia = rng.random() >= p["solo_fstats"]
+
+        # FSTATS: "Nome Cognome", accenti, squadra JSON
+        nome_fstats = f"{nome} {cognome}".strip()
+        if rng.random() < p["accenti"]:
+            nome_fstats = _accenta(nome_fstats, rng)
+        squadra_json = str({"uuid": uuid_squadre[squadra], "name": squadra})
+        fstats_rows.append({"Nome": nome_fstats, "Squadra": squadra_json, "Ruolo": ruolo,
+                            "fantacalcioPlayerId": 10000 + player_id})
+
+        if not in_fpedia:
+            continue
+
+        # FPEDIA: cognome prima in maiuscolo (senza accenti), soprannomi, trasferimenti
+        if rng.random() < p["soprannome"] and cognome:
+            nome_fpedia = cognome if rng.random() < 0.5 else f"{nome[0]}. {cognome}"
+        elif rng.random() < p["cognome_prima"]:
+            nome_fpedia = f"{cognome} {nome}".strip()
+        else:
+            nome_fpedia = f"{nome} {cognome}".strip()
+        squadra_fpedia = squadra
+        if rng.random() < p["trasferimento"]:
+            squadra_fpedia = rng.choice([s for s in squadre if s != squadra] or squadre)
+        fpedia_rows.append({"Nome": nome_fpedia.upper(), "Squadra": squadra_fpedia.capitalize(),
+                            "Ruolo": RUOLI_FPEDIA.get(ruolo, ruolo)})
+        coppie.append((len(fpedia_rows) - 1, len(fstats_rows) - 1))
+
+    for nome, cognome, squadra, ruolo in entita[n:]:
+        fpedia_rows.append({"Nome": f"{cognome} {nome}".upper(), "Squadra": squadra.capitalize(),
+                            "Ruolo": RUOLI_FPEDIA.get(ruolo, ruolo)})
+
+    # Ordine delle righe indipendente dalla verità
+    ordine_fpedia = list(range(len(fpedia_rows)))
+    ordine_fstats = list(range(len(fstats_rows)))
+    rng.shuffle(ordine_fpedia)
+    rng.shuffle(ordine_fstats)
+    pos_fpedia = {old: new for new, old in enumerate(ordine_fpedia)}
+    pos_fstats = {old: new for new, old in enumerate(ordine_fstats)}
+
+    df_fpedia = pd.DataFrame([fpedia_rows[i] for i in ordine_fpedia])
+    df_fstats = pd.DataFrame([fstats_rows[i] for i in ordine_fstats])
+    verita = {(pos_fpedia[f], pos_fstats[s]) for f, s in coppie}
+    return df_fpedia, df_fstats, verita
+
+
+def _esegui_matching(df_fpedia: pd.DataFrame, df_fstats: pd.DataFrame, kwargs: dict) -> PerfectExcelMerger:
+    merger = PerfectExcelMerger("", "", **kwargs)
+    merger.df_fpedia = df_fpedia
+    merger.df_fstats = df_fstats
+    merger.perform_perfect_matching()
+    return merger
+
+
+def esegui_configurazione(df_fpedia: pd.DataFrame, df_fstats: pd.DataFrame,
+                          verita: Set[Tuple[int, int]], kwargs: dict,
+                          misura_memoria: bool = True) -> dict:
+    """Metriche di una configurazione del merger su un dataset"""
+    start = time.perf_counter()
+    merger = _esegui_matching(df_fpedia, df_fstats, kwargs)
+    wall = time.perf_counter() - start
+
+    # Il picco di memoria si misura in una seconda esecuzione (tracemalloc rallenta)
+    picco_mb = None
+    if misura_memoria:
+        tracemalloc.start()
+        _esegui_matching(df_fpedia, df_fstats, kwargs)
+        picco_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    predette = {(m["fpedia_idx"], m["fstats_idx"]) for m in merger.matches}
+    corrette = len(predette & verita)
+    return {
+        "giocatori_fpedia": len(df_fpedia),
+        "giocatori_fstats": len(df_fstats),
+        "tempo_s": wall,
+        "coppie_al_s": len(df_fpedia) * len(df_fstats) / wall if wall > 0 else float("inf"),
+        "confronti": merger.comparisons,
+        "picco_memoria_mb": picco_mb,
+        "precision": corrette / len(predette) if predette else 0.0,
+        "recall": corrette / len(verita) if verita else 0.0,
+        "forzati": sum(1 for m in merger.matches if m["score"] < 0.1),
+    }
+
+
+def esegui_benchmark(sizes: List[int], configs: List[str], seed: int = 42,
+                     misura_memoria: bool = True) -> List[dict]:
+    """Tutte le configurazioni su tutte le dimensioni"""
+    reali = carica_giocatori_reali()
+    risultati = []
+    for n in sizes:
+        df_fpedia, df_fstats, verita = genera_dataset(n, seed=seed, reali=reali)
+        for nome in configs:
+            kwargs = CONFIGURAZIONI[nome]
+            if kwargs.get("use_blocking") is False and n > LIMITE_SCANSIONE:
+                print(f"  {nome:<12} n={n}: saltato (scansione completa oltre {LIMITE_SCANSIONE})")
+                continue
+            metriche = esegui_configurazione(df_fpedia, df_fstats, verita, kwargs, misura_memoria)
+            metriche.update({"config": nome, "n": n})
+            risultati.append(metriche)
+            _stampa_riga(metriche)
+    return risultati
+
+
+def _stampa_riga(m: dict):
+    memoria = f"{m['picco_memoria_mb']:7.1f} MB" if m["picco_memoria_mb"] is not None else "      -   "
+    print(f"  {m['config']:<12} n={m['n']:<6} {m['tempo_s']:8.2f} s  {m['coppie_al_s']:12.0f} coppie/s  "
+          f"{m['confronti']:10d} confronti  {memoria}  P={m['precision']:.3f} R={m['recall']:.3f}  "
+          f"forzati={m['forzati']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sintetico del matching nomi")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGURAZIONI), choices=list(CONFIGURAZIONI))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memoria", action="store_true", help="non misurare il picco di memoria")
+    parser.add_argument("--json", help="salva i risultati in un file JSON")
+    args = parser.parse_args()
+
+    # I log del merger (match forzati, fasi) coprirebbero la tabella
+    logging.getLogger("perfect_excel_merger").setLevel(logging.ERROR)
+
+    print("🎯 BENCHMARK MATCHING NOMI")
+    risultati = esegui_benchmark(args.sizes, args.configs, args.seed, not args.no_memoria)
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump(risultati, fp, indent=2)
+        print(f"Risultati salvati in {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark delle funzioni calde, con baseline JSON e soglia di regressione.
+
+Ogni caso prepara l'input fuori dalla misura (copie dei DataFrame, cache del
+matcher svuotate) e cronometra solo la chiamata, con la stessa procedura di
+timeit: numero di chiamate calibrato finché una ripetizione dura almeno
+DURATA_MINIMA, garbage collector disattivato, più ripetizioni. Il confronto
+usa il tempo minimo per chiamata, il meno sensibile al rumore.
+
+Dati: CSV grezzi sintetici di una stagione (benchmarks.dataset, seed fisso),
+nomi e squadre reali dei file di analisi, la pagina giocatore in
+benchmarks/fixtures (o una pagina vera con --html).
+
+Uso:
+    python -m benchmarks.micro run --save                 # scrive la baseline
+    python -m benchmarks.micro compare                    # esce con 1 se qualcosa rallenta
+    python -m benchmarks.micro compare --threshold 0.10 --cases ultra_clean_name
+    python -m benchmarks.micro compare --current altra_macchina.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+from loguru import logger
+
+import config
+import convenienza_calculator
+import data_processor
+import data_retriever
+from benchmarks.dataset import FPEDIA_ANALYSIS, FSTATS_ANALYSIS, genera_fonti
+from perfect_excel_merger import PerfectExcelMerger, PerfectPlayerMatcher
+
+CARTELLA = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(CARTELLA, "baselines", "micro.json")
+PAGINA_GIOCATORE = os.path.join(CARTELLA, "fixtures", "giocatore.html")
+
+# Rallentamento oltre il quale compare fallisce (0.25 = +25% sul minimo)
+SOGLIA_REGRESSIONE = 0.25
+
+# Durata minima di una ripetizione e limite alle chiamate per ripetizione
+DURATA_MINIMA = 0.2
+MAX_CHIAMATE = 10000
+
+# Bersagli di find_best_match_aggressive (scansione su tutti i candidati)
+BERSAGLI_MATCH = 10
+
+
+class Caso(NamedTuple):
+    """prepara() costruisce gli argomenti di una chiamata (non misurato)"""
+    prepara: Callable[[], tuple]
+    esegui: Callable[..., object]
+
+
+def _contesto(cartella: str, html_path: str) -> dict:
+    """Dati condivisi dai casi, costruiti una volta sola"""
+    fpedia, fstats, _ = genera_fonti(500, seed=42)
+    fpedia_proc = data_processor.process_fpedia_data(fpedia.copy())
+    fstats_proc = data_processor.process_FSTATS_data(fstats.copy())
+    fpedia_conv = convenienza_calculator.calcola_convenienza_fpedia(fpedia_proc.copy())
+    fstats_conv = convenienza_calculator.calcola_convenienza_FSTATS(fstats_proc.copy())
+
+    merger = PerfectExcelMerger(FPEDIA_ANALYSIS, FSTATS_ANALYSIS, output_dir=cartella)
+    merger.load_data()
+    merger.perform_perfect_matching()
+
+    with open(html_path, "rb") as fp:
+        html = fp.read()
+    return {
+        "fpedia": fpedia, "fstats": fstats,
+        "fpedia_proc": fpedia_proc, "fstats_proc": fstats_proc,
+        "fpedia_conv": fpedia_conv, "fstats_conv": fstats_conv,
+        "merger": merger, "html": html,
+        "nomi": merger.df_fpedia["Nome"].astype(str).tolist() + merger.df_fstats["Nome"].astype(str).tolist(),
+        "candidati": list(zip(merger.df_fstats["Nome"].astype(str), merger.df_fstats["Squadra"].astype(str))),
+        "bersagli": list(zip(merger.df_fpedia["Nome"].astype(str), merger.df_fpedia["Squadra"].astype(str)))[:BERSAGLI_MATCH],
+    }
+
+
+def _per_ruolo(df: pd.DataFrame) -> tuple:
+    return ([(df[df["Ruolo"] == ruolo].copy(), ruolo) for ruolo in df["Ruolo"].dropna().unique()],)
+
+
+def _matcher_freddo() -> tuple:
+    """Matcher nuovo: le cache di nomi e varianti partono vuote come in un'esecuzione reale"""
+    return (PerfectPlayerMatcher(),)
+
+
+def casi(ctx: dict) -> Dict[str, Caso]:
+    """Nome del caso -> Caso. Più giocatori per chiamata dove la funzione ne tratta uno."""
+    score_fpedia = convenienza_calculator.calcola_score_fpedia
+    score_fstats = convenienza_calculator.calcola_score_fstats
+    return {
+        # get_attributi_giocatore = fetch (rete) + parse: qui solo il parse sulla pagina salvata
+        "parse_attributi_giocatore": Caso(
+            lambda: ("https://www.fantacalciopedia.com/lautaro-martinez/", ctx["html"]),
+            data_retriever.parse_attributi_giocatore),
+        "process_fpedia_data": Caso(
+            lambda: (ctx["fpedia"].copy(),), data_processor.process_fpedia_data),
+        "process_FSTATS_data": Caso(
+            lambda: (ctx["fstats"].copy(),), data_processor.process_FSTATS_data),
+        "calcola_convenienza_fpedia": Caso(
+            lambda: (ctx["fpedia_proc"].copy(),), convenienza_calculator.calcola_convenienza_fpedia),
+        "calcola_convenienza_FSTATS": Caso(
+            lambda: (ctx["fstats_proc"].copy(),), convenienza_calculator.calcola_convenienza_FSTATS),
+        "calcola_score_fpedia": Caso(
+            lambda: _per_ruolo(ctx["fpedia_conv"]),
+            lambda gruppi: [score_fpedia(df, ruolo) for df, ruolo in gruppi]),
+        "calcola_score_fstats": Caso(
+            lambda: _per_ruolo(ctx["fstats_conv"]),
+            lambda gruppi: [score_fstats(df, ruolo) for df, ruolo in gruppi]),
+        "calcola_prezzo_massimo_consigliato[fpedia]": Caso(
+            lambda: (ctx["fpedia_conv"].copy(), config.REGOLE_SCORE_FPEDIA),
+            convenienza_calculator.calcola_prezzo_massimo_consigliato),
+        "calcola_prezzo_massimo_consigliato[fstats]": Caso(
+            lambda: (ctx["fstats_conv"].copy(), config.REGOLE_SCORE_FSTATS),
+            convenienza_calculator.calcola_prezzo_massimo_consigliato),
+        "ultra_clean_name": Caso(
+            _matcher_freddo, lambda m: [m.ultra_clean_name(nome) for nome in ctx["nomi"]]),
+        "get_ultra_variants": Caso(
+            _matcher_freddo, lambda m: [m.get_ultra_variants(nome) for nome in ctx["nomi"]]),
+        "find_best_match_aggressive": Caso(
+            _matcher_freddo,
+            lambda m: [m.find_best_match_aggressive(nome, squadra, ctx["candidati"])
+                       for nome, squadra in ctx["bersagli"]]),
+        "create_perfect_excel": Caso(
+            lambda: ("micro_benchmark.xlsx",), lambda nome: ctx["merger"].create_perfect_excel(nome)),
+    }
+
+
+def _ripetizione(caso: Caso, numero: int) -> float:
+    """Secondi per `numero` chiamate, input preparati prima della misura"""
+    argomenti = [caso.prepara() for _ in range(numero)]
+    gc.collect()
+    gc_attivo = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for args in argomenti:
+            caso.esegui(*args)
+        return time.perf_counter() - start
+    finally:
+        if gc_attivo:
+            gc.enable()
+
+
+def misura(caso: Caso, ripetizioni: int = 5, durata_minima: float = DURATA_MINIMA) -> dict:
+    """Tempo per chiamata: calibrazione come timeit.autorange, poi ripetizioni"""
+    numero = 1
+    while True:
+        tempo = _ripetizione(caso, numero)
+        if tempo >= durata_minima or numero >= MAX_CHIAMATE:
+            break
+        numero = min(MAX_CHIAMATE, numero * (10 if tempo < durata_minima / 10 else 2))
+    tempi = [tempo / numero] + [_ripetizione(caso, numero) / numero for _ in range(ripetizioni - 1)]
+    return {"min_s": min(tempi), "mediana_s": statistics.median(tempi),
+            "chiamate": numero, "ripetizioni": len(tempi)}
+
+
+def ambiente() -> dict:
+    """Dove è stata misurata la baseline (i tempi valgono solo sulla stessa macchina)"""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "piattaforma": platform.platform(),
+        "processore": platform.processor() or platform.machine(),
+        "cpu": os.cpu_count(),
+    }
+
+
+def esegui_suite(nomi: Optional[List[str]] = None, ripetizioni: int = 5,
+                 html_path: str = PAGINA_GIOCATORE) -> dict:
+    """Misura i casi richiesti (tutti con nomi=None)"""
+    with tempfile.TemporaryDirectory() as cartella:
+        ctx = _contesto(cartella, html_path)
+        tutti = casi(ctx)
+        sconosciuti = [n for n in nomi or [] if n not in tutti]
+        if sconosciuti:
+            raise ValueError(f"Casi sconosciuti: {sconosciuti} (disponibili: {list(tutti)})")
+        risultati = {}
+        for nome in nomi or tutti:
+            risultati[nome] = misura(tutti[nome], ripetizioni)
+            r = risultati[nome]
+            print(f"  {nome:<44} {_formatta(r['min_s']):>10}  mediana {_formatta(r['mediana_s']):>10}  "
+                  f"({r['chiamate']} x {r['ripetizioni']})")
+    return {"generato": datetime.now().isoformat(timespec="seconds"), "ambiente": ambiente(), "casi": risultati}
+
+
+def confronta(baseline: dict, corrente: dict, soglia: float = SOGLIA_REGRESSIONE) -> List[dict]:
+    """Rapporto corrente/baseline per i casi presenti in entrambi"""
+    righe = []
+    for nome, base in baseline["casi"].items():
+        attuale = corrente["casi"].get(nome)
+        if attuale is None:
+            continue
+        rapporto = attuale["min_s"] / base["min_s"] if base["min_s"] > 0 else float("inf")
+        stato = "REGRESSIONE" if rapporto > 1 + soglia else ("più veloce" if rapporto < 1 - soglia else "ok")
+        righe.append({"caso": nome, "baseline_s": base["min_s"], "corrente_s": attuale["min_s"],
+                      "rapporto": rapporto, "stato": stato})
+    return righe
+
+
+def _formatta(secondi: float) -> str:
+    for unita, fattore in (("s", 1), ("ms", 1e3), ("µs", 1e6)):
+        if secondi * fattore >= 1:
+            return f"{secondi * fattore:.2f} {unita}"
+    return f"{secondi * 1e9:.0f} ns"
+
+
+def _leggi(path: str) -> dict:
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _scrivi(path: str, dati: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(dati, fp, indent=2, ensure_ascii=False)
+    print(f"Risultati salvati in {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark delle funzioni calde")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+
+    run = comandi.add_parser("run", help="misura i casi")
+    run.add_argument("--save", nargs="?", const=BASELINE, help=f"salva come baseline (default {BASELINE})")
+
+    compare = comandi.add_parser("compare", help="confronta con la baseline, exit 1 se qualcosa rallenta")
+    compare.add_argument("--baseline", default=BASELINE)
+    compare.add_argument("--current", help="risultati già salvati invece di una nuova misura")
+    compare.add_argument("--threshold", type=float, default=SOGLIA_REGRESSIONE,
+                         help="rallentamento tollerato (0.25 = +25%%)")
+    compare.add_argument("--json", help="salva anche i risultati correnti")
+
+    for sub in (run, compare):
+        sub.add_argument("--cases", nargs="+", help="solo questi casi")
+        sub.add_argument("--ripetizioni", type=int, default=5)
+        sub.add_argument("--html", default=PAGINA_GIOCATORE, help="pagina giocatore FPEDIA salvata")
+    args = parser.parse_args()
+
+    # I log delle funzioni misurate coprirebbero i risultati (e pesano sui tempi)
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    logging.getLogger("perfect_excel_merger").setLevel(logging.ERROR)
+
+    if args.comando == "run":
+        print("⏱️  MICRO-BENCHMARK")
+        risultati = esegui_suite(args.cases, args.ripetizioni, args.html)
+        if args.save:
+            _scrivi(args.save, risultati)
+        return
+
+    if not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} non trovata: crearla con `run --save`")
+    baseline = _leggi(args.baseline)
+    if args.current:
+        corrente = _leggi(args.current)
+    else:
+        print("⏱️  MICRO-BENCHMARK")
+        # Casi della baseline che esistono ancora (casi({}) serve solo per i nomi)
+        casi_baseline = [c for c in baseline["casi"] if c in casi({}) and (not args.cases or c in args.cases)]
+        corrente = esegui_suite(casi_baseline, args.ripetizioni, args.html)
+        if args.json:
+            _scrivi(args.json, corrente)
+    if baseline.get("ambiente") != corrente.get("ambiente"):
+        print("⚠️  Ambiente diverso dalla baseline: i tempi potrebbero non essere confrontabili")
+
+    righe = confronta(baseline, corrente, args.threshold)
+    print(f"\n{'caso':<44} {'baseline':>10} {'corrente':>10} {'rapporto':>9}")
+    for r in righe:
+        print(f"{r['caso']:<44} {_formatta(r['baseline_s']):>10} {_formatta(r['corrente_s']):>10} "
+              f"{r['rapporto']:>8.2f}x  {r['stato']}")
+    regressioni = [r["caso"] for r in righe if r["stato"] == "REGRESSIONE"]
+    if regressioni:
+        print(f"\n❌ {len(regressioni)} regressioni oltre +{args.threshold:.0%}: {', '.join(regressioni)}")
+        sys.exit(1)
+    print(f"\n✅ Nessuna regressione oltre +{args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Curve di scala degli stadi della pipeline su dataset sintetici.
+
+Genera con `benchmarks.dataset` fonti FPEDIA/FSTATS a 1×, 10×, 100× la
+dimensione di una stagione (~500 giocatori per fonte) ed esegue ogni stadio
+sulla stessa catena della pipeline:
+
+    fpedia.process -> fpedia.convenienza -> fpedia.prezzo
+    fstats.process -> fstats.convenienza -> fstats.prezzo
+    merger.matching -> merger.sheets (-> merger.excel con --excel)
+
+Per ogni stadio riporta tempo e picco di memoria a ogni scala e l'esponente
+empirico tra scale consecutive, log(t2/t1) / log(n2/n1): 1 è lineare, 2
+quadratico. Gli stadi sopra SOGLIA_SUPERLINEARE vengono segnalati.
+
+Uso:
+    python -m benchmarks.scaling --scale 1 10 100 --json scaling.json
+    python -m benchmarks.scaling --scale 1 10 --stages fpedia.convenienza fstats.prezzo
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+import config
+import convenienza_calculator
+import data_processor
+from benchmarks.dataset import carica_reali, genera_fonti, FPEDIA_ANALYSIS, FSTATS_ANALYSIS
+from exporter import _colonne_uniche
+from perfect_excel_merger import PerfectExcelMerger
+
+# Giocatori per fonte a scala 1× (una stagione di Serie A)
+BASE = 500
+
+# Esponente oltre il quale uno stadio è considerato super-lineare
+SOGLIA_SUPERLINEARE = 1.3
+
+
+def _merger(stato: dict) -> PerfectExcelMerger:
+    """Merger sui risultati delle due catene, come se riletti dai file di analisi"""
+    merger = PerfectExcelMerger("", "")
+    merger.df_fpedia = _colonne_uniche(stato["fpedia.prezzo"].reset_index(drop=True))
+    merger.df_fstats = _colonne_uniche(stato["fstats.prezzo"].reset_index(drop=True))
+    merger.df_fpedia_analysis = merger.df_fpedia.copy()
+    merger.df_fstats_analysis = merger.df_fstats.copy()
+    return merger
+
+
+def _matching(stato: dict) -> PerfectExcelMerger:
+    merger = _merger(stato)
+    merger.perform_perfect_matching()
+    return merger
+
+
+def _sheets(stato: dict) -> int:
+    """Costruisce tutti gli sheet finali in memoria (senza scrivere l'Excel)"""
+    righe = 0
+    for chunks in stato["merger.matching"].sheet_builders().values():
+        for chunk in chunks():
+            righe += len(chunk)
+    return righe
+
+
+def _excel(stato: dict) -> int:
+    """Scrive l'Excel finale in una cartella temporanea"""
+    with tempfile.TemporaryDirectory() as cartella:
+        merger = stato["merger.matching"]
+        merger.output_dir = cartella
+        merger.create_perfect_excel("scaling.xlsx")
+    return len(merger.matches)
+
+
+# Stadio -> funzione sullo stato (risultati degli stadi precedenti). Gli
+# stadi che modificano il DataFrame in ingresso ne ricevono una copia.
+STADI: Dict[str, Callable[[dict], object]] = {
+    "fpedia.process": lambda s: data_processor.process_fpedia_data(s["fpedia.grezzo"].copy()),
+    "fpedia.convenienza": lambda s: convenienza_calculator.calcola_convenienza_fpedia(s["fpedia.process"].copy()),
+    "fpedia.prezzo": lambda s: convenienza_calculator.calcola_prezzo_massimo_consigliato(
+        s["fpedia.convenienza"].copy(), regole=config.REGOLE_SCORE_FPEDIA),
+    "fstats.process": lambda s: data_processor.process_FSTATS_data(s["fstats.grezzo"].copy()),
+    "fstats.convenienza": lambda s: convenienza_calculator.calcola_convenienza_FSTATS(s["fstats.process"].copy()),
+    "fstats.prezzo": lambda s: convenienza_calculator.calcola_prezzo_massimo_consigliato(
+        s["fstats.convenienza"].copy(), regole=config.REGOLE_SCORE_FSTATS),
+    "merger.matching": _matching,
+    "merger.sheets": _sheets,
+    "merger.excel": _excel,
+}
+
+# Dipendenze: per misurare uno stadio servono i risultati di quelli prima
+DIPENDENZE = {
+    "fpedia.convenienza": ["fpedia.process"],
+    "fpedia.prezzo": ["fpedia.convenienza"],
+    "fstats.convenienza": ["fstats.process"],
+    "fstats.prezzo": ["fstats.convenienza"],
+    "merger.matching": ["fpedia.prezzo", "fstats.prezzo"],
+    "merger.sheets": ["merger.matching"],
+    "merger.excel": ["merger.matching"],
+}
+
+# merger.excel scrive un file vero: solo su richiesta
+STADI_DEFAULT = [nome for nome in STADI if nome != "merger.excel"]
+
+
+def _chiusura(stadi: List[str]) -> List[str]:
+    """Stadi richiesti più le loro dipendenze, in ordine di pipeline"""
+    necessari = set()
+    da_visitare = list(stadi)
+    while da_visitare:
+        nome = da_visitare.pop()
+        if nome not in necessari:
+            necessari.add(nome)
+            da_visitare.extend(DIPENDENZE.get(nome, []))
+    return [nome for nome in STADI if nome in necessari]
+
+
+def _righe(risultato) -> int:
+    """Righe prodotte: match del merger, righe degli sheet o della tabella"""
+    if isinstance(risultato, PerfectExcelMerger):
+        return len(risultato.matches)
+    if isinstance(risultato, int):
+        return risultato
+    try:
+        return len(risultato)
+    except TypeError:
+        return 0
+
+
+def esegui_scala(n: int, stadi: List[str], seed: int = 42, ripetizioni: int = 1,
+                 misura_memoria: bool = True, reali: Optional[tuple] = None) -> List[dict]:
+    """Tutti gli stadi richiesti su un dataset di n giocatori per fonte"""
+    reali_fpedia, reali_fstats = reali or (None, None)
+    df_fpedia, df_fstats, _ = genera_fonti(n, seed=seed, reali_fpedia=reali_fpedia, reali_fstats=reali_fstats)
+    stato = {"fpedia.grezzo": df_fpedia, "fstats.grezzo": df_fstats}
+    risultati = []
+    for nome in _chiusura(stadi):
+        funzione = STADI[nome]
+        tempi = []
+        for _ in range(max(ripetizioni, 1)):
+            start = time.perf_counter()
+            stato[nome] = funzione(stato)
+            tempi.append(time.perf_counter() - start)
+
+        # Il picco di memoria si misura in un'esecuzione a parte (tracemalloc rallenta)
+        picco_mb = None
+        if misura_memoria:
+            tracemalloc.start()
+            funzione(stato)
+            picco_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        if nome in stadi:
+            risultato = {"stadio": nome, "n": n, "righe": _righe(stato[nome]),
+                         "tempo_s": min(tempi), "picco_memoria_mb": picco_mb}
+            risultati.append(risultato)
+            _stampa_riga(risultato)
+    return risultati
+
+
+def esponenti(risultati: List[dict]) -> Dict[str, List[dict]]:
+    """Per ogni stadio l'esponente di scala tra dimensioni consecutive"""
+    per_stadio: Dict[str, List[dict]] = {}
+    for r in sorted(risultati, key=lambda r: r["n"]):
+        per_stadio.setdefault(r["stadio"], []).append(r)
+    curve = {}
+    for stadio, punti in per_stadio.items():
+        curve[stadio] = []
+        for a, b in zip(punti, punti[1:]):
+            if a["tempo_s"] <= 0 or b["tempo_s"] <= 0:
+                continue
+            esponente = math.log(b["tempo_s"] / a["tempo_s"]) / math.log(b["n"] / a["n"])
+            curve[stadio].append({"da": a["n"], "a": b["n"], "esponente": esponente,
+                                  "super_lineare": esponente > SOGLIA_SUPERLINEARE})
+    return curve
+
+
+def _stampa_riga(r: dict):
+    memoria = f"{r['picco_memoria_mb']:8.1f} MB" if r["picco_memoria_mb"] is not None else "       -   "
+    print(f"  {r['stadio']:<20} n={r['n']:<7} {r['righe']:>7} righe  {r['tempo_s']:9.3f} s  {memoria}")
+
+
+def stampa_tabella(risultati: List[dict], curve: Dict[str, List[dict]]):
+    scale = sorted({r["n"] for r in risultati})
+    tempi = {(r["stadio"], r["n"]): r for r in risultati}
+    print()
+    print(f"{'stadio':<20}" + "".join(f"{f'n={n}':>14}" for n in scale) + "  esponenti")
+    for stadio in dict.fromkeys(r["stadio"] for r in risultati):
+        celle = "".join(f"{tempi[stadio, n]['tempo_s']:>12.3f} s" if (stadio, n) in tempi else f"{'-':>14}"
+                        for n in scale)
+        pendenze = " ".join(f"{c['esponente']:.2f}{'⚠️' if c['super_lineare'] else ''}" for c in curve.get(stadio, []))
+        print(f"{stadio:<20}{celle}  {pendenze}")
+    segnalati = [s for s, c in curve.items() if any(p["super_lineare"] for p in c)]
+    if segnalati:
+        print(f"\nStadi super-lineari (esponente > {SOGLIA_SUPERLINEARE}): {', '.join(segnalati)}")
+
+
+def salva_grafico(risultati: List[dict], path: str):
+    """Grafico log-log tempo/righe per stadio (richiede matplotlib)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax_tempo, ax_memoria) = plt.subplots(1, 2, figsize=(12, 5))
+    for stadio in dict.fromkeys(r["stadio"] for r in risultati):
+        punti = sorted((r for r in risultati if r["stadio"] == stadio), key=lambda r: r["n"])
+        ax_tempo.loglog([p["n"] for p in punti], [p["tempo_s"] for p in punti], marker="o", label=stadio)
+        if all(p["picco_memoria_mb"] is not None for p in punti):
+            ax_memoria.loglog([p["n"] for p in punti], [p["picco_memoria_mb"] for p in punti], marker="o", label=stadio)
+    ax_tempo.set(xlabel="giocatori per fonte", ylabel="tempo (s)", title="Tempo per stadio")
+    ax_memoria.set(xlabel="giocatori per fonte", ylabel="picco memoria (MB)", title="Memoria per stadio")
+    ax_tempo.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"Grafico salvato in {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curve di scala degli stadi della pipeline")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100],
+                        help=f"moltiplicatori della dimensione base ({BASE} giocatori per fonte)")
+    parser.add_argument("--stages", nargs="+", default=STADI_DEFAULT, choices=list(STADI))
+    parser.add_argument("--excel", action="store_true", help="misura anche la scrittura dell'Excel finale")
+    parser.add_argument("--ripetizioni", type=int, default=1, help="esecuzioni per stadio (vale il tempo minimo)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memoria", action="store_true", help="non misurare il picco di memoria")
+    parser.add_argument("--json", help="salva i risultati in un file JSON")
+    parser.add_argument("--plot", help="salva un grafico log-log (PNG, richiede matplotlib)")
+    args = parser.parse_args()
+
+    stadi = list(args.stages) + (["merger.excel"] if args.excel and "merger.excel" not in args.stages else [])
+    if args.plot and importlib.util.find_spec("matplotlib") is None:
+        parser.error("--plot richiede matplotlib")
+
+    # I log di pipeline e merger coprirebbero la tabella
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    logging.getLogger("perfect_excel_merger").setLevel(logging.ERROR)
+
+    print("📈 BENCHMARK DI SCALA")
+    reali = (carica_reali(FPEDIA_ANALYSIS), carica_reali(FSTATS_ANALYSIS))
+    risultati = []
+    for scala in sorted(args.scale):
+        risultati.extend(esegui_scala(BASE * scala, stadi, args.seed, args.ripetizioni,
+                                      not args.no_memoria, reali))
+    curve = esponenti(risultati)
+    stampa_tabella(risultati, curve)
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump({"risultati": risultati, "esponenti": curve}, fp, indent=2)
+        print(f"Risultati salvati in {args.json}")
+    if args.plot:
+        salva_grafico(risultati, args.plot)
+
+
+if __name__ == "__main__":
+    main()
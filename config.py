@@ -14,6 +14,12 @@ GIOCATORI_URLS_FILE = os.path.join(DATA_DIR, "giocatori_urls.txt")
 GIOCATORI_CSV = os.path.join(DATA_DIR, "_giocatori.csv")
 PLAYERS_CSV = os.path.join(DATA_DIR, "_players.csv")
 CONVENIENZA_CSV = os.path.join(OUTPUT_DIR, "convenienza.csv")
+CROSSWALK_CSV = os.path.join(DATA_DIR, "crosswalk.csv")
+SNAPSHOT_FILE = os.path.join(OUTPUT_DIR, "snapshot.json")
+METRICS_JSON = os.path.join(OUTPUT_DIR, "metrics.json")
+METRICS_PROM = os.path.join(OUTPUT_DIR, "metrics.prom")
+MEMORY_PROFILE_JSON = os.path.join(OUTPUT_DIR, "memory_profile.json")
+STORICO_DIR = os.path.join(DATA_DIR, "storico")
 OUTPUT_EXCEL = os.path.join(OUTPUT_DIR, "fantacalcio_analysis.xlsx")
 
 # URLS
@@ -28,6 +34,22 @@ FSTATS_PLAYERS_URL = f"{BASEURL_FSTATS}/v1/zona/player/?page_size=1000&page=1&se
 # Scraping
 RUOLI = ["Portieri", "Difensori", "Centrocampisti", "Attaccanti"]
 MAX_WORKERS = 5
+# Pagine scaricate e in attesa di parsing (oltre questo limite i fetcher si fermano)
+SCRAPE_QUEUE_SIZE = 32
+# Processi per il parsing HTML delle pagine giocatore
+PARSE_WORKERS = os.cpu_count() or 1
+# Aggiornamento rapido prima della giornata: rilegge solo i campi di stato e
+# aggiorna _giocatori.csv sul posto, senza riscaricare tutto
+REFRESH_STATUS_ONLY = False
+STATUS_FIELDS = ["Infortunato", "Consigliato prossima giornata", "Trend", "Presenze campionato corrente"]
+# La pagina giocatore si scarica solo fino a questo marcatore (None = pagina intera)
+STATUS_END_MARKER = b'class="col_one_third'
+# Budget di tempo dello scraping FPEDIA in secondi (None = nessun limite). Con un budget
+# _giocatori.csv viene riscaricato anche se esiste, in ordine di priorità, e i giocatori
+# non raggiunti in tempo mantengono i valori precedenti
+SCRAPE_TIME_BUDGET = None
+# Priorità per ruolo dei giocatori senza prezzo nell'ultima analisi (più alto = prima)
+SCRAPE_PRIORITA_RUOLI = {"ATT": 4, "CEN": 3, "DIF": 2, "POR": 1}
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
@@ -38,6 +60,50 @@ PESO_PUNTEGGIO = 0.4
 PREZZO_MINIMO = 1
 PREZZO_MASSIMO = 500
 CONVENIENZA_MINIMA = 0.5
+
+# Ruleset alternativi per lo score del prezzo massimo (path JSON/TOML, None = default)
+REGOLE_SCORE_FPEDIA = None
+REGOLE_SCORE_FSTATS = None
+
+# Merger: "greedy" (ordine di riga) o "optimal" (assegnamento globale sui top-k candidati)
+MERGER_ASSIGNMENT = "greedy"
+MERGER_TOP_K = 5
+# Matching per squadra su un pool di processi, poi passata globale sui rimasti
+MERGER_PARTITION_BY_TEAM = False
+MERGER_WORKERS = os.cpu_count() or 1
+# Candidati fuzzy fuori blocco dall'indice trigrammi/fonetico (None = scansione esatta)
+MERGER_FUZZY_K = None
+# Esegue le catene FPEDIA e FSTATS (scraping -> calcoli -> export) in processi paralleli
+PIPELINE_CONCURRENT = True
+# Profilo di memoria per stadio (python memprofile.py): catene in sequenza, export sincroni
+PROFILE_MEMORY = False
+MEMORY_PROFILE_TOP = 10
+# Formati di export delle analisi: "xlsx", "csv", "parquet", "jsonl" (scritti in parallelo)
+OUTPUT_FORMATS = ["xlsx"]
+EXPORT_WORKERS = None
+# Storico giornaliero (storico.py): base + delta delle colonne che cambiano durante la stagione
+STORICO_ATTIVO = True
+STORICO_COLONNE_FPEDIA = ["Nome", "Squadra", "Infortunato", "Trend", "Punteggio", "Presenze campionato corrente",
+                          "Consigliato prossima giornata", "Convenienza", "Convenienza Potenziale",
+                          "Prezzo Massimo Consigliato"]
+STORICO_COLONNE_FSTATS = ["Nome", "injured", "banned", "presences", "fanta_avg", "fantacalcioFantaindex",
+                          "Convenienza", "Convenienza Potenziale", "Prezzo Massimo Consigliato"]
+# Ricalcolo incrementale (incremental_update.py): riparte dallo stato dell'esecuzione
+# precedente e ricalcola convenienza e prezzi solo per le righe cambiate
+INCREMENTAL_UPDATE = False
+INCREMENTAL_STATE_DIR = os.path.join(OUTPUT_DIR, "incrementale")
+# Confronta ogni ricalcolo incrementale con la pipeline completa (lento, per verifica)
+INCREMENTAL_VERIFY = False
+# Server locale delle classifiche (ranking_server.py)
+RANKING_SERVER_HOST = "127.0.0.1"
+RANKING_SERVER_PORT = 8765
+# Giocatori simili (similarita.py): presenze minime per entrare nell'indice,
+# partizioni k-means per ruolo (None = ricerca esatta, "auto" = √n) e partizioni visitate
+SIMILARITA_MIN_PRESENZE = 5
+SIMILARITA_PARTIZIONI = None
+SIMILARITA_SONDE = 3
+# Output del merger: "xlsx" (workbook scritto in streaming) o "csv"/"parquet" (un file per sheet)
+MERGER_OUTPUT_FORMAT = "xlsx"
 BUDGET_PORTA=30
 BUDGET_DIFESA=75
 BUDGET_CENTROCAMPO=110
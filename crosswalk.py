@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Crosswalk persistente FPEDIA <-> FSTATS.
+
+Tabella CSV con una riga per coppia già abbinata, indicizzata da id stabili:
+lo slug dell'URL FPEDIA del giocatore e il fantacalcioPlayerId di FSTATS.
+Le coppie note vengono risolte con un lookup O(1) e solo i giocatori nuovi
+(o il cui partner è sparito) passano dal matcher fuzzy.
+
+Colonne: fpedia_slug, fstats_id, score, phase, source, updated.
+source = "auto" per i match accettati dal merger, "manual" per le correzioni
+a mano: una riga manuale vince sempre e non viene mai sovrascritta.
+"""
+import os
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["fpedia_slug", "fstats_id", "score", "phase", "source", "updated"]
+
+
+def fpedia_slug(url) -> str:
+    """Slug del giocatore dall'URL FPEDIA (ultimo segmento del path)"""
+    if not isinstance(url, str) or not url.strip():
+        return ""
+    path = urlparse(url.strip()).path
+    segments = [segment for segment in path.split("/") if segment]
+    return segments[-1].lower() if segments else ""
+
+
+def fstats_key(player_id) -> str:
+    """fantacalcioPlayerId come stringa (4730, 4730.0 e '4730' coincidono)"""
+    if player_id is None or (not isinstance(player_id, str) and pd.isna(player_id)):
+        return ""
+    if isinstance(player_id, float) and player_id.is_integer():
+        player_id = int(player_id)
+    return str(player_id).strip()
+
+
+class Crosswalk:
+    """Tabella di corrispondenza uno-a-uno slug FPEDIA <-> id FSTATS"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # slug -> riga e id -> slug, mantenuti uno-a-uno
+        self.by_slug: Dict[str, dict] = {}
+        self.by_id: Dict[str, str] = {}
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.by_slug)
+
+    def load(self):
+        """Carica la tabella dal CSV (se esiste)"""
+        self.by_slug.clear()
+        self.by_id.clear()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+
+        df = pd.read_csv(self.path, dtype={"fpedia_slug": str, "fstats_id": str})
+        # Prima le righe automatiche, poi quelle manuali che le sostituiscono
+        df["source"] = df["source"].fillna("auto")
+        df = df.sort_values("source", key=lambda s: s.eq("manual"), kind="mergesort")
+        for row in df.to_dict("records"):
+            self._put(
+                fpedia_slug(row["fpedia_slug"]),
+                fstats_key(row["fstats_id"]),
+                row.get("score"), row.get("phase"), row["source"], row.get("updated"),
+            )
+        logger.info(f"Crosswalk caricato: {len(self)} coppie ({self.n_manual} manuali)")
+
+    def save(self):
+        """Scrive la tabella su CSV (ordinata per slug, quindi diff leggibili)"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        rows = [self.by_slug[slug] for slug in sorted(self.by_slug)]
+        pd.DataFrame(rows, columns=COLUMNS).to_csv(self.path, index=False)
+
+    @property
+    def n_manual(self) -> int:
+        return sum(1 for row in self.by_slug.values() if row["source"] == "manual")
+
+    def _put(self, slug: str, player_id: str, score, phase, source: str, updated=None):
+        if not slug or not player_id:
+            return
+        # Uno-a-uno: rimuove le coppie che usano già lo slug o l'id
+        old = self.by_slug.pop(slug, None)
+        if old is not None:
+            self.by_id.pop(old["fstats_id"], None)
+        old_slug = self.by_id.pop(player_id, None)
+        if old_slug is not None:
+            self.by_slug.pop(old_slug, None)
+        self.by_slug[slug] = {
+            "fpedia_slug": slug,
+            "fstats_id": player_id,
+            "score": score,
+            "phase": phase,
+            "source": source,
+            "updated": updated or date.today().isoformat(),
+        }
+        self.by_id[player_id] = slug
+
+    def _is_manual(self, slug: str, player_id: str) -> bool:
+        for row in (self.by_slug.get(slug), self.by_slug.get(self.by_id.get(player_id, ""))):
+            if row is not None and row["source"] == "manual":
+                return True
+        return False
+
+    def record(self, slug: str, player_id: str, score: float, phase: str) -> bool:
+        """
+        Registra un match accettato dal merger. Ignorato se tocca una coppia
+        manuale; restituisce True se la tabella è cambiata.
+        """
+        if not slug or not player_id or self._is_manual(slug, player_id):
+            return False
+        current = self.by_slug.get(slug)
+        if current is not None and current["fstats_id"] == player_id:
+            return False
+        self._put(slug, player_id, score, phase, "auto")
+        return True
+
+    def remove(self, slug: str) -> bool:
+        """Toglie una coppia automatica (le manuali restano); True se rimossa"""
+        row = self.by_slug.get(slug)
+        if row is None or row["source"] == "manual":
+            return False
+        del self.by_slug[slug]
+        self.by_id.pop(row["fstats_id"], None)
+        return True
+
+    def set_override(self, slug: str, player_id: str):
+        """Correzione manuale: vince sull'algoritmo e sulle coppie automatiche"""
+        self._put(slug, player_id, 1.0, "MANUAL", "manual")
+
+    def pairs(self) -> List[Tuple[str, str, dict]]:
+        """Coppie (slug, id, riga), prima le manuali"""
+        rows = sorted(self.by_slug.values(), key=lambda row: row["source"] != "manual")
+        return [(row["fpedia_slug"], row["fstats_id"], row) for row in rows]
+
+    def partner_of_slug(self, slug: str) -> Optional[str]:
+        row = self.by_slug.get(slug)
+        return row["fstats_id"] if row is not None else None
+
+    def partner_of_id(self, player_id: str) -> Optional[str]:
+        return self.by_id.get(player_id)
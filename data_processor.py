@@ -2,16 +2,15 @@
 import pandas as pd
 from loguru import logger
 import config
+import metrics
 import os
 
 
-def load_dataframes() -> tuple[pd.DataFrame, pd.DataFrame]:
+@metrics.cronometra("data_processor.load_fpedia")
+def load_fpedia_dataframe() -> pd.DataFrame:
     """
-    Loads the two CSV files into pandas DataFrames, handling missing or empty files.
+    Loads the FPEDIA CSV into a DataFrame (empty if the file is missing or empty).
     """
-    df_fpedia = pd.DataFrame()
-    df_FSTATS = pd.DataFrame()
-
     if (
         os.path.exists(config.GIOCATORI_CSV)
         and os.path.getsize(config.GIOCATORI_CSV) > 0
@@ -19,23 +18,39 @@ def load_dataframes() -> tuple[pd.DataFrame, pd.DataFrame]:
         try:
             df_fpedia = pd.read_csv(config.GIOCATORI_CSV)
             logger.debug("FPEDIA DataFrame loaded successfully.")
+            return df_fpedia
         except Exception as e:
             logger.error(f"Error loading {config.GIOCATORI_CSV}: {e}")
     else:
         logger.warning(f"{config.GIOCATORI_CSV} not found or is empty.")
+    return pd.DataFrame()
 
+
+@metrics.cronometra("data_processor.load_fstats")
+def load_FSTATS_dataframe() -> pd.DataFrame:
+    """
+    Loads the FSTATS CSV into a DataFrame (empty if the file is missing or empty).
+    """
     if os.path.exists(config.PLAYERS_CSV) and os.path.getsize(config.PLAYERS_CSV) > 0:
         try:
             df_FSTATS = pd.read_csv(config.PLAYERS_CSV, sep=";")
             logger.debug("FSTATS DataFrame loaded successfully.")
+            return df_FSTATS
         except Exception as e:
             logger.error(f"Error loading {config.PLAYERS_CSV}: {e}")
     else:
         logger.warning(f"{config.PLAYERS_CSV} not found or is empty.")
+    return pd.DataFrame()
 
-    return df_fpedia, df_FSTATS
+
+def load_dataframes() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Loads the two CSV files into pandas DataFrames, handling missing or empty files.
+    """
+    return load_fpedia_dataframe(), load_FSTATS_dataframe()
 
 
+@metrics.cronometra("data_processor.coerce_fpedia")
 def process_fpedia_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Processes and cleans the DataFrame from FPEDIA.
@@ -75,6 +90,7 @@ def process_fpedia_data(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@metrics.cronometra("data_processor.coerce_fstats")
 def process_FSTATS_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Processes and cleans the DataFrame from FSTATS.
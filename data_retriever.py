@@ -1,5 +1,8 @@
 # data_retriever.py
+import json
 import os
+import queue
+import threading
 import time
 from random import randint
 import requests
@@ -11,6 +14,8 @@ import pandas as pd
 import concurrent.futures
 
 import config
+import metrics
+from exporter import leggi_tabella
 
 load_dotenv()
 
@@ -24,6 +29,7 @@ def get_giocatori_urls() -> list:
             url = config.FPEDIA_URL + ruolo.lower() + "/"
             try:
                 response = requests.get(url, headers=config.HEADERS)
+                metrics.registra_http(response, "fpedia")
                 response.raise_for_status()
                 soup = BeautifulSoup(response.content, "html.parser")
                 for giocatore in soup.find_all("article"):
@@ -51,13 +57,83 @@ def get_giocatori_urls() -> list:
     return [url.strip() for url in giocatori_urls]
 
 
+def fetch_pagina_giocatore(url: str, fino_a: bytes = None, scadenza: float = None) -> bytes:
+    """
+    Downloads a single player's page on FPEDIA (I/O only, no parsing).
+    With `fino_a` the body is streamed and the download stops right after
+    the first occurrence of that marker (the rest of the page is not read).
+    With `scadenza` (a time.perf_counter() deadline) the politeness delay
+    is shortened to the time left, never below its 1s minimum; with less
+    than that left returns None without any request.
+    """
+    logger.debug(f"Fetching player page from URL: {url}")
+    attesa = randint(1000, 8000) / 1000
+    if scadenza is not None:
+        restante = scadenza - time.perf_counter()
+        if restante < 1.0:
+            return None
+        attesa = min(attesa, restante)
+    time.sleep(attesa)
+    if fino_a is None:
+        html = requests.get(url.strip())
+        metrics.registra_http(html, "fpedia")
+        return html.content
+
+    content = b""
+    with requests.get(url.strip(), stream=True) as html:
+        if not html.ok:
+            metrics.registra_http(html, "fpedia", ricevuti=0)
+            html.raise_for_status()
+        for chunk in html.iter_content(chunk_size=8192):
+            # The marker may straddle two chunks
+            inizio = max(len(content) - len(fino_a), 0)
+            content += chunk
+            if content.find(fino_a, inizio) >= 0:
+                break
+        metrics.registra_http(html, "fpedia", ricevuti=len(content))
+    return content
+
+
 def get_attributi_giocatore(url: str) -> dict:
     """Scrapes a single player's page on FPEDIA for their attributes."""
-    logger.debug(f"Scraping attributes for player from URL: {url}")
-    time.sleep(randint(1000, 8000) / 1000)
+    return parse_attributi_giocatore(url, fetch_pagina_giocatore(url))
+
+
+def _consigliato(soup) -> bool:
+    try:
+        return "Consigliato per la giornata" in soup.select_one("img.inf_calc").get("title")
+    except:
+        return False
+
+
+def _infortunato(soup) -> bool:
+    try:
+        return "Infortunato" in soup.select_one("img.inf_calc").get("title")
+    except:
+        return False
+
+
+def _trend(soup) -> str:
+    selettore = "	div.col_one_fourth:nth-of-type(n+2) div"
+    try:
+        trend = soup.select(selettore)[0].find("i").get("class")[1]
+        return "UP" if trend == "icon-arrow-up" else "DOWN"
+    except:
+        return "STABLE"
+
+
+def _presenze(soup) -> str:
+    selettore = "div.col_one_fourth:nth-of-type(2) span.rouge"
+    return soup.select_one(selettore).text
+
+
+def parse_attributi_giocatore(url: str, content: bytes) -> dict:
+    """Parses a player's page (already downloaded) into their attributes."""
     attributi = dict()
-    html = requests.get(url.strip())
-    soup = BeautifulSoup(html.content, "html.parser")
+    soup = BeautifulSoup(content, "html.parser")
+
+    # Id stabile del giocatore (lo slug dell'URL è usato dal crosswalk del merger)
+    attributi["URL"] = url.strip()
 
     attributi["Nome"] = soup.select_one("h1").get_text().strip()
 
@@ -106,16 +182,7 @@ def get_attributi_giocatore(url: str) -> dict:
     investimento = soup.select(selettore)[3]
     attributi["Resistenza infortuni"] = investimento.text.replace("%", "")
 
-    selettore = "img.inf_calc"
-    try:
-        consigliato = soup.select_one(selettore).get("title")
-        if "Consigliato per la giornata" in consigliato:
-            attributi["Consigliato prossima giornata"] = True
-        else:
-            attributi["Consigliato prossima giornata"] = False
-
-    except:
-        attributi["Consigliato prossima giornata"] = False
+    attributi["Consigliato prossima giornata"] = _consigliato(soup)
 
     selettore = "span.new_calc"
     nuovo = soup.select_one(selettore)
@@ -124,74 +191,418 @@ def get_attributi_giocatore(url: str) -> dict:
     else:
         attributi["Nuovo acquisto"] = False
 
-    selettore = "img.inf_calc"
-    try:
-        infortunato = soup.select_one(selettore).get("title")
-        if "Infortunato" in infortunato:
-            attributi["Infortunato"] = True
-        else:
-            attributi["Infortunato"] = False
-
-    except:
-        attributi["Infortunato"] = False
+    attributi["Infortunato"] = _infortunato(soup)
 
     selettore = "#content > div > div.section.nobg.nomargin > div > div > div:nth-child(2) > div.col_three_fifth > div.promo.promo-border.promo-light.row > div:nth-child(3) > div:nth-child(1) > div > img"
     squadra = soup.select_one(selettore).get("title").split(":")[1].strip()
     attributi["Squadra"] = squadra
 
-    selettore = "	div.col_one_fourth:nth-of-type(n+2) div"
-    try:
-        trend = soup.select(selettore)[0].find("i").get("class")[1]
-        if trend == "icon-arrow-up":
-            attributi["Trend"] = "UP"
-        else:
-            attributi["Trend"] = "DOWN"
-    except:
-        attributi["Trend"] = "STABLE"
-
-    selettore = "div.col_one_fourth:nth-of-type(2) span.rouge"
-    presenze_attuali = soup.select_one(selettore).text
-    attributi["Presenze campionato corrente"] = presenze_attuali
+    attributi["Trend"] = _trend(soup)
+    attributi["Presenze campionato corrente"] = _presenze(soup)
 
     return attributi
 
 
-def scrape_fpedia():
+def _stato(url: str, soup) -> dict:
+    return {
+        "URL": url.strip(),
+        "Nome": soup.select_one("h1").get_text().strip(),
+        "Infortunato": _infortunato(soup),
+        "Consigliato prossima giornata": _consigliato(soup),
+        "Trend": _trend(soup),
+        "Presenze campionato corrente": _presenze(soup),
+    }
+
+
+def parse_stato_giocatore(url: str, content: bytes) -> dict:
+    """
+    Parses only the volatile status fields (config.STATUS_FIELDS) of a
+    player's page. On a truncated page use get_stato_giocatore, which
+    checks that the page reached them.
+    """
+    return _stato(url, BeautifulSoup(content, "html.parser"))
+
+
+def _elementi_stato(soup) -> set:
+    """Optional status elements found in the page: injury/lineup icon and trend arrow."""
+    presenti = set()
+    if soup.select_one("img.inf_calc") is not None:
+        presenti.add("inf_calc")
+    blocchi = soup.select("	div.col_one_fourth:nth-of-type(n+2) div")
+    if blocchi and blocchi[0].find("i") is not None:
+        presenti.add("trend")
+    return presenti
+
+
+ELEMENTI_STATO = {"inf_calc", "trend"}
+
+
+class ControlloMarcatore:
+    """
+    Checks on the live pages that config.STATUS_END_MARKER comes after the
+    status elements. Their absence is a value (not injured, STABLE), so an
+    element missing from a truncated page is trusted only once the same
+    element has been found before the marker on another page of the run;
+    until then the full page is read. If a full page has an element after
+    the marker, early exit is turned off for the rest of the run.
+    """
+
+    def __init__(self, marker: bytes = None):
+        self.marker = marker
+        self.visti = set()
+        self.pagine_intere = 0
+        self._lock = threading.Lock()
+
+    def verificati(self, presenti: set) -> set:
+        """Records the elements found before the marker, returns those still unverified."""
+        with self._lock:
+            self.visti |= presenti
+            return ELEMENTI_STATO - presenti - self.visti
+
+    def pagina_intera(self):
+        with self._lock:
+            self.pagine_intere += 1
+
+    def disattiva(self, url: str, elementi: set):
+        with self._lock:
+            if self.marker is None:
+                return
+            logger.warning(
+                f"{', '.join(sorted(elementi))} found after {self.marker!r} on {url}: "
+                "reading full pages for the rest of the refresh"
+            )
+            self.marker = None
+
+
+def get_stato_giocatore(url: str, controllo: ControlloMarcatore = None) -> dict:
+    """Status fields of a player, downloading the page only up to the marker when it is safe."""
+    if controllo is None:
+        controllo = ControlloMarcatore(config.STATUS_END_MARKER)
+    marker = controllo.marker
+    content = fetch_pagina_giocatore(url, fino_a=marker)
+    if marker is None or marker not in content:
+        # Whole page read: missing elements are really missing
+        return parse_stato_giocatore(url, content)
+
+    soup = BeautifulSoup(content, "html.parser")
+    presenti = _elementi_stato(soup)
+    obbligatori = True
+    try:
+        stato = _stato(url, soup)
+        dubbi = controllo.verificati(presenti)
+        if not dubbi:
+            return stato
+        logger.debug(f"{', '.join(sorted(dubbi))} not seen before the marker yet, reading the full page of {url}")
+    except AttributeError:
+        obbligatori = False
+
+    # Not reached (or not verified yet): whole page, and check where the marker really is
+    controllo.pagina_intera()
+    soup = BeautifulSoup(fetch_pagina_giocatore(url), "html.parser")
+    stato = _stato(url, soup)
+    dopo = _elementi_stato(soup) - presenti
+    if not obbligatori:
+        dopo.add("name/presences")
+    if dopo:
+        controllo.disattiva(url, dopo)
+    return stato
+
+
+def _parse_pagina(url: str, content: bytes) -> tuple:
+    """Parse stage task (runs in a worker process): attributes, wall and CPU time."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    attributi = parse_attributi_giocatore(url, content)
+    return attributi, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def _nome_chiave(nome) -> str:
+    return " ".join(str(nome).upper().split())
+
+
+def _analisi_precedente() -> pd.DataFrame:
+    """Previous run's FPEDIA analysis (the published snapshot, else the default xlsx); empty if missing."""
+    path = os.path.join(config.OUTPUT_DIR, "fpedia_analysis.xlsx")
+    try:
+        if os.path.exists(config.SNAPSHOT_FILE):
+            with open(config.SNAPSHOT_FILE, encoding="utf-8") as fp:
+                path = json.load(fp)["tabelle"].get("fpedia", path)
+        if os.path.exists(path):
+            return leggi_tabella(path)
+    except Exception as e:
+        logger.warning(f"Previous FPEDIA analysis not readable ({e}): scraping in file order.")
+    return pd.DataFrame()
+
+
+def ordina_per_priorita(urls: list, precedente: pd.DataFrame = None, analisi: pd.DataFrame = None) -> list:
+    """
+    Orders player URLs by expected value, so the players that matter are fetched first:
+    1. players priced above config.PREZZO_MINIMO by the previous analysis,
+       by Prezzo Massimo Consigliato and then Convenienza (descending)
+    2. players with no previous row (new signings: there is nothing to fall back on)
+    3. everyone else by role (config.SCRAPE_PRIORITA_RUOLI), then Convenienza
+    `precedente` is the previous _giocatori.csv (URL -> Nome, Ruolo for
+    analysis tables without the URL column). Ties keep the file order.
+    """
+    if analisi is None:
+        analisi = _analisi_precedente()
+    noti = {}
+    if precedente is not None and "URL" in precedente.columns:
+        for riga in precedente.to_dict("records"):
+            noti[str(riga["URL"]).strip()] = {"Nome": riga.get("Nome"), "Ruolo": riga.get("Ruolo")}
+    if not analisi.empty and "Nome" in analisi.columns:
+        per_url = {str(u).strip(): r for u, r in zip(analisi["URL"], analisi.to_dict("records"))} \
+            if "URL" in analisi.columns else {}
+        per_nome = {_nome_chiave(r["Nome"]): r for r in analisi.to_dict("records")}
+        for url in urls:
+            riga = per_url.get(url) or (per_nome.get(_nome_chiave(noti[url]["Nome"])) if url in noti else None)
+            if riga is not None:
+                noti.setdefault(url, {}).update(riga)
+
+    def chiave(posizione):
+        url = urls[posizione]
+        if url not in noti:
+            return (1, 0.0, 0.0, posizione)
+        riga = noti[url]
+        prezzo = pd.to_numeric(riga.get("Prezzo Massimo Consigliato"), errors="coerce")
+        convenienza = pd.to_numeric(riga.get("Convenienza"), errors="coerce")
+        convenienza = 0.0 if pd.isna(convenienza) else float(convenienza)
+        if pd.notna(prezzo) and prezzo > config.PREZZO_MINIMO:
+            return (0, -float(prezzo), -convenienza, posizione)
+        return (2, -config.SCRAPE_PRIORITA_RUOLI.get(str(riga.get("Ruolo")).strip().upper(), 0),
+                -convenienza, posizione)
+
+    return [urls[i] for i in sorted(range(len(urls)), key=chiave)]
+
+
+def _completa_con_precedente(df: pd.DataFrame, precedente: pd.DataFrame, urls: list) -> pd.DataFrame:
+    """Fresh rows plus the previous rows of the players that were not reached."""
+    aggiornati = set(df["URL"]) if "URL" in df.columns else set()
+    mantenuti = precedente[~precedente["URL"].astype(str).str.strip().isin(aggiornati)]
+    mancanti = len(set(urls) - aggiornati - set(precedente["URL"].astype(str).str.strip()))
+    metrics.incrementa("fpedia_players", len(df), stato="fresh")
+    metrics.incrementa("fpedia_players", len(mantenuti), stato="kept")
+    metrics.incrementa("fpedia_players", mancanti, stato="missing")
+    logger.info(
+        f"FPEDIA dataset: {len(df)} players refreshed, {len(mantenuti)} kept from the previous scrape, "
+        f"{mancanti} new players not reached"
+    )
+    if df.empty:
+        return precedente
+    return pd.concat([df, mantenuti], ignore_index=True)
+
+
+def scrape_fpedia(budget: float = None):
     """
     Orchestrates the scraping of FPEDIA.
-    Fetches all player URLs and then scrapes each player's page for their attributes in parallel.
-    Saves the data to a CSV file.
+    Fetches all player URLs and then scrapes each player's page for their attributes.
+    Pages are downloaded by a pool of threads (fetch stage) and parsed by a pool
+    of processes (parse stage); the two stages are connected by a bounded queue,
+    so fetchers block when parsing falls behind. Saves the data to a CSV file.
+
+    URLs are fetched in priority order (ordina_per_priorita). With a time
+    budget in seconds (default config.SCRAPE_TIME_BUDGET) no new page is
+    started once it runs out: the pages already fetched are parsed and the
+    players not reached keep the values of the existing CSV, which is
+    re-scraped instead of skipped.
     """
+    budget = config.SCRAPE_TIME_BUDGET if budget is None else budget
+    precedente = None
     if os.path.exists(config.GIOCATORI_CSV):
-        logger.debug(f"{config.GIOCATORI_CSV} already exists. Skipping scraping.")
-        return
-
-    urls = get_giocatori_urls()
+        if not budget:
+            logger.debug(f"{config.GIOCATORI_CSV} already exists. Skipping scraping.")
+            return
+        precedente = pd.read_csv(config.GIOCATORI_CSV)
+        if "URL" not in precedente.columns:
+            logger.warning(f"{config.GIOCATORI_CSV} has no URL column: players not reached will be missing.")
+            precedente = None
+
+    urls = ordina_per_priorita(get_giocatori_urls(), precedente)
     giocatori = []
     logger.debug("Scraping individual player data from website...")
 
-    with concurrent.futures.ThreadPoolExecutor(
-        max_workers=config.MAX_WORKERS
-    ) as executor:
-        future_to_url = {
-            executor.submit(get_attributi_giocatore, url): url for url in urls
-        }
-        for future in tqdm(
-            concurrent.futures.as_completed(future_to_url), total=len(urls)
-        ):
-            url = future_to_url[future]
+    coda = queue.Queue(maxsize=config.SCRAPE_QUEUE_SIZE)
+    fine = object()
+    # Set when the parse stage fails: fetchers stop instead of blocking on a queue nobody drains
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"fetch_busy": 0.0, "fetch_blocked": 0.0, "parse_cpu": 0.0, "fetched": 0, "parsed": 0, "skipped": 0}
+    progress = tqdm(total=len(urls))
+    scadenza = time.perf_counter() + budget if budget else None
+
+    def salta():
+        with lock:
+            stats["skipped"] += 1
+        progress.update()
+
+    def metti(item) -> bool:
+        """Blocking put that gives up once the consumer has stopped."""
+        while not stop.is_set():
             try:
-                attributi = future.result()
+                coda.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(url):
+        if stop.is_set():
+            return
+        # Out of time: the remaining URLs are dropped without a request
+        if scadenza is not None and time.perf_counter() >= scadenza:
+            return salta()
+        with metrics.misura("data_retriever.fetch") as misura:
+            start = time.perf_counter()
+            content = fetch_pagina_giocatore(url, scadenza=scadenza)
+            fetched = time.perf_counter()
+            misura["righe"] = 0 if content is None else 1
+        if content is None:
+            return salta()
+        # Blocks while the queue is full (backpressure from the parse stage)
+        if not metti((url, content)):
+            return
+        with lock:
+            stats["fetch_busy"] += fetched - start
+            stats["fetch_blocked"] += time.perf_counter() - fetched
+            stats["fetched"] += 1
+
+    def fetch_all():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+            future_to_url = {executor.submit(fetch, url): url for url in urls}
+            for future in concurrent.futures.as_completed(future_to_url):
+                if stop.is_set():
+                    # Pending fetches are dropped, running ones return at their next put
+                    for pending in future_to_url:
+                        pending.cancel()
+                    break
+                try:
+                    future.result()
+                except Exception as exc:
+                    logger.error(f"{future_to_url[future]} generated an exception: {exc}")
+        metti(fine)
+
+    start = time.perf_counter()
+    fetcher = threading.Thread(target=fetch_all, daemon=True)
+    fetcher.start()
+
+    # Parse jobs in flight are bounded too, so pages wait in the queue
+    in_volo = threading.Semaphore(config.PARSE_WORKERS * 2)
+
+    def parsed(future, url):
+        try:
+            attributi, wall, cpu = future.result()
+            metrics.registra("data_retriever.parse", wall, cpu, righe=1 if attributi else 0)
+            with lock:
+                stats["parse_cpu"] += cpu
+                stats["parsed"] += 1
                 if attributi:
                     giocatori.append(attributi)
-            except Exception as exc:
-                logger.error(f"{url} generated an exception: {exc}")
+        except Exception as exc:
+            logger.error(f"{url} generated an exception: {exc}")
+        finally:
+            in_volo.release()
+            progress.update()
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=config.PARSE_WORKERS) as pool:
+            while True:
+                item = coda.get()
+                if item is fine:
+                    break
+                url, content = item
+                in_volo.acquire()
+                future = pool.submit(_parse_pagina, url, content)
+                future.add_done_callback(lambda f, url=url: parsed(f, url))
+    finally:
+        # On a parse failure (e.g. a worker killed, BrokenProcessPool) the fetchers
+        # must stop too, or they block forever on the full queue and the process hangs
+        stop.set()
+        fetcher.join()
+        progress.close()
+
+    wall = time.perf_counter() - start
+    if wall > 0:
+        logger.info(
+            f"Fetch stage: {stats['fetched']} pages, "
+            f"utilisation {stats['fetch_busy'] / (config.MAX_WORKERS * wall):.0%} of {config.MAX_WORKERS} threads, "
+            f"{stats['fetch_blocked']:.1f}s blocked on the parse queue"
+        )
+        logger.info(
+            f"Parse stage: {stats['parsed']} pages, {stats['parse_cpu']:.1f}s CPU, "
+            f"utilisation {stats['parse_cpu'] / (config.PARSE_WORKERS * wall):.0%} of {config.PARSE_WORKERS} processes "
+            f"(wall {wall:.1f}s)"
+        )
+    if stats["skipped"]:
+        logger.warning(f"Time budget of {budget:.0f}s exhausted: {stats['skipped']} pages not fetched.")
 
     df = pd.DataFrame(giocatori)
-    df.to_csv(config.GIOCATORI_CSV, index=False)
+    if precedente is not None:
+        df = _completa_con_precedente(df, precedente, urls)
+    # Atomic write: the previous CSV is replaced only by a complete file
+    tmp = f"{config.GIOCATORI_CSV}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, config.GIOCATORI_CSV)
     logger.debug("FPEDIA data saved to CSV.")
 
 
+def aggiorna_stato_fpedia():
+    """
+    Status-only refresh of FPEDIA: re-reads Infortunato, Consigliato prossima
+    giornata, Trend and Presenze campionato corrente for every player already
+    in config.GIOCATORI_CSV and patches the file in place (all other columns
+    are kept). Players whose page fails keep their previous values.
+    Without a stored dataset it falls back to the full scrape.
+    """
+    if not os.path.exists(config.GIOCATORI_CSV):
+        logger.warning(f"{config.GIOCATORI_CSV} not found: running the full scrape instead.")
+        scrape_fpedia()
+        return
+
+    df = pd.read_csv(config.GIOCATORI_CSV)
+    # Player key: URL, or Nome for datasets scraped before the URL column existed
+    chiave = "URL" if "URL" in df.columns else "Nome"
+    urls = df["URL"].dropna().tolist() if chiave == "URL" else get_giocatori_urls()
+    logger.info(f"Refreshing status fields of {len(urls)} players...")
+
+    stati = []
+    with metrics.misura("data_retriever.refresh_status") as misura:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+            controllo = ControlloMarcatore(config.STATUS_END_MARKER)
+            future_to_url = {executor.submit(get_stato_giocatore, url, controllo): url for url in urls}
+            for future in tqdm(concurrent.futures.as_completed(future_to_url), total=len(urls)):
+                try:
+                    stati.append(future.result())
+                except Exception as exc:
+                    logger.error(f"{future_to_url[future]} generated an exception: {exc}")
+        misura["righe"] = len(stati)
+    if config.STATUS_END_MARKER is not None:
+        logger.info(
+            f"Early exit {'on' if controllo.marker is not None else 'turned off'}: "
+            f"{controllo.pagine_intere} full pages read to verify the status fields"
+        )
+    if not stati:
+        logger.warning("No status could be refreshed: dataset left unchanged.")
+        return
+
+    nuovi = pd.DataFrame(stati).drop_duplicates(chiave).set_index(chiave)
+    campi = [c for c in config.STATUS_FIELDS if c in nuovi.columns]
+    righe = df[chiave].isin(nuovi.index)
+    cambiati = 0
+    for campo in campi:
+        valori = df.loc[righe, chiave].map(nuovi[campo])
+        if campo in df.columns:
+            cambiati += int((df.loc[righe, campo].astype(str) != valori.astype(str)).sum())
+            df[campo] = df[campo].astype(object)
+        df.loc[righe, campo] = valori
+
+    tmp = f"{config.GIOCATORI_CSV}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, config.GIOCATORI_CSV)
+    logger.info(
+        f"Status refresh: {int(righe.sum())}/{len(df)} players updated, {cambiati} changed values, "
+        f"{len(df) - int(righe.sum())} kept from the previous scrape."
+    )
+
+
 def fetch_FSTATS_data():
     """
     Logs into FSTATS, fetches player data from the API,
@@ -216,6 +627,7 @@ def fetch_FSTATS_data():
         response = requests.post(
             config.FSTATS_LOGIN_URL, json=login_payload, headers=headers
         )
+        metrics.registra_http(response, "fstats")
         response.raise_for_status()
         token = response.json()["access_token"]
         logger.debug("Login successful.")
@@ -227,9 +639,12 @@ def fetch_FSTATS_data():
     logger.debug("Fetching player data from FSTATS API...")
     auth_headers = {"authorization": f"Bearer {token}"}
     try:
-        response = requests.get(config.FSTATS_PLAYERS_URL, headers=auth_headers)
-        response.raise_for_status()
-        players_data = response.json()["results"]
+        with metrics.misura("data_retriever.fetch_fstats") as misura:
+            response = requests.get(config.FSTATS_PLAYERS_URL, headers=auth_headers)
+            metrics.registra_http(response, "fstats")
+            response.raise_for_status()
+            players_data = response.json()["results"]
+            misura["righe"] = len(players_data)
 
         df = pd.DataFrame(players_data)
         df.to_csv(config.PLAYERS_CSV, index=False, sep=";")
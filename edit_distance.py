@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Distanza di Levenshtein bit-parallela (algoritmo di Myers / Hyyrö).
+
+Ogni colonna della matrice di programmazione dinamica viene rappresentata
+con due bit-vector (incrementi/decrementi verticali), quindi il costo per
+carattere del testo è un numero costante di operazioni sugli interi invece
+di un ciclo sul pattern. Gli interi Python hanno precisione arbitraria,
+per cui non ci sono limiti alla lunghezza dei nomi.
+
+API:
+- levenshtein_distance(a, b, max_distance=None)
+- levenshtein_ratio(a, b)                 stesso rapporto del vecchio matcher
+- levenshtein_ratios(query, candidates)   one-vs-many con pattern precalcolato
+
+Eseguire `python edit_distance.py` per il micro-benchmark contro la
+versione a matrice.
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    """Bitmask delle posizioni di ogni carattere nel pattern"""
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    return peq
+
+
+def _myers(peq: Dict[str, int], m: int, text: str, max_distance: Optional[int] = None) -> int:
+    """
+    Distanza di edit globale tra il pattern (già codificato in peq, lunghezza m)
+    e text. Con max_distance restituisce max_distance + 1 appena la distanza
+    finale non può più rientrare nel limite.
+    """
+    n = len(text)
+    if max_distance is not None and abs(m - n) > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+
+    for j, c in enumerate(text):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # Distanza globale: la riga 0 cresce di 1 a ogni colonna
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+
+        # Ogni colonna rimanente può ridurre lo score al massimo di 1
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+
+    return score
+
+
+def levenshtein_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Distanza di Levenshtein tra a e b. Se max_distance è indicato e la
+    distanza lo supera, restituisce max_distance + 1 (uscita anticipata).
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    return _myers(_pattern_masks(b), len(b), a, max_distance)
+
+
+def _ratio(distance: int, len1: int, len2: int) -> float:
+    # Stessa formula (e stesso caso limite sulle stringhe vuote) del matcher
+    if min(len1, len2) == 0:
+        return 0.0
+    max_len = max(len1, len2)
+    return 1 - (distance / max_len)
+
+
+def levenshtein_ratio(s1: str, s2: str) -> float:
+    """Similarità 1 - distanza / lunghezza massima (0.0 se una stringa è vuota)"""
+    if not s1 or not s2:
+        return 0.0
+    return _ratio(levenshtein_distance(s1, s2), len(s1), len(s2))
+
+
+def levenshtein_ratios(query: str, candidates: Iterable[str],
+                       min_ratio: Optional[float] = None) -> List[float]:
+    """
+    Rapporti di similarità di query contro tutti i candidati, codificando il
+    pattern una sola volta. Con min_ratio, i candidati che non possono
+    raggiungerlo vengono scartati in anticipo e riportati come 0.0.
+    """
+    m = len(query)
+    peq = _pattern_masks(query)
+    ratios = []
+    for candidate in candidates:
+        n = len(candidate)
+        if m == 0 or n == 0:
+            ratios.append(0.0)
+            continue
+        max_distance = None
+        if min_ratio is not None:
+            # +1 di margine per gli arrotondamenti: il controllo finale è esatto
+            max_distance = int(max(m, n) * (1 - min_ratio)) + 1
+        distance = _myers(peq, m, candidate, max_distance)
+        if max_distance is not None and distance > max_distance:
+            ratios.append(0.0)
+            continue
+        ratio = _ratio(distance, m, n)
+        ratios.append(ratio if min_ratio is None or ratio >= min_ratio else 0.0)
+    return ratios
+
+
+def _levenshtein_ratio_dp(s1: str, s2: str) -> float:
+    """Versione a matrice (riferimento per test e benchmark)"""
+    if len(s1) < len(s2):
+        return _levenshtein_ratio_dp(s2, s1)
+    if len(s2) == 0:
+        return 0.0
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+    max_len = max(len(s1), len(s2))
+    return 1 - (previous_row[-1] / max_len) if max_len > 0 else 0.0
+
+
+def benchmark(n_names: int = 600, seed: int = 42):
+    """Micro-benchmark: confronto tutti-contro-tutti su nomi sintetici"""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    letters = "abcdefghilmnoprstuvz"
+    names = [
+        " ".join(
+            "".join(rng.choice(letters) for _ in range(rng.randint(3, 10)))
+            for _ in range(rng.randint(1, 3))
+        )
+        for _ in range(n_names)
+    ]
+    queries = names[:50]
+
+    start = time.perf_counter()
+    reference = [[_levenshtein_ratio_dp(q, c) for c in names] for q in queries]
+    t_dp = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [[levenshtein_ratio(q, c) for c in names] for q in queries]
+    t_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = [levenshtein_ratios(q, names) for q in queries]
+    t_batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    levels = [levenshtein_ratios(q, names, min_ratio=0.7) for q in queries]
+    t_cutoff = time.perf_counter() - start
+
+    assert reference == single == batched, "I rapporti non coincidono con la versione a matrice"
+    assert all(
+        (r if r >= 0.7 else 0.0) == c for ref, cut in zip(reference, levels) for r, c in zip(ref, cut)
+    )
+
+    pairs = len(queries) * len(names)
+    print(f"Coppie confrontate: {pairs}")
+    for label, elapsed in [
+        ("Matrice (riferimento)", t_dp),
+        ("Myers singolo", t_single),
+        ("Myers batch", t_batch),
+        ("Myers batch + cutoff 0.7", t_cutoff),
+    ]:
+        print(f"  {label:<26} {elapsed * 1000:8.1f} ms  {pairs / elapsed:10.0f} coppie/s  x{t_dp / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,158 @@
+# exporter.py
+"""
+Export delle tabelle di analisi in più formati, in background.
+
+`Exporter` accoda le scritture (una per tabella e formato) su un pool di
+processi, così la pipeline può proseguire mentre i file vengono scritti e
+le scritture lente (xlsx) corrono in parallelo tra loro. `leggi_tabella`
+rilegge un file in base all'estensione: i consumatori a valle possono
+usare i formati veloci e generare l'Excel solo quando serve.
+
+Formati: xlsx, csv, parquet (richiede pyarrow o fastparquet), jsonl
+(un oggetto JSON per riga).
+"""
+import importlib.util
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+import metrics
+
+FORMATI = ("xlsx", "csv", "parquet", "jsonl")
+
+
+def _colonne_uniche(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rinomina le colonne duplicate come fa pandas in lettura (Ruolo, Ruolo.1):
+    parquet e jsonl non ammettono nomi ripetuti.
+    """
+    if df.columns.is_unique:
+        return df
+    nomi: List[str] = []
+    usati = set()
+    for col in df.columns:
+        nome, n = col, 0
+        while nome in usati:
+            n += 1
+            nome = f"{col}.{n}"
+        usati.add(nome)
+        nomi.append(nome)
+    return df.set_axis(nomi, axis=1)
+
+
+def _scrivi(df: pd.DataFrame, path: str, formato: str) -> Tuple[str, float, float, int]:
+    """Scrive df nel formato richiesto; restituisce path, tempo wall, CPU e righe."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    if formato == "xlsx":
+        df.to_excel(path, index=False)
+    elif formato == "csv":
+        df.to_csv(path, index=False)
+    elif formato == "parquet":
+        _colonne_uniche(df).to_parquet(path, index=False)
+    elif formato == "jsonl":
+        _colonne_uniche(df).to_json(path, orient="records", lines=True, force_ascii=False)
+    return path, time.perf_counter() - wall, time.process_time() - cpu, len(df)
+
+
+def leggi_tabella(path: str) -> pd.DataFrame:
+    """Legge una tabella scritta da Exporter, in base all'estensione."""
+    formato = os.path.splitext(path)[1].lstrip(".").lower()
+    if formato == "csv":
+        return pd.read_csv(path)
+    if formato == "parquet":
+        return pd.read_parquet(path)
+    if formato == "jsonl":
+        return pd.read_json(path, orient="records", lines=True)
+    return pd.read_excel(path)
+
+
+def controlla_formati(formati: Iterable[str]) -> Tuple[str, ...]:
+    """Valida i formati richiesti (prima di avviare la pipeline)."""
+    formati = tuple(dict.fromkeys(f.lower() for f in formati))
+    sconosciuti = [f for f in formati if f not in FORMATI]
+    if sconosciuti:
+        raise ValueError(f"Formati di export non supportati: {sconosciuti} (disponibili: {FORMATI})")
+    if "parquet" in formati and not (
+        importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")
+    ):
+        raise ImportError("L'export parquet richiede pyarrow o fastparquet")
+    return formati
+
+
+class Exporter:
+    """
+    Pool di export in background. Ogni `submit` accoda una tabella in tutti
+    i formati richiesti; `attendi` aspetta le scritture accodate e ne
+    restituisce i path (rilancia il primo errore).
+    """
+
+    def __init__(self, output_dir: str, formati: Iterable[str] = ("xlsx",), workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.formati = controlla_formati(formati)
+        # workers=0: scritture sincrone nel processo corrente (es. profilo memoria)
+        self.workers = workers if workers is not None else len(self.formati) * 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: List[Tuple[str, Future]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.chiudi()
+
+    def path(self, nome: str, formato: str) -> str:
+        return os.path.join(self.output_dir, f"{nome}.{formato}")
+
+    def submit(self, df: pd.DataFrame, nome: str) -> List[str]:
+        """Accoda l'export di df come <nome>.<formato> per ogni formato."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        paths = []
+        for formato in self.formati:
+            path = self.path(nome, formato)
+            if self._executor is not None:
+                future = self._executor.submit(_scrivi, df, path, formato)
+            else:
+                # In-process: misurata come stadio (anche dal profilo memoria)
+                future = Future()
+                try:
+                    with metrics.misura(f"export.{formato}") as misura:
+                        future.set_result(_scrivi(df, path, formato))
+                        misura["righe"] = len(df)
+                except Exception as e:
+                    future.set_exception(e)
+            self._futures.append((path, future))
+            paths.append(path)
+        return paths
+
+    def attendi(self) -> List[str]:
+        """Aspetta tutti gli export accodati."""
+        futures, self._futures = self._futures, []
+        scritti = []
+        errore = None
+        for path, future in futures:
+            try:
+                _, wall, cpu, righe = future.result()
+                if self._executor is not None:
+                    metrics.registra(f"export.{os.path.splitext(path)[1].lstrip('.')}", wall, cpu, righe=righe)
+                scritti.append(path)
+                logger.info(f"Export completato: {path}")
+            except Exception as e:
+                logger.error(f"Export fallito: {path} ({e})")
+                errore = errore or e
+        if errore is not None:
+            raise errore
+        return scritti
+
+    def chiudi(self):
+        try:
+            self.attendi()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
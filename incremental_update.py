@@ -0,0 +1,526 @@
+# incremental_update.py
+"""
+Ricalcolo incrementale di convenienza e prezzo massimo consigliato.
+
+Dopo ogni giornata cambiano le statistiche di pochi giocatori, ma gli indici
+sono normalizzati su massimi globali (presenze massime, convenienza massima)
+e i prezzi dipendono dalla posizione in classifica dentro il ruolo.
+`CalcoloIncrementale` mantiene questo stato (massimi correnti, classifica
+ordinata per ruolo, confini delle fasce) e, dato un delta di righe
+modificate, ricalcola solo i giocatori coinvolti; gli altri vengono
+toccati solo se un massimo di normalizzazione cambia o se scavalcano un
+confine di fascia.
+
+Il risultato coincide con quello di una pipeline completa
+(calcola_convenienza_* + calcola_prezzo_massimo_consigliato) eseguita sul
+dataset aggiornato: `verifica` lo controlla.
+
+Nella pipeline (config.INCREMENTAL_UPDATE) lo stato viene salvato su disco
+a fine esecuzione; `ricalcola` lo ricarica, confronta la tabella processata
+con quella precedente e applica come delta solo le righe cambiate (ad
+esempio i campi di stato riletti con config.REFRESH_STATUS_ONLY).
+"""
+import heapq
+import itertools
+import os
+import pickle
+from bisect import bisect_left, insort
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import config
+import convenienza_calculator as cc
+
+# Colonne chiave candidate per fonte, in ordine di preferenza (id stabile, poi nome)
+CHIAVI = {
+    "fpedia": ["URL", "Nome"],
+    "fstats": ["fantacalcioPlayerId", "Nome"],
+}
+
+
+def _assegna(df: pd.DataFrame, righe: pd.DataFrame):
+    """Sovrascrive in-place le righe di df, promuovendo i dtype se necessario."""
+    for col in righe.columns:
+        if df[col].dtype == righe[col].dtype:
+            continue
+        dtype = pd.concat([df[col].iloc[:0], righe[col].iloc[:0]]).dtype
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    df.loc[righe.index, righe.columns] = righe
+
+
+class _MassimoCorrente:
+    """Massimo di un insieme di valori aggiornabili (heap con cancellazione pigra)."""
+
+    def __init__(self):
+        self._valori = {}
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __getstate__(self):
+        # itertools.count non è serializzabile in modo portabile: si salva il prossimo valore
+        stato = self.__dict__.copy()
+        stato["_seq"] = next(self._seq)
+        self._seq = itertools.count(stato["_seq"])
+        return stato
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        self._seq = itertools.count(stato["_seq"])
+
+    def imposta(self, chiave, valore):
+        if valore is None or pd.isna(valore):
+            self._valori.pop(chiave, None)
+            return
+        self._valori[chiave] = valore
+        heapq.heappush(self._heap, (-valore, next(self._seq), chiave))
+
+    def rimuovi(self, chiave):
+        self._valori.pop(chiave, None)
+
+    def massimo(self):
+        while self._heap:
+            neg, _, chiave = self._heap[0]
+            if self._valori.get(chiave) == -neg:
+                return -neg
+            heapq.heappop(self._heap)
+        return None
+
+
+class _ClassificaRuolo:
+    """Classifica ordinata dei giocatori di un ruolo e relativi prezzi."""
+
+    def __init__(self, ruolo, fasce_ruolo):
+        self.ruolo = ruolo
+        self.fasce_ruolo = fasce_ruolo
+        self.ordine = []  # (-score, seq, chiave), ordinato
+        self.voce = {}  # chiave -> voce in self.ordine
+        self.massimo = _MassimoCorrente()
+        self.prezzi_posizione = []
+
+    def __len__(self):
+        return len(self.ordine)
+
+    @staticmethod
+    def _voce(score, seq, chiave):
+        # NaN in coda, come sort_values(na_position='last')
+        return (np.inf if pd.isna(score) else -score, seq, chiave)
+
+    def inserisci(self, chiave, score, seq):
+        voce = self._voce(score, seq, chiave)
+        insort(self.ordine, voce)
+        self.voce[chiave] = voce
+        self.massimo.imposta(chiave, score)
+
+    def rimuovi(self, chiave):
+        voce = self.voce.pop(chiave)
+        del self.ordine[bisect_left(self.ordine, voce)]
+        self.massimo.rimuovi(chiave)
+
+    def tutti_a_zero(self):
+        return self.massimo.massimo() in (None, 0)
+
+    def prezzo(self, posizione):
+        if self.fasce_ruolo is None:
+            return 1  # Ruolo non mappato: default minimo
+        if self.tutti_a_zero():
+            return self.fasce_ruolo[-1]
+        return self.prezzi_posizione[posizione]
+
+    def ricalcola_fasce(self):
+        if self.fasce_ruolo:
+            self.prezzi_posizione = cc.prezzi_per_posizione(
+                self.ruolo, self.fasce_ruolo, len(self.ordine)
+            )
+
+    def confini(self):
+        """Posizioni in cui cambia la fascia di prezzo."""
+        p = self.prezzi_posizione
+        return [i for i in range(1, len(p)) if p[i] != p[i - 1]]
+
+
+class CalcoloIncrementale:
+    """
+    Stato incrementale di una pipeline FPEDIA o FSTATS.
+
+    Uso:
+        calcolo = CalcoloIncrementale(df_processato, fonte="fstats")
+        cambiati = calcolo.aggiorna(df_delta)   # righe modificate/nuove
+        df = calcolo.risultato
+    """
+
+    COLONNE_OUTPUT = ["Convenienza", "Convenienza Potenziale", "Prezzo Massimo Consigliato"]
+
+    def __init__(self, df: pd.DataFrame, fonte: str, chiave: str = "Nome", regole=None):
+        if fonte not in ("fpedia", "fstats"):
+            raise ValueError(f"Fonte non supportata: {fonte}")
+        if df[chiave].duplicated().any():
+            raise ValueError(f"La colonna chiave '{chiave}' contiene duplicati.")
+
+        self.fonte = fonte
+        self.chiave = chiave
+        self.origine_regole = regole
+        if regole is not None and not callable(regole):
+            regole = cc.compila_regole(regole)
+        self.regole = regole
+        self._fasce = cc.fasce_parametriche()
+        self._seq = itertools.count()
+
+        self._df = df.set_index(chiave, drop=False)
+        self._seq_chiave = {k: next(self._seq) for k in self._df.index}
+        self._prepara = cc.prepara_fpedia if fonte == "fpedia" else cc.prepara_fstats
+        self._calc = self._prepara(self._df)
+        self._out = pd.DataFrame(index=self._df.index, columns=self.COLONNE_OUTPUT, dtype=float)
+
+        self._inizializza_convenienza()
+        self._inizializza_prezzi()
+
+    def __getstate__(self):
+        # Le regole compilate non si salvano: `carica` le ricompila dall'origine
+        stato = self.__dict__.copy()
+        stato["regole"] = None
+        stato["_seq"] = next(self._seq)
+        self._seq = itertools.count(stato["_seq"])
+        return stato
+
+    def __setstate__(self, stato):
+        self.__dict__.update(stato)
+        self._seq = itertools.count(stato["_seq"])
+        regole = self.origine_regole
+        self.regole = cc.compila_regole(regole) if regole is not None and not callable(regole) else regole
+
+    # --- Risultato ---
+
+    @property
+    def risultato(self) -> pd.DataFrame:
+        """Dataset completo con gli indici aggiornati."""
+        df = self._df.reset_index(drop=True)
+        for col in self.COLONNE_OUTPUT:
+            df[col] = self._out[col].to_numpy()
+        df["Prezzo Massimo Consigliato"] = df["Prezzo Massimo Consigliato"].astype(int)
+        return df
+
+    # --- Convenienza ---
+
+    def _inizializza_convenienza(self):
+        if self.fonte == "fpedia":
+            self._max_presenze = _MassimoCorrente()
+            for k, v in self._calc["Presenze campionato corrente"].items():
+                self._max_presenze.imposta(k, v)
+            self._giocatemax = self._giocatemax_corrente()
+            self._ricalcola_convenienza_fpedia(self._calc.index)
+        else:
+            self._conv_grezza = pd.Series(np.nan, index=self._calc.index)
+            self._pot_grezzo = pd.Series(np.nan, index=self._calc.index)
+            self._max_conv = _MassimoCorrente()
+            self._max_pot = _MassimoCorrente()
+            self._aggiorna_grezzi_fstats(self._calc.index)
+            self._norm_conv = self._max_conv.massimo()
+            self._norm_pot = self._max_pot.massimo()
+            self._normalizza_fstats(self._calc.index)
+
+    def _giocatemax_corrente(self):
+        giocatemax = self._max_presenze.massimo()
+        return 1 if not giocatemax else giocatemax
+
+    def _ricalcola_convenienza_fpedia(self, chiavi):
+        calc = self._calc.loc[chiavi]
+        self._out.loc[chiavi, "Convenienza"] = [
+            cc.appetibilita_fpedia(row, self._giocatemax) for _, row in calc.iterrows()
+        ]
+        self._out.loc[chiavi, "Convenienza Potenziale"] = [
+            cc.potenziale_fpedia(row) for _, row in calc.iterrows()
+        ]
+
+    def _aggiorna_grezzi_fstats(self, chiavi):
+        calc = self._calc.loc[chiavi]
+        con_presenze = calc[calc["presences"] > 0]
+        self._conv_grezza.loc[chiavi] = np.nan
+        if not con_presenze.empty:
+            self._conv_grezza.loc[con_presenze.index] = cc.convenienza_grezza_fstats(con_presenze)
+        self._pot_grezzo.loc[chiavi] = cc.potenziale_grezzo_fstats(calc)
+        for k in chiavi:
+            self._max_conv.imposta(k, self._conv_grezza.at[k])
+            self._max_pot.imposta(k, self._pot_grezzo.at[k])
+
+    def _normalizza_fstats(self, chiavi):
+        conv = self._conv_grezza.loc[chiavi]
+        if self._norm_conv is None:
+            self._out.loc[chiavi, "Convenienza"] = 0.0
+        else:
+            self._out.loc[chiavi, "Convenienza"] = ((conv / self._norm_conv) * 100).fillna(0)
+        pot = self._pot_grezzo.loc[chiavi]
+        self._out.loc[chiavi, "Convenienza Potenziale"] = ((pot / self._norm_pot) * 100).fillna(0)
+
+    def _aggiorna_convenienza(self, chiavi):
+        if self.fonte == "fpedia":
+            for k in chiavi:
+                self._max_presenze.imposta(k, self._calc.at[k, "Presenze campionato corrente"])
+            giocatemax = self._giocatemax_corrente()
+            if giocatemax != self._giocatemax:
+                # Cambia la normalizzazione: ricalcola chi ne dipende (presenze > 5)
+                self._giocatemax = giocatemax
+                dipendenti = self._calc.index[self._calc["Presenze campionato corrente"] > 5]
+                chiavi = dipendenti.union(pd.Index(chiavi))
+                logger.debug(f"Presenze massime cambiate: ricalcolo {len(chiavi)} giocatori.")
+            self._ricalcola_convenienza_fpedia(chiavi)
+            return
+
+        self._aggiorna_grezzi_fstats(chiavi)
+        norm_conv, norm_pot = self._max_conv.massimo(), self._max_pot.massimo()
+        if norm_conv != self._norm_conv or norm_pot != self._norm_pot:
+            self._norm_conv, self._norm_pot = norm_conv, norm_pot
+            chiavi = self._calc.index
+            logger.debug("Massimi di normalizzazione FSTATS cambiati: rinormalizzo tutti.")
+        self._normalizza_fstats(chiavi)
+
+    # --- Prezzi ---
+
+    def _score(self, chiavi):
+        """Score dei giocatori indicati, calcolato ruolo per ruolo."""
+        df = self._df.loc[chiavi]
+        scores = {}
+        for ruolo, df_ruolo in df.groupby("Ruolo", sort=False):
+            scores.update(cc.calcola_score_ruolo(df_ruolo, ruolo, self.regole).items())
+        return scores
+
+    def _inizializza_prezzi(self):
+        self._classifiche = {}
+        self._ruolo_chiave = {}
+        self._out["Prezzo Massimo Consigliato"] = 0
+        scores = self._score(self._df.index)
+        for k, ruolo in self._df["Ruolo"].items():
+            if pd.isna(ruolo):
+                continue
+            self._classifica(ruolo).inserisci(k, scores[k], self._seq_chiave[k])
+            self._ruolo_chiave[k] = ruolo
+        for classifica in self._classifiche.values():
+            self._riassegna_ruolo(classifica)
+
+    def _classifica(self, ruolo):
+        if ruolo not in self._classifiche:
+            fasce_ruolo = self._fasce.get(ruolo) or None
+            if fasce_ruolo is None:
+                logger.warning(f"Ruolo {ruolo} non trovato nella mappatura. Prezzo minimo.")
+            self._classifiche[ruolo] = _ClassificaRuolo(ruolo, fasce_ruolo)
+        return self._classifiche[ruolo]
+
+    def _riassegna_ruolo(self, classifica):
+        classifica.ricalcola_fasce()
+        for pos, (_, _, k) in enumerate(classifica.ordine):
+            self._out.at[k, "Prezzo Massimo Consigliato"] = classifica.prezzo(pos)
+
+    def _riassegna_posizioni(self, classifica, posizioni):
+        for pos in posizioni:
+            if 0 <= pos < len(classifica):
+                k = classifica.ordine[pos][2]
+                self._out.at[k, "Prezzo Massimo Consigliato"] = classifica.prezzo(pos)
+
+    def _aggiorna_prezzi(self, chiavi):
+        scores = self._score(chiavi)
+        per_ruolo = {}
+        da_rifare = set()
+
+        for k in chiavi:
+            vecchio = self._ruolo_chiave.get(k)
+            nuovo = self._df.at[k, "Ruolo"]
+            nuovo = None if pd.isna(nuovo) else nuovo
+            if vecchio is not None:
+                classifica = self._classifiche[vecchio]
+                zero_prima = classifica.tutti_a_zero()
+                classifica.rimuovi(k)
+                if vecchio != nuovo:
+                    da_rifare.add(vecchio)
+                per_ruolo.setdefault(vecchio, [zero_prima, 0])[1] += 1
+            if nuovo is None:
+                self._ruolo_chiave.pop(k, None)
+                self._out.at[k, "Prezzo Massimo Consigliato"] = 0
+                continue
+            classifica = self._classifica(nuovo)
+            per_ruolo.setdefault(nuovo, [classifica.tutti_a_zero(), 0])[1] += 1
+            classifica.inserisci(k, scores[k], self._seq_chiave[k])
+            self._ruolo_chiave[k] = nuovo
+            if vecchio != nuovo:
+                da_rifare.add(nuovo)
+
+        for ruolo, (zero_prima, n_cambi) in per_ruolo.items():
+            classifica = self._classifiche[ruolo]
+            if ruolo in da_rifare or classifica.tutti_a_zero() != zero_prima:
+                # Cambia il numero di giocatori (e quindi le fasce) o il caso "tutti a 0"
+                self._riassegna_ruolo(classifica)
+                continue
+            # Un giocatore non modificato si sposta al massimo di n_cambi posizioni:
+            # il suo prezzo può cambiare solo se è vicino a un confine di fascia.
+            posizioni = set()
+            for confine in classifica.confini():
+                posizioni.update(range(confine - n_cambi, confine + n_cambi))
+            for k in chiavi:
+                if self._ruolo_chiave.get(k) == ruolo:
+                    posizioni.add(bisect_left(classifica.ordine, classifica.voce[k]))
+            self._riassegna_posizioni(classifica, posizioni)
+
+    # --- Aggiornamento ---
+
+    def aggiorna(self, delta: pd.DataFrame) -> pd.Index:
+        """
+        Applica un delta di righe (giocatori modificati o nuovi, identificati
+        dalla colonna chiave) e ricalcola solo ciò che ne dipende.
+        Le colonne assenti dal delta restano invariate.
+        Restituisce le chiavi dei giocatori aggiornati.
+        """
+        if delta.empty:
+            return pd.Index([])
+        if delta[self.chiave].duplicated().any():
+            raise ValueError(f"Il delta contiene chiavi '{self.chiave}' duplicate.")
+
+        delta = delta.set_index(self.chiave, drop=False)
+        nuove = delta.index.difference(self._df.index)
+        if len(nuove):
+            self._df = pd.concat([self._df, delta.loc[nuove].reindex(columns=self._df.columns)])
+            self._out = self._out.reindex(self._df.index)
+            for k in nuove:
+                self._seq_chiave[k] = next(self._seq)
+
+        colonne = [c for c in delta.columns if c in self._df.columns]
+        _assegna(self._df, delta[colonne])
+        calc = self._prepara(self._df.loc[delta.index])
+        if len(nuove):
+            self._calc = pd.concat([self._calc, calc.loc[nuove]])
+            if self.fonte == "fstats":
+                self._conv_grezza = self._conv_grezza.reindex(self._calc.index)
+                self._pot_grezzo = self._pot_grezzo.reindex(self._calc.index)
+        _assegna(self._calc, calc[colonne])
+
+        chiavi = delta.index
+        self._aggiorna_convenienza(chiavi)
+        self._aggiorna_prezzi(chiavi)
+        logger.info(f"Aggiornamento incrementale {self.fonte}: {len(chiavi)} giocatori.")
+        return chiavi
+
+
+# --- Stato su disco e integrazione con la pipeline ---
+
+def percorso_stato(fonte: str) -> str:
+    return os.path.join(config.INCREMENTAL_STATE_DIR, f"incrementale_{fonte}.pkl")
+
+
+def salva(calcolo: CalcoloIncrementale, path: str):
+    """Salva lo stato in modo atomico (file temporaneo + rename)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(calcolo, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def carica(path: str) -> Optional[CalcoloIncrementale]:
+    """Stato salvato, o None se manca o non è leggibile."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            calcolo = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Stato incrementale {path} non leggibile ({e}): ricalcolo completo.")
+        return None
+    return calcolo if isinstance(calcolo, CalcoloIncrementale) else None
+
+
+def scegli_chiave(df: pd.DataFrame, fonte: str) -> Optional[str]:
+    """Prima colonna chiave di CHIAVI presente, senza valori mancanti né duplicati."""
+    for chiave in CHIAVI[fonte]:
+        if chiave in df.columns and df[chiave].notna().all() and not df[chiave].duplicated().any():
+            return chiave
+    return None
+
+
+def righe_cambiate(precedente: pd.DataFrame, corrente: pd.DataFrame, chiave: str) -> pd.DataFrame:
+    """Righe di `corrente` nuove o diverse da `precedente` (confronto per chiave, NaN == NaN)."""
+    corrente = corrente.set_index(chiave, drop=False)
+    comuni = corrente.index.intersection(precedente.index)
+    prima = precedente.loc[comuni, corrente.columns].astype(object)
+    dopo = corrente.loc[comuni].astype(object)
+    diverse = ((prima != dopo) & ~(prima.isna() & dopo.isna())).any(axis=1)
+    cambiate = comuni[diverse.to_numpy()].union(corrente.index.difference(precedente.index), sort=False)
+    # Ordine della tabella corrente, così i nuovi giocatori entrano nello stesso ordine
+    return corrente[corrente.index.isin(cambiate)].reset_index(drop=True)
+
+
+def _motivo_ricalcolo(calcolo: Optional[CalcoloIncrementale], df: pd.DataFrame, fonte: str,
+                      chiave: str, regole) -> Optional[str]:
+    """Perché lo stato salvato non si può riusare (None = riusabile)."""
+    if calcolo is None:
+        return "nessuno stato salvato"
+    if calcolo.fonte != fonte or calcolo.chiave != chiave:
+        return "fonte o chiave diverse"
+    if calcolo.origine_regole != regole:
+        return "regole dello score cambiate"
+    if calcolo._fasce != cc.fasce_parametriche():
+        return "fasce di prezzo cambiate"
+    if set(calcolo._df.columns) != set(df.columns):
+        return "colonne diverse"
+    if not calcolo._df.index.isin(df[chiave]).all():
+        # CalcoloIncrementale non gestisce la rimozione di giocatori
+        return "giocatori rimossi"
+    return None
+
+
+def ricalcola(df: pd.DataFrame, fonte: str, regole=None, path: Optional[str] = None,
+              verifica_completa: bool = False) -> pd.DataFrame:
+    """
+    Convenienza e prezzo massimo di `df` (tabella processata) a partire dallo
+    stato dell'esecuzione precedente: applica come delta solo le righe cambiate
+    e salva il nuovo stato. Se lo stato manca o non è compatibile esegue il
+    calcolo completo una volta e lo salva per la prossima esecuzione.
+    """
+    chiave = scegli_chiave(df, fonte)
+    if chiave is None:
+        logger.warning(f"Nessuna chiave univoca per {fonte}: ricalcolo completo senza stato.")
+        calcola = cc.calcola_convenienza_fpedia if fonte == "fpedia" else cc.calcola_convenienza_FSTATS
+        return cc.calcola_prezzo_massimo_consigliato(calcola(df), regole=regole)
+
+    path = path or percorso_stato(fonte)
+    calcolo = carica(path)
+    motivo = _motivo_ricalcolo(calcolo, df, fonte, chiave, regole)
+    if motivo is None:
+        delta = righe_cambiate(calcolo._df, df, chiave)
+        logger.info(f"Ricalcolo incrementale {fonte}: {len(delta)} righe cambiate su {len(df)}.")
+        calcolo.aggiorna(delta)
+    else:
+        logger.info(f"Ricalcolo completo {fonte} ({motivo}).")
+        calcolo = CalcoloIncrementale(df.reset_index(drop=True), fonte, chiave=chiave, regole=regole)
+
+    if verifica_completa:
+        diverse = verifica(calcolo)
+        if diverse:
+            # Vale la pipeline completa: lo stato non è affidabile e si ricostruisce
+            logger.error(f"Ricalcolo incrementale {fonte} diverso dal completo su {diverse}: stato ricostruito.")
+            calcolo = CalcoloIncrementale(calcolo._df.reset_index(drop=True), fonte, chiave=chiave, regole=regole)
+
+    salva(calcolo, path)
+    return calcolo.risultato
+
+
+def verifica(calcolo: CalcoloIncrementale, rtol: float = 1e-9) -> List[str]:
+    """
+    Confronta il risultato incrementale con calcola_convenienza_* +
+    calcola_prezzo_massimo_consigliato sullo stesso dataset.
+    Restituisce le colonne di output che differiscono (lista vuota = identico).
+    """
+    risultato = calcolo.risultato
+    base = risultato.drop(columns=CalcoloIncrementale.COLONNE_OUTPUT)
+    calcola = cc.calcola_convenienza_fpedia if calcolo.fonte == "fpedia" else cc.calcola_convenienza_FSTATS
+    completo = cc.calcola_prezzo_massimo_consigliato(calcola(base), regole=calcolo.regole)
+    if len(completo) != len(risultato):
+        # calcola_convenienza_FSTATS unisce per Nome: con nomi duplicati le righe si moltiplicano
+        return list(CalcoloIncrementale.COLONNE_OUTPUT)
+    diverse = []
+    for col in CalcoloIncrementale.COLONNE_OUTPUT:
+        a = pd.to_numeric(risultato[col], errors="coerce").to_numpy(dtype=float)
+        b = pd.to_numeric(completo[col], errors="coerce").to_numpy(dtype=float)
+        if not np.allclose(a, b, rtol=rtol, atol=rtol, equal_nan=True):
+            diverse.append(col)
+    return diverse
@@ -1,5 +1,7 @@
 # main.py
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from loguru import logger
 import pandas as pd
 
@@ -7,6 +9,252 @@ import data_retriever
 import data_processor
 import convenienza_calculator
 import config
+import incremental_update
+import metrics
+import ranking_server
+import storico
+from exporter import Exporter
+
+
+def record_history(source: str, df: pd.DataFrame):
+    """Adds the day's table to the daily history (a failure never stops the pipeline)."""
+    if not config.STORICO_ATTIVO:
+        return
+    try:
+        storico.registra_fonte(source, df)
+    except Exception as e:
+        logger.error(f"History update failed for {source}: {e}")
+
+
+def compute_indexes(source: str, df_processed: pd.DataFrame, rules) -> pd.DataFrame:
+    """
+    Convenience indexes and max price. With config.INCREMENTAL_UPDATE only the
+    rows changed since the previous run are recomputed (incremental_update.py).
+    """
+    if config.INCREMENTAL_UPDATE:
+        return incremental_update.ricalcola(
+            df_processed, source, regole=rules, verifica_completa=config.INCREMENTAL_VERIFY
+        )
+    if source == "fpedia":
+        df_final = convenienza_calculator.calcola_convenienza_fpedia(df_processed)
+    else:
+        df_final = convenienza_calculator.calcola_convenienza_FSTATS(df_processed)
+    
+    # Calcola il prezzo massimo consigliato
+    return convenienza_calculator.calcola_prezzo_massimo_consigliato(df_final, regole=rules)
+
+
+def run_fpedia_pipeline(exporter: Exporter) -> bool:
+    """
+    FPEDIA chain: retrieve -> process -> score -> price -> export.
+    Returns False when there is no data to process.
+    """
+    if config.REFRESH_STATUS_ONLY:
+        data_retriever.aggiorna_stato_fpedia()
+    else:
+        data_retriever.scrape_fpedia()
+    df_fpedia = data_processor.load_fpedia_dataframe()
+    if df_fpedia.empty:
+        logger.warning("FPEDIA DataFrame is empty. Pipeline skipped.")
+        return False
+
+    logger.info("--- Starting FPEDIA Pipeline ---")
+
+    df_processed = data_processor.process_fpedia_data(df_fpedia)
+    df_final = compute_indexes("fpedia", df_processed, config.REGOLE_SCORE_FPEDIA)
+
+    df_final = df_final.sort_values(by="Convenienza Potenziale", ascending=False)
+
+    # Define a comprehensive and ordered list of columns for the final output
+    output_columns = [
+        # Key Info
+        "Nome",
+        "Ruolo",
+        "Squadra",
+        # Calculated Indexes
+        "Convenienza Potenziale",
+        "Convenienza",
+        "Prezzo Massimo Consigliato",
+        "Punteggio",
+        # Current Season Stats
+        f"Fantamedia anno {config.ANNO_CORRENTE-1}-{config.ANNO_CORRENTE}",
+        f"Presenze campionato corrente",
+        # Previous Season Stats
+        f"Fantamedia anno {config.ANNO_CORRENTE-2}-{config.ANNO_CORRENTE-1}",
+        "Partite giocate",
+        # Qualitative Info
+        "Trend",
+        "Skills",
+        "Consigliato prossima giornata",
+        "Buon investimento",
+        "Resistenza infortuni",
+        "Infortunato",
+        # Legacy
+        f"FM su tot gare {config.ANNO_CORRENTE-1}-{config.ANNO_CORRENTE}",
+        "Presenze previste",
+        "Gol previsti",
+        "Assist previsti",
+        "Ruolo",
+        "Skills",
+        "Buon investimento",
+        "Resistenza infortuni",
+        "Consigliato prossima giornata",
+        "Nuovo acquisto",
+        "Infortunato",
+        "Squadra",
+        "Trend",
+        "Presenze campionato corrente",
+        # Stable id (crosswalk FPEDIA <-> FSTATS)
+        "URL",
+    ]
+    final_columns = [col for col in output_columns if col in df_final.columns]
+
+    output_paths = exporter.submit(df_final[final_columns], "fpedia_analysis")
+    record_history("fpedia", df_final)
+
+    logger.info(f"FPEDIA analysis complete. Exporting to {', '.join(output_paths)}")
+    return True
+
+
+def run_FSTATS_pipeline(exporter: Exporter) -> bool:
+    """
+    FSTATS chain: retrieve -> process -> score -> price -> export.
+    Returns False when there is no data to process.
+    """
+    data_retriever.fetch_FSTATS_data()
+    df_FSTATS = data_processor.load_FSTATS_dataframe()
+    if df_FSTATS.empty:
+        logger.warning("FSTATS DataFrame is empty. Pipeline skipped.")
+        return False
+
+    logger.info("--- Starting FSTATS Pipeline ---")
+
+    df_processed = data_processor.process_FSTATS_data(df_FSTATS)
+    df_final = compute_indexes("fstats", df_processed, config.REGOLE_SCORE_FSTATS)
+
+    df_final = df_final.sort_values(by="Convenienza Potenziale", ascending=False)
+
+    # Define a comprehensive and ordered list of columns for the final output
+    output_columns = [
+        # Key Info
+        "Nome",
+        "Ruolo",
+        "Squadra",
+        # Calculated Indexes
+        "Convenienza Potenziale",
+        "Convenienza",
+        "Prezzo Massimo Consigliato",
+        "fantacalcioFantaindex",
+        # Key Performance Indicators
+        "fanta_avg",
+        "avg",
+        "presences",
+        # Core Stats
+        "goals",
+        "assists",
+        # Potential Stats
+        "xgFromOpenPlays",
+        "xA",
+        # Disciplinary
+        "yellowCards",
+        "redCards",
+        # Legacy
+        "injured",
+        "banned",
+        "mantra_position",
+        "fantacalcio_position",
+        "birth_date",
+        "foot_name",
+        "fantacalcioPlayerId",
+        "fantacalcioTeamName",
+        "appearances",
+        "matchesInStart",
+        "mins_played",
+        "pagella",
+        "fantacalcioRanking",
+        "fantacalcioFantaindex",
+        "fantacalcioPosition",
+        "assists",
+        "goals",
+        "goals90min",
+        "goalsFromOpenPlays",
+        "xgFromOpenPlays",
+        "xgFromOpenPlays/90min",
+        "xA",
+        "xA90min",
+        "redCards",
+        "yellowCards",
+        "successfulPenalties",
+        "penalties",
+        "gkPenaltiesSaved",
+        "gkCleanSheets",
+        "gkConcededGoals",
+        "openPlaysGoalsConceded",
+        "openPlaysXgConceded",
+        "fantamediaPred",
+        "fantamediaPredRoundId",
+        "matchConvocation",
+        "matchesWithGrade",
+        "perc_matchesStarted",
+        "perc_matchesWithGrade",
+        "percMinsPlayed",
+        "expectedFantamediaMean",
+        "External_breakout_Index",
+        "Shot_on_goal_Index",
+        "Offensive_actions_Index",
+        "Pass_forward_accuracy_Index",
+        "Air_challenge_offensive_Index",
+        "Cross_accuracy_Index",
+        "Converge_in_the_center_Index",
+        "Accompany_the_offensive_action_Index",
+        "Offensive_verticalization_Index",
+        "Received_pass_Index",
+        "Attacking_area_Index",
+        "Offensive_field_presence_Index",
+        "Pass_accuracy_Index",
+        "Pass_leading_chances_Index",
+        "Deep_runs_Index",
+        "Defense_solidity_Index",
+        "Set_piece_attack_Index",
+        "Shot_on_target_Index",
+        "Dribbles_successful_Index",
+    ]
+    final_columns = [col for col in output_columns if col in df_final.columns]
+
+    output_paths = exporter.submit(df_final[final_columns], "FSTATS_analysis")
+    record_history("fstats", df_final)
+
+    logger.info(f"FSTATS analysis complete. Exporting to {', '.join(output_paths)}")
+    return True
+
+
+# The two sources are independent until the merger
+PIPELINES = {
+    "FPEDIA": run_fpedia_pipeline,
+    "FSTATS": run_FSTATS_pipeline,
+}
+
+
+def run_chain(name: str, exporter: Exporter = None) -> float:
+    """
+    Runs one source chain and returns its wall time. Without an exporter
+    (worker process) the chain uses its own pool and waits for its exports.
+    """
+    start = time.perf_counter()
+    with metrics.misura(f"pipeline.{name.lower()}"):
+        if exporter is None:
+            with Exporter(config.OUTPUT_DIR, config.OUTPUT_FORMATS, config.EXPORT_WORKERS) as own_exporter:
+                PIPELINES[name](own_exporter)
+        else:
+            PIPELINES[name](exporter)
+    return time.perf_counter() - start
+
+
+def run_chain_worker(name: str) -> tuple:
+    """Worker process entry point: runs the chain and ships its metrics back."""
+    metrics.METRICHE.azzera()
+    wall = run_chain(name)
+    return wall, metrics.METRICHE.esporta()
 
 
 def main():
@@ -14,189 +262,63 @@ def main():
     Main script to run the entire Fantacalcio analysis pipeline.
     It now runs two separate pipelines for FPEDIA and FSTATS,
     generating both performance-based and potential-based convenience indexes.
+    With config.PIPELINE_CONCURRENT the two chains run in separate processes
+    and the merger starts as soon as both have exported their tables.
     """
     os.makedirs(config.DATA_DIR, exist_ok=True)
     os.makedirs(config.OUTPUT_DIR, exist_ok=True)
 
     logger.info("Starting Fantacalcio analysis pipeline...")
+    start = time.perf_counter()
+    cpu_start = time.process_time()
 
-    # 1. Retrieve all data
-    logger.info("Step 1: Retrieving data from all sources...")
-    data_retriever.scrape_fpedia()
-    data_retriever.fetch_FSTATS_data()
-    logger.info("Data retrieval complete.")
+    # Memory profiling needs every stage in this process, one at a time
+    profiling = config.PROFILE_MEMORY
+    if profiling:
+        from memprofile import ProfiloMemoria
 
-    # 2. Load dataframes
-    df_fpedia, df_FSTATS = data_processor.load_dataframes()
+        profile = ProfiloMemoria(top=config.MEMORY_PROFILE_TOP)
+        metrics.METRICHE.profilo = profile
+        profile.avvia()
 
-    # --- Pipeline for FPEDIA ---
-    if not df_fpedia.empty:
-        logger.info("--- Starting FPEDIA Pipeline ---")
+    # Exports run in a background pool while the pipelines go on
+    exporter = Exporter(config.OUTPUT_DIR, config.OUTPUT_FORMATS, 0 if profiling else config.EXPORT_WORKERS)
 
-        df_processed = data_processor.process_fpedia_data(df_fpedia)
-        df_final = convenienza_calculator.calcola_convenienza_fpedia(df_processed)
-        
-        # Calcola il prezzo massimo consigliato
-        df_final = convenienza_calculator.calcola_prezzo_massimo_consigliato(df_final)
-
-        df_final = df_final.sort_values(by="Convenienza Potenziale", ascending=False)
-
-        # Define a comprehensive and ordered list of columns for the final output
-        output_columns = [
-            # Key Info
-            "Nome",
-            "Ruolo",
-            "Squadra",
-            # Calculated Indexes
-            "Convenienza Potenziale",
-            "Convenienza",
-            "Prezzo Massimo Consigliato",
-            "Punteggio",
-            # Current Season Stats
-            f"Fantamedia anno {config.ANNO_CORRENTE-1}-{config.ANNO_CORRENTE}",
-            f"Presenze campionato corrente",
-            # Previous Season Stats
-            f"Fantamedia anno {config.ANNO_CORRENTE-2}-{config.ANNO_CORRENTE-1}",
-            "Partite giocate",
-            # Qualitative Info
-            "Trend",
-            "Skills",
-            "Consigliato prossima giornata",
-            "Buon investimento",
-            "Resistenza infortuni",
-            "Infortunato",
-            # Legacy
-            f"FM su tot gare {config.ANNO_CORRENTE-1}-{config.ANNO_CORRENTE}",
-            "Presenze previste",
-            "Gol previsti",
-            "Assist previsti",
-            "Ruolo",
-            "Skills",
-            "Buon investimento",
-            "Resistenza infortuni",
-            "Consigliato prossima giornata",
-            "Nuovo acquisto",
-            "Infortunato",
-            "Squadra",
-            "Trend",
-            "Presenze campionato corrente",
-        ]
-        final_columns = [col for col in output_columns if col in df_final.columns]
-
-        output_path = os.path.join(config.OUTPUT_DIR, "fpedia_analysis.xlsx")
-        df_final[final_columns].to_excel(output_path, index=False)
-
-        logger.info(f"FPEDIA analysis complete. Results saved to {output_path}")
+    # 1-2. Retrieve, process, score, price and export each source
+    if config.PIPELINE_CONCURRENT and not profiling:
+        failed = []
+        with ProcessPoolExecutor(max_workers=len(PIPELINES)) as pool:
+            futures = {pool.submit(run_chain_worker, name): name for name in PIPELINES}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    wall, chain_metrics = future.result()
+                    metrics.METRICHE.unisci(chain_metrics)
+                    logger.info(f"{name} chain finished in {wall:.1f}s")
+                except Exception as e:
+                    logger.error(f"{name} chain failed: {e}")
+                    failed.append(e)
+        # Same as the sequential path: a failed chain stops the run before the
+        # snapshot and the merger, which would otherwise use the previous tables
+        if failed:
+            exporter.chiudi()
+            raise failed[0]
     else:
-        logger.warning("FPEDIA DataFrame is empty. Pipeline skipped.")
+        for name in PIPELINES:
+            logger.info(f"{name} chain finished in {run_chain(name, exporter):.1f}s")
 
-    # --- Pipeline for FSTATS ---
-    if not df_FSTATS.empty:
-        logger.info("--- Starting FSTATS Pipeline ---")
+    # The merger reads the analysis files: wait for the exports to land
+    exporter.chiudi()
+    logger.info(f"Fantacalcio analysis pipeline finished in {time.perf_counter() - start:.1f}s.")
 
-        df_processed = data_processor.process_FSTATS_data(df_FSTATS)
-        df_final = convenienza_calculator.calcola_convenienza_FSTATS(df_processed)
-        
-        # Calcola il prezzo massimo consigliato
-        df_final = convenienza_calculator.calcola_prezzo_massimo_consigliato(df_final)
-
-        df_final = df_final.sort_values(by="Convenienza Potenziale", ascending=False)
-
-        # Define a comprehensive and ordered list of columns for the final output
-        output_columns = [
-            # Key Info
-            "Nome",
-            "Ruolo",
-            "Squadra",
-            # Calculated Indexes
-            "Convenienza Potenziale",
-            "Convenienza",
-            "Prezzo Massimo Consigliato",
-            "fantacalcioFantaindex",
-            # Key Performance Indicators
-            "fanta_avg",
-            "avg",
-            "presences",
-            # Core Stats
-            "goals",
-            "assists",
-            # Potential Stats
-            "xgFromOpenPlays",
-            "xA",
-            # Disciplinary
-            "yellowCards",
-            "redCards",
-            # Legacy
-            "injured",
-            "banned",
-            "mantra_position",
-            "fantacalcio_position",
-            "birth_date",
-            "foot_name",
-            "fantacalcioPlayerId",
-            "fantacalcioTeamName",
-            "appearances",
-            "matchesInStart",
-            "mins_played",
-            "pagella",
-            "fantacalcioRanking",
-            "fantacalcioFantaindex",
-            "fantacalcioPosition",
-            "assists",
-            "goals",
-            "goals90min",
-            "goalsFromOpenPlays",
-            "xgFromOpenPlays",
-            "xgFromOpenPlays/90min",
-            "xA",
-            "xA90min",
-            "redCards",
-            "yellowCards",
-            "successfulPenalties",
-            "penalties",
-            "gkPenaltiesSaved",
-            "gkCleanSheets",
-            "gkConcededGoals",
-            "openPlaysGoalsConceded",
-            "openPlaysXgConceded",
-            "fantamediaPred",
-            "fantamediaPredRoundId",
-            "matchConvocation",
-            "matchesWithGrade",
-            "perc_matchesStarted",
-            "perc_matchesWithGrade",
-            "percMinsPlayed",
-            "expectedFantamediaMean",
-            "External_breakout_Index",
-            "Shot_on_goal_Index",
-            "Offensive_actions_Index",
-            "Pass_forward_accuracy_Index",
-            "Air_challenge_offensive_Index",
-            "Cross_accuracy_Index",
-            "Converge_in_the_center_Index",
-            "Accompany_the_offensive_action_Index",
-            "Offensive_verticalization_Index",
-            "Received_pass_Index",
-            "Attacking_area_Index",
-            "Offensive_field_presence_Index",
-            "Pass_accuracy_Index",
-            "Pass_leading_chances_Index",
-            "Deep_runs_Index",
-            "Defense_solidity_Index",
-            "Set_piece_attack_Index",
-            "Shot_on_target_Index",
-            "Dribbles_successful_Index",
-        ]
-        final_columns = [col for col in output_columns if col in df_final.columns]
-
-        output_path = os.path.join(config.OUTPUT_DIR, "FSTATS_analysis.xlsx")
-        df_final[final_columns].to_excel(output_path, index=False)
-
-        logger.info(f"FSTATS analysis complete. Results saved to {output_path}")
-    else:
-        logger.warning("FSTATS DataFrame is empty. Pipeline skipped.")
+    # Downstream readers use the fastest format that was exported
+    fast_format = next(f for f in ("parquet", "csv", "jsonl", "xlsx") if f in exporter.formati)
 
-    logger.info("Fantacalcio analysis pipeline finished.")
+    # Publish the new snapshot (the ranking server hot-reloads it)
+    ranking_server.pubblica_snapshot(config.SNAPSHOT_FILE, {
+        "fpedia": exporter.path("fpedia_analysis", fast_format),
+        "fstats": exporter.path("FSTATS_analysis", fast_format),
+    })
     
     # 3. Generate Perfect Merged Analysis
     logger.info("--- Starting Perfect Excel Merger ---")
@@ -204,14 +326,22 @@ def main():
         from perfect_excel_merger import PerfectExcelMerger
         
         merger = PerfectExcelMerger(
-            "data/output/fpedia_analysis.xlsx",
-            "data/output/FSTATS_analysis.xlsx"
+            exporter.path("fpedia_analysis", fast_format),
+            exporter.path("FSTATS_analysis", fast_format),
+            assignment=config.MERGER_ASSIGNMENT,
+            top_k=config.MERGER_TOP_K,
+            partition_by_team=config.MERGER_PARTITION_BY_TEAM,
+            workers=1 if profiling else config.MERGER_WORKERS,
+            crosswalk_file=config.CROSSWALK_CSV,
+            fuzzy_k=config.MERGER_FUZZY_K,
         )
         
-        success = merger.run_perfect("perfect_merged_analysis.xlsx")
+        # xlsx -> single workbook, csv/parquet -> one file per sheet
+        sheets_format = None if config.MERGER_OUTPUT_FORMAT == "xlsx" else config.MERGER_OUTPUT_FORMAT
+        success = merger.run_perfect("perfect_merged_analysis.xlsx", sheets_format=sheets_format)
         
         if success:
-            logger.info("✅ Perfect merged analysis created: data/output/perfect_merged_analysis.xlsx")
+            logger.info("✅ Perfect merged analysis created in data/output (perfect_merged_analysis)")
         else:
             logger.error("❌ Failed to create perfect merged analysis")
             
@@ -219,5 +349,17 @@ def main():
         logger.error(f"❌ Error creating perfect merged analysis: {e}")
 
 
+    # Run report: JSON + Prometheus text file (for regression alerts)
+    metrics.registra("pipeline.total", time.perf_counter() - start, time.process_time() - cpu_start)
+    metrics.METRICHE.scrivi_report(config.METRICS_JSON, config.METRICS_PROM)
+
+    if profiling:
+        profile.ferma()
+        metrics.METRICHE.profilo = None
+        profile.scrivi_report(config.MEMORY_PROFILE_JSON)
+        print(profile.testo())
+    logger.info(f"Total time: {time.perf_counter() - start:.1f}s")
+
+
 if __name__ == "__main__":
     main()
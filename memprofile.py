@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Profilo di memoria per stadio (picco RSS + siti di allocazione tracemalloc).
+
+Si aggancia agli stadi di metrics.py: con un ProfiloMemoria attivo ogni
+`metrics.misura(...)` registra anche, per lo stadio:
+- picco della memoria tracciata da tracemalloc e crescita netta
+- RSS all'inizio/fine e picco RSS (VmHWM, azzerato a ogni stadio tramite
+  /proc/self/clear_refs dove possibile)
+- i siti di allocazione (file:riga) che pesano di più al momento del picco,
+  confrontando con lo stato all'inizio dello stadio
+
+Il momento del picco è approssimato da un thread campionatore che prende
+uno snapshot tracemalloc quando la memoria tracciata supera il massimo già
+visto nello stadio. Gli stadi annidati propagano picco e snapshot al padre.
+Sono profilati solo gli stadi del thread che ha avviato il profilo: la
+modalità va usata con le catene in sequenza (main.py lo fa da sé).
+
+Uso:
+    python memprofile.py            # main.main() completo in modalità profilo
+    python memprofile.py --merger   # solo il merger sui file di analisi esistenti
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+MB = 2 ** 20
+
+# Frame da non attribuire a nessuno stadio (il profilo stesso)
+_ESCLUSI = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>")
+
+
+def _rss_kb(campo: str) -> Optional[int]:
+    """VmRSS / VmHWM da /proc/self/status (None fuori da Linux)."""
+    try:
+        with open("/proc/self/status") as fp:
+            for riga in fp:
+                if riga.startswith(campo + ":"):
+                    return int(riga.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _azzera_picco_rss() -> bool:
+    """Azzera VmHWM (Linux >= 4.0); False se non supportato."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, nome) for nome in _ESCLUSI]
+    )
+
+
+class _Aperto:
+    """Stato di uno stadio in corso."""
+
+    def __init__(self, stadio: str):
+        self.stadio = stadio
+        self.inizio = _snapshot()
+        self.traced_inizio = tracemalloc.get_traced_memory()[0]
+        self.rss_inizio = _rss_kb("VmRSS")
+        self.picco = self.traced_inizio
+        self.picco_rss = self.rss_inizio or 0
+        self.massimo_campionato = self.traced_inizio
+        self.snapshot_picco: Optional[tracemalloc.Snapshot] = None
+
+
+class ProfiloMemoria:
+    """Raccoglie il profilo di memoria degli stadi misurati con metrics."""
+
+    def __init__(self, top: int = 10, intervallo: float = 0.01, soglia: float = 0.05):
+        self.top = top
+        self.intervallo = intervallo
+        self.soglia = soglia
+        self.stadi: Dict[str, dict] = {}
+        self._pila: List[_Aperto] = []
+        self._lock = threading.RLock()
+        self._thread_id: Optional[int] = None
+        self._attivo = False
+        self._rss_azzerabile = False
+
+    # --- ciclo di vita ---------------------------------------------------
+
+    def avvia(self):
+        tracemalloc.start()
+        self._thread_id = threading.get_ident()
+        self._rss_azzerabile = _azzera_picco_rss()
+        self._attivo = True
+        threading.Thread(target=self._campiona, daemon=True).start()
+
+    def ferma(self):
+        self._attivo = False
+        tracemalloc.stop()
+
+    def _campiona(self):
+        """Snapshot vicino al picco: quando la memoria supera il massimo visto."""
+        while self._attivo:
+            time.sleep(self.intervallo)
+            with self._lock:
+                if not self._pila or not tracemalloc.is_tracing():
+                    continue
+                corrente = self._pila[-1]
+                traced = tracemalloc.get_traced_memory()[0]
+                if traced > corrente.massimo_campionato * (1 + self.soglia) + MB:
+                    corrente.snapshot_picco = _snapshot()
+                    corrente.massimo_campionato = traced
+
+    # --- stadi (chiamati da metrics.misura) --------------------------------
+
+    def inizio(self, stadio: str) -> Optional[_Aperto]:
+        if not self._attivo or threading.get_ident() != self._thread_id:
+            return None
+        with self._lock:
+            if self._pila:
+                genitore = self._pila[-1]
+                genitore.picco = max(genitore.picco, tracemalloc.get_traced_memory()[1])
+                genitore.picco_rss = max(genitore.picco_rss, _rss_kb("VmHWM") or 0)
+            tracemalloc.reset_peak()
+            if self._rss_azzerabile:
+                _azzera_picco_rss()
+            aperto = _Aperto(stadio)
+            self._pila.append(aperto)
+            return aperto
+
+    def fine(self, aperto: Optional[_Aperto]):
+        if aperto is None:
+            return
+        with self._lock:
+            traced, picco = tracemalloc.get_traced_memory()
+            aperto.picco = max(aperto.picco, picco)
+            aperto.picco_rss = max(aperto.picco_rss, _rss_kb("VmHWM") or 0)
+            rss_fine = _rss_kb("VmRSS")
+            if aperto.snapshot_picco is None:
+                aperto.snapshot_picco = _snapshot()
+            self._pila.remove(aperto)
+
+            siti = []
+            for stat in aperto.snapshot_picco.compare_to(aperto.inizio, "lineno")[:self.top]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                siti.append({
+                    "sito": f"{frame.filename}:{frame.lineno}",
+                    "mb": round(stat.size_diff / MB, 3),
+                    "blocchi": stat.count_diff,
+                })
+            misura = {
+                "chiamate": 1,
+                "picco_tracemalloc_mb": round((aperto.picco - aperto.traced_inizio) / MB, 3),
+                "crescita_netta_mb": round((traced - aperto.traced_inizio) / MB, 3),
+                "rss_inizio_mb": round((aperto.rss_inizio or 0) / 1024, 1),
+                "rss_fine_mb": round((rss_fine or 0) / 1024, 1),
+                "picco_rss_mb": round(aperto.picco_rss / 1024, 1),
+                "siti": siti,
+            }
+            self._accumula(aperto.stadio, misura)
+
+            # Il padre eredita picco e snapshot del figlio se più alti
+            if self._pila:
+                genitore = self._pila[-1]
+                genitore.picco = max(genitore.picco, aperto.picco)
+                genitore.picco_rss = max(genitore.picco_rss, aperto.picco_rss)
+                if aperto.massimo_campionato > genitore.massimo_campionato:
+                    genitore.massimo_campionato = aperto.massimo_campionato
+                    genitore.snapshot_picco = aperto.snapshot_picco
+            tracemalloc.reset_peak()
+
+    def _accumula(self, stadio: str, misura: dict):
+        """Per stadi ripetuti tiene la chiamata con il picco più alto."""
+        precedente = self.stadi.get(stadio)
+        if precedente is None:
+            self.stadi[stadio] = misura
+            return
+        chiamate = precedente["chiamate"] + 1
+        if misura["picco_tracemalloc_mb"] > precedente["picco_tracemalloc_mb"]:
+            self.stadi[stadio] = misura
+        self.stadi[stadio]["chiamate"] = chiamate
+
+    # --- report ----------------------------------------------------------
+
+    def classifica_siti(self) -> List[dict]:
+        """Siti di allocazione ordinati per peso massimo al picco di uno stadio."""
+        migliori: Dict[str, dict] = {}
+        for stadio, misura in self.stadi.items():
+            for sito in misura["siti"]:
+                voce = migliori.get(sito["sito"])
+                if voce is None or sito["mb"] > voce["mb"]:
+                    migliori[sito["sito"]] = dict(sito, stadio=stadio)
+        return sorted(migliori.values(), key=lambda s: -s["mb"])
+
+    def report(self) -> dict:
+        stadi = sorted(self.stadi.items(), key=lambda kv: -kv[1]["picco_tracemalloc_mb"])
+        return {
+            "generato": datetime.now().isoformat(timespec="seconds"),
+            "picco_rss_azzerabile": self._rss_azzerabile,
+            "stadi": dict(stadi),
+            "siti": self.classifica_siti()[:self.top * 3],
+        }
+
+    def testo(self) -> str:
+        """Report leggibile: stadi per picco, poi i siti di allocazione."""
+        righe = ["PROFILO MEMORIA - stadi per picco tracemalloc",
+                 f"{'stadio':<36} {'picco MB':>9} {'netto MB':>9} {'picco RSS MB':>13}"]
+        for stadio, m in sorted(self.stadi.items(), key=lambda kv: -kv[1]["picco_tracemalloc_mb"]):
+            righe.append(f"{stadio:<36} {m['picco_tracemalloc_mb']:>9.1f} {m['crescita_netta_mb']:>9.1f} "
+                         f"{m['picco_rss_mb']:>13.1f}")
+        righe.append("")
+        righe.append("Siti di allocazione al picco")
+        for i, sito in enumerate(self.classifica_siti()[:self.top * 2], 1):
+            righe.append(f"{i:>3}. {sito['mb']:>8.2f} MB  {sito['blocchi']:>8} blocchi  "
+                         f"[{sito['stadio']}] {sito['sito']}")
+        return "\n".join(righe)
+
+    def scrivi_report(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.report(), fp, indent=2, ensure_ascii=False)
+        logger.info(f"Profilo memoria salvato: {path}")
+
+
+def _profila_merger():
+    """Solo il merger, sui file di analisi già presenti."""
+    import config
+    import metrics
+    from perfect_excel_merger import PerfectExcelMerger
+
+    profilo = ProfiloMemoria(top=config.MEMORY_PROFILE_TOP)
+    metrics.METRICHE.profilo = profilo
+    profilo.avvia()
+    merger = PerfectExcelMerger(
+        os.path.join(config.OUTPUT_DIR, "fpedia_analysis.xlsx"),
+        os.path.join(config.OUTPUT_DIR, "FSTATS_analysis.xlsx"),
+        assignment=config.MERGER_ASSIGNMENT,
+        top_k=config.MERGER_TOP_K,
+        crosswalk_file=config.CROSSWALK_CSV,
+        fuzzy_k=config.MERGER_FUZZY_K,
+    )
+    merger.run_perfect("perfect_merged_analysis.xlsx")
+    profilo.ferma()
+    metrics.METRICHE.profilo = None
+    profilo.scrivi_report(config.MEMORY_PROFILE_JSON)
+    print(profilo.testo())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profilo di memoria per stadio")
+    parser.add_argument("--merger", action="store_true", help="profila solo il merger")
+    args = parser.parse_args()
+
+    if args.merger:
+        _profila_merger()
+    else:
+        import config
+        import main as pipeline
+
+        config.PROFILE_MEMORY = True
+        pipeline.main()
+
+
+if __name__ == "__main__":
+    main()
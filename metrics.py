@@ -0,0 +1,180 @@
+# metrics.py
+"""
+Strumentazione della pipeline: tempi per stadio, contatori e report finale.
+
+Ogni stadio (data_retriever.fetch, data_processor.process_fpedia,
+convenienza.prezzo, merger.matching, ...) accumula chiamate, tempo wall,
+tempo CPU del thread e righe prodotte. I contatori con etichette coprono
+richieste HTTP (per status), byte scaricati e confronti del matcher.
+
+    with metrics.misura("merger.matching") as m:
+        ...
+        m["righe"] = len(matches)
+
+    @metrics.cronometra("convenienza.fpedia")
+    def calcola(...): ...          # righe = len(risultato) se è una tabella
+
+Le metriche raccolte in un processo figlio si riportano nel padre con
+`esporta()` / `unisci()`. A fine esecuzione `scrivi_report` salva un JSON e
+un file in formato testo Prometheus (per node_exporter textfile collector).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+PREFISSO = "fantacalcio"
+
+# Campi accumulati per ogni stadio -> (metrica Prometheus, descrizione)
+CAMPI_STADIO = {
+    "chiamate": ("stage_calls_total", "Numero di esecuzioni dello stadio"),
+    "wall_s": ("stage_wall_seconds_total", "Tempo wall dello stadio"),
+    "cpu_s": ("stage_cpu_seconds_total", "Tempo CPU dello stadio"),
+    "righe": ("stage_rows_total", "Righe prodotte dallo stadio"),
+}
+
+
+def _righe(risultato) -> int:
+    """Righe di un risultato (DataFrame, lista, ...), 0 se non misurabile."""
+    try:
+        return len(risultato)
+    except TypeError:
+        return 0
+
+
+def _escape(valore) -> str:
+    return str(valore).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metriche:
+    """Registro thread-safe di stadi e contatori."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stadi: Dict[str, Dict[str, float]] = {}
+        self.contatori: Dict[tuple, float] = {}
+        # memprofile.ProfiloMemoria attivo (modalità profilo), altrimenti None
+        self.profilo = None
+
+    def azzera(self):
+        with self._lock:
+            self.stadi.clear()
+            self.contatori.clear()
+
+    def registra(self, stadio: str, wall: float, cpu: float = 0.0, chiamate: int = 1, righe: int = 0):
+        """Aggiunge una misura (anche presa altrove, es. in un processo worker)."""
+        with self._lock:
+            voce = self.stadi.setdefault(stadio, dict.fromkeys(CAMPI_STADIO, 0))
+            voce["chiamate"] += chiamate
+            voce["wall_s"] += wall
+            voce["cpu_s"] += cpu
+            voce["righe"] += righe
+
+    @contextmanager
+    def misura(self, stadio: str):
+        """Misura il blocco; il dizionario restituito accetta 'righe'."""
+        info = {"righe": 0}
+        profilo = self.profilo
+        aperto = profilo.inizio(stadio) if profilo is not None else None
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield info
+        finally:
+            self.registra(stadio, time.perf_counter() - wall, time.thread_time() - cpu,
+                          righe=int(info["righe"] or 0))
+            if aperto is not None:
+                profilo.fine(aperto)
+
+    def cronometra(self, stadio: str):
+        """Decoratore: misura ogni chiamata, righe = len(risultato)."""
+        def decoratore(funzione):
+            @functools.wraps(funzione)
+            def wrapper(*args, **kwargs):
+                with self.misura(stadio) as info:
+                    risultato = funzione(*args, **kwargs)
+                    info["righe"] = _righe(risultato)
+                return risultato
+            return wrapper
+        return decoratore
+
+    def incrementa(self, nome: str, valore: float = 1, **etichette):
+        chiave = (nome, tuple(sorted((k, str(v)) for k, v in etichette.items())))
+        with self._lock:
+            self.contatori[chiave] = self.contatori.get(chiave, 0) + valore
+
+    def registra_http(self, response, fonte: str = "", ricevuti: Optional[int] = None):
+        """
+        Richiesta HTTP completata: conteggio per status e byte ricevuti
+        (`ricevuti` per le risposte in streaming lette solo in parte).
+        """
+        self.incrementa("http_requests", fonte=fonte, status=response.status_code)
+        if ricevuti is None:
+            ricevuti = len(response.content or b"")
+        self.incrementa("http_response_bytes", ricevuti, fonte=fonte)
+
+    def esporta(self) -> dict:
+        """Stato serializzabile (per il report o per il processo padre)."""
+        with self._lock:
+            return {
+                "stadi": {nome: dict(voce) for nome, voce in self.stadi.items()},
+                "contatori": [
+                    {"nome": nome, "etichette": dict(etichette), "valore": valore}
+                    for (nome, etichette), valore in self.contatori.items()
+                ],
+            }
+
+    def unisci(self, dati: dict):
+        """Somma le metriche esportate da un altro processo."""
+        for stadio, voce in dati.get("stadi", {}).items():
+            self.registra(stadio, voce["wall_s"], voce["cpu_s"], voce["chiamate"], voce["righe"])
+        for contatore in dati.get("contatori", []):
+            self.incrementa(contatore["nome"], contatore["valore"], **contatore["etichette"])
+
+    def prometheus(self) -> str:
+        """Metriche in formato testo Prometheus."""
+        dati = self.esporta()
+        righe = []
+        for campo, (metrica, descrizione) in CAMPI_STADIO.items():
+            righe.append(f"# HELP {PREFISSO}_{metrica} {descrizione}")
+            righe.append(f"# TYPE {PREFISSO}_{metrica} counter")
+            for stadio in sorted(dati["stadi"]):
+                righe.append(f'{PREFISSO}_{metrica}{{stage="{_escape(stadio)}"}} {dati["stadi"][stadio][campo]}')
+        per_nome: Dict[str, list] = {}
+        for contatore in dati["contatori"]:
+            per_nome.setdefault(contatore["nome"], []).append(contatore)
+        for nome in sorted(per_nome):
+            righe.append(f"# TYPE {PREFISSO}_{nome}_total counter")
+            for contatore in sorted(per_nome[nome], key=lambda c: sorted(c["etichette"].items())):
+                etichette = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(contatore["etichette"].items()))
+                etichette = f"{{{etichette}}}" if etichette else ""
+                righe.append(f"{PREFISSO}_{nome}_total{etichette} {contatore['valore']}")
+        return "\n".join(righe) + "\n"
+
+    def scrivi_report(self, json_path: str, prom_path: Optional[str] = None, **extra):
+        """Scrive il report JSON (più eventuali campi extra) e il file Prometheus."""
+        report = {"generato": datetime.now().isoformat(timespec="seconds"), **extra, **self.esporta()}
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as fp:
+            json.dump(report, fp, indent=2, ensure_ascii=False)
+        if prom_path:
+            # Scrittura atomica: il collector non legge mai un file a metà
+            tmp = f"{prom_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fp:
+                fp.write(self.prometheus())
+            os.replace(tmp, prom_path)
+        logger.info(f"Report metriche salvato: {json_path}" + (f", {prom_path}" if prom_path else ""))
+
+
+# Registro del processo e scorciatoie
+METRICHE = Metriche()
+misura = METRICHE.misura
+cronometra = METRICHE.cronometra
+registra = METRICHE.registra
+incrementa = METRICHE.incrementa
+registra_http = METRICHE.registra_http
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Indice approssimato sui nomi giocatore: trigrammi di caratteri + chiave fonetica.
+
+Serve a recuperare in pochi microsecondi i k candidati più simili a un nome
+che non condivide varianti con nessuno (traslitterazioni, doppi cognomi,
+soprannomi): solo quei k vengono poi valutati dagli scorer costosi.
+
+La similarità di ranking è il coefficiente di Dice sui trigrammi più un bonus
+per le parole con la stessa chiave fonetica. Non è lo score finale del
+matcher, serve solo a ordinare i candidati.
+"""
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Riscritture fonetiche, applicate in ordine su nomi già minuscoli e senza
+# accenti. Le sostituzioni sono maiuscole così le regole successive non le toccano.
+_REGOLE_FONETICHE = [
+    (re.compile(r"tsch|tch|sch(?=[eiy])|sc(?=[eiy])|sh"), "X"),   # sci/sce, shevchenko, tch
+    (re.compile(r"c(?=[eiy])|ch$|c$|cz|ts|tz|zz|z"), "C"),        # ci/ce, -vić/-vich, cz, zz
+    (re.compile(r"ch|ck|cq|qu|q|k|c"), "K"),                      # ch/k/q duri
+    (re.compile(r"gh(?=[eiy])|gu(?=[eiy])"), "G"),
+    (re.compile(r"g(?=[eiy])|dj|dz|j"), "J"),
+    (re.compile(r"gn|ny|nj"), "N"),
+    (re.compile(r"gli|lj|ll"), "L"),
+    (re.compile(r"ph"), "F"),
+    (re.compile(r"w"), "V"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"y"), "i"),
+]
+_VOCALI = re.compile(r"[aeiou]")
+_DOPPIE = re.compile(r"(.)\1+")
+
+
+def phonetic_key(word: str) -> str:
+    """
+    Chiave fonetica di una parola, pensata per nomi italiani e stranieri:
+    unifica grafie equivalenti (ch/k/q, sc/sh, gn/ny, ll/lj, -vic/-vich,
+    w/v, ph/f), toglie le vocali dopo la prima lettera e le doppie.
+    """
+    if not word:
+        return ""
+    key = word.lower()
+    for pattern, replacement in _REGOLE_FONETICHE:
+        key = pattern.sub(replacement, key)
+    if not key:
+        return ""
+    key = (key[0] + _VOCALI.sub("", key[1:])).lower()
+    return _DOPPIE.sub(r"\1", key)
+
+
+def trigrams(name: str) -> set:
+    """Trigrammi di caratteri del nome (con padding ai bordi di ogni parola)"""
+    grams = set()
+    for word in name.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameNgramIndex:
+    """
+    Indice invertito trigramma -> id e chiave fonetica -> id su nomi già
+    normalizzati (es. con ultra_clean_name).
+    """
+
+    def __init__(self, names: Sequence[str], phonetic_weight: float = 0.3):
+        self.names = list(names)
+        self.phonetic_weight = phonetic_weight
+        self.gram_counts: List[int] = []
+        self.by_gram: Dict[str, List[int]] = {}
+        self.by_phonetic: Dict[str, List[int]] = {}
+
+        for name_id, name in enumerate(self.names):
+            grams = trigrams(name)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.by_gram.setdefault(gram, []).append(name_id)
+            for key in {phonetic_key(word) for word in name.split()}:
+                if key:
+                    self.by_phonetic.setdefault(key, []).append(name_id)
+
+    def similarities(self, name: str) -> Dict[int, float]:
+        """Similarità di ranking verso tutti i nomi che condividono qualcosa"""
+        grams = trigrams(name)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for name_id in self.by_gram.get(gram, ()):
+                shared[name_id] = shared.get(name_id, 0) + 1
+
+        n_grams = len(grams)
+        gram_counts = self.gram_counts
+        scores = {
+            name_id: 2 * count / (n_grams + gram_counts[name_id])
+            for name_id, count in shared.items()
+        }
+
+        keys = {phonetic_key(word) for word in name.split()} - {""}
+        if keys and self.phonetic_weight:
+            bonus = self.phonetic_weight / len(keys)
+            for key in keys:
+                for name_id in self.by_phonetic.get(key, ()):
+                    scores[name_id] = scores.get(name_id, 0.0) + bonus
+        return scores
+
+    def query(self, name: str, k: int = 10,
+              allowed: Optional[Sequence[bool]] = None,
+              exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """
+        I k nomi più simili come lista (id, similarità), in ordine decrescente
+        (a parità, id crescente). allowed[id] = False e exclude li escludono.
+        """
+        scores = self.similarities(name)
+        excluded = set(exclude)
+        ranked = heapq.nsmallest(k, (
+            (-score, name_id) for name_id, score in scores.items()
+            if name_id not in excluded and (allowed is None or allowed[name_id])
+        ))
+        return [(name_id, -neg_score) for neg_score, name_id in ranked]
@@ -3,14 +3,27 @@
 Perfect Excel Merger - Garantisce 100% copertura del file più piccolo
 """
 
+import os
 import pandas as pd
 import numpy as np
 import unicodedata
 import re
 import json
-from typing import Dict, List, Tuple, Set, Optional
+import heapq
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Set, Optional
 import logging
 
+from openpyxl import Workbook
+
+from assignment import max_weight_matching
+from crosswalk import Crosswalk, fpedia_slug, fstats_key
+from edit_distance import levenshtein_ratio, levenshtein_ratios
+from exporter import leggi_tabella
+import metrics
+from name_index import NameNgramIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,8 +76,31 @@ class SuperPlayerMatcher:
             'vlasic': 'nikola',
             'baturina': 'martin',
         }
+        
+        # Cache di normalizzazione per-run: gli stessi ~1200 nomi/squadre vengono
+        # confrontati centinaia di migliaia di volte
+        self._clean_cache: Dict[str, str] = {}
+        self._team_cache: Dict[str, str] = {}
+        self._team_sim_cache: Dict[Tuple[str, str], float] = {}
+        self._variants_cache: Dict[str, frozenset] = {}
+    
+    def clear_caches(self):
+        """Svuota le cache (da chiamare se si modificano alias o team_aliases)"""
+        self._clean_cache.clear()
+        self._team_cache.clear()
+        self._team_sim_cache.clear()
+        self._variants_cache.clear()
     
     def ultra_clean_name(self, name: str) -> str:
+        """Pulizia ultra-aggressiva del nome (memoizzata)"""
+        if not isinstance(name, str):
+            return self._ultra_clean_name(name)
+        cleaned = self._clean_cache.get(name)
+        if cleaned is None:
+            cleaned = self._clean_cache[name] = self._ultra_clean_name(name)
+        return cleaned
+    
+    def _ultra_clean_name(self, name: str) -> str:
         """Pulizia ultra-aggressiva del nome"""
         if not name or pd.isna(name):
             return ""
@@ -90,6 +126,15 @@ class SuperPlayerMatcher:
         return ' '.join(words)
     
     def extract_team_name_from_json(self, team_data: str) -> str:
+        """Estrae il nome della squadra da formato JSON (memoizzato)"""
+        if not isinstance(team_data, str):
+            return self._extract_team_name_from_json(team_data)
+        team = self._team_cache.get(team_data)
+        if team is None:
+            team = self._team_cache[team_data] = self._extract_team_name_from_json(team_data)
+        return team
+    
+    def _extract_team_name_from_json(self, team_data: str) -> str:
         """Estrae il nome della squadra da formato JSON"""
         if not team_data or pd.isna(team_data):
             return ""
@@ -120,10 +165,39 @@ class SuperPlayerMatcher:
         return ""
     
     def calculate_team_similarity(self, team1: str, team2: str) -> float:
-        """Calcola similarità tra squadre"""
+        """Calcola similarità tra squadre (lookup nella tabella squadra x squadra)"""
         clean1 = self.extract_team_name_from_json(team1)
         clean2 = self.extract_team_name_from_json(team2)
         
+        key = (clean1, clean2)
+        similarity = self._team_sim_cache.get(key)
+        if similarity is None:
+            similarity = self._team_sim_cache[key] = self._clean_team_similarity(clean1, clean2)
+        return similarity
+    
+    def build_team_similarity_table(self, teams) -> Dict[Tuple[str, str], float]:
+        """
+        Precalcola la similarità tra tutte le squadre distinte (es. 20x20 per la
+        Serie A) nella cache usata da calculate_team_similarity e la restituisce.
+        """
+        keys = {self.extract_team_name_from_json(t) for t in teams if isinstance(t, str)}
+        cache = self._team_sim_cache
+        for clean1 in keys:
+            for clean2 in keys:
+                if (clean1, clean2) not in cache:
+                    cache[(clean1, clean2)] = self._clean_team_similarity(clean1, clean2)
+        return cache
+    
+    def canonical_team(self, team_data: str) -> str:
+        """Chiave squadra canonica: gruppo di alias se presente, altrimenti nome normalizzato"""
+        clean = self.extract_team_name_from_json(team_data)
+        for canonical, aliases in self.team_aliases.items():
+            if clean in aliases:
+                return canonical
+        return clean
+    
+    def _clean_team_similarity(self, clean1: str, clean2: str) -> float:
+        """Similarità tra due nomi di squadra già normalizzati"""
         if not clean1 or not clean2:
             return 0.0
         
@@ -239,7 +313,16 @@ class PerfectPlayerMatcher(SuperPlayerMatcher):
             'baturina': 'martin',
         })
     
-    def get_ultra_variants(self, name: str) -> Set[str]:
+    def get_ultra_variants(self, name: str) -> frozenset:
+        """Genera TUTTE le possibili varianti di un nome (memoizzato)"""
+        if not isinstance(name, str):
+            return frozenset(self._get_ultra_variants(name))
+        variants = self._variants_cache.get(name)
+        if variants is None:
+            variants = self._variants_cache[name] = frozenset(self._get_ultra_variants(name))
+        return variants
+    
+    def _get_ultra_variants(self, name: str) -> Set[str]:
         """Genera TUTTE le possibili varianti di un nome"""
         if not name:
             return set()
@@ -298,28 +381,36 @@ class PerfectPlayerMatcher(SuperPlayerMatcher):
         if not clean1 or not clean2:
             return 0.0
         
-        # Levenshtein distance semplificata
-        def levenshtein_ratio(s1, s2):
-            if len(s1) < len(s2):
-                return levenshtein_ratio(s2, s1)
-            
-            if len(s2) == 0:
-                return 0.0
-            
-            previous_row = list(range(len(s2) + 1))
-            for i, c1 in enumerate(s1):
-                current_row = [i + 1]
-                for j, c2 in enumerate(s2):
-                    insertions = previous_row[j + 1] + 1
-                    deletions = current_row[j] + 1
-                    substitutions = previous_row[j] + (c1 != c2)
-                    current_row.append(min(insertions, deletions, substitutions))
-                previous_row = current_row
+        # Levenshtein bit-parallela (stesso rapporto della versione a matrice)
+        return levenshtein_ratio(clean1, clean2)
+    
+    def score_candidate(self, target_name: str, target_variants: Set[str], target_team: str,
+                        candidate_name: str, candidate_variants: Set[str], candidate_team: str,
+                        fuzzy: Optional[float] = None) -> float:
+        """
+        Score di una coppia target/candidato (varianti comuni o fuzzy + bonus squadra).
+        fuzzy permette di passare una similarità già calcolata in batch.
+        """
+        
+        # Score basato su varianti comuni
+        common = target_variants.intersection(candidate_variants)
+        if common:
+            max_common_len = max(len(v) for v in common)
+            variant_score = len(common) / len(target_variants.union(candidate_variants))
+            length_bonus = min(max_common_len / 15, 0.5)
             
-            max_len = max(len(s1), len(s2))
-            return 1 - (previous_row[-1] / max_len) if max_len > 0 else 0.0
+            total_score = variant_score + length_bonus
+        else:
+            # Fallback su fuzzy matching
+            if fuzzy is None:
+                fuzzy = self.calculate_fuzzy_similarity(target_name, candidate_name)
+            total_score = fuzzy * 0.8
         
-        return levenshtein_ratio(clean1, clean2)
+        # Bonus squadra
+        team_sim = self.calculate_team_similarity(target_team, candidate_team)
+        total_score += team_sim * self.team_weight
+        
+        return total_score
     
     def find_best_match_aggressive(self, target_name: str, target_team: str,
                                  candidates: List[Tuple[str, str]]) -> Optional[Tuple[str, str, float]]:
@@ -332,22 +423,8 @@ class PerfectPlayerMatcher(SuperPlayerMatcher):
         
         for candidate_name, candidate_team in candidates:
             candidate_variants = self.get_ultra_variants(candidate_name)
-            
-            # Score basato su varianti comuni
-            common = target_variants.intersection(candidate_variants)
-            if common:
-                max_common_len = max(len(v) for v in common)
-                variant_score = len(common) / len(target_variants.union(candidate_variants))
-                length_bonus = min(max_common_len / 15, 0.5)
-                
-                total_score = variant_score + length_bonus
-            else:
-                # Fallback su fuzzy matching
-                total_score = self.calculate_fuzzy_similarity(target_name, candidate_name) * 0.8
-            
-            # Bonus squadra
-            team_sim = self.calculate_team_similarity(target_team, candidate_team)
-            total_score += team_sim * self.team_weight
+            total_score = self.score_candidate(target_name, target_variants, target_team,
+                                               candidate_name, candidate_variants, candidate_team)
             
             # Aggiorna best match
             if total_score > best_score:
@@ -355,21 +432,372 @@ class PerfectPlayerMatcher(SuperPlayerMatcher):
                 best_candidate = (candidate_name, candidate_team, total_score)
         
         return best_candidate
+    
+    def find_best_match_indexed(self, target_name: str, target_team: str,
+                                index: 'CandidateBlockIndex') -> Optional[Tuple[int, float]]:
+        """
+        Come find_best_match_aggressive, ma sui candidati ancora disponibili di un
+        CandidateBlockIndex: restituisce (id candidato, score) o None.
+        
+        Vengono valutati prima i candidati del blocco (varianti in comune o squadra
+        compatibile). Gli altri possono ottenere al massimo fuzzy * 0.8, quindi
+        vengono valutati solo se il limite superiore dato dalla differenza di
+        lunghezza dei nomi non esclude che battano il migliore trovato.
+        Il risultato è identico alla scansione completa (a parità di score vince
+        il candidato che viene prima nel file). Se l'indice ha fuzzy_k, fuori
+        blocco vengono valutati solo i candidati dell'indice trigrammi/fonetico.
+        """
+        target_variants = self.get_ultra_variants(target_name)
+        block = index.block(target_variants, target_team)
+        
+        best_id = None
+        best_score = 0.0
+        
+        def consider(cand_id, fuzzy=None):
+            nonlocal best_id, best_score
+            candidate_name, candidate_team = index.candidates[cand_id]
+            total_score = self.score_candidate(target_name, target_variants, target_team,
+                                               candidate_name, index.variants[cand_id], candidate_team,
+                                               fuzzy=fuzzy)
+            index.comparisons += 1
+            if total_score > best_score or (total_score == best_score and best_id is not None
+                                            and cand_id < best_id):
+                best_id, best_score = cand_id, total_score
+        
+        for cand_id in sorted(block):
+            consider(cand_id)
+        
+        # Fallback: scansione dei candidati fuori blocco (fuzzy, più il bonus
+        # squadra solo per le squadre troppo grandi per fare da blocco)
+        team_bonus = index.unblocked_team_bonus(target_team)
+        max_bonus = max(team_bonus.values(), default=0.0)
+        if best_score < 0.8 + max_bonus:
+            target_clean = self.ultra_clean_name(target_name)
+            target_len = len(target_clean)
+            survivors = []
+            for cand_id in index.fuzzy_pool(target_clean, block):
+                cand_len = index.clean_lengths[cand_id]
+                max_len = max(target_len, cand_len)
+                if max_len == 0:
+                    continue
+                upper_bound = ((1 - (abs(target_len - cand_len) / max_len)) * 0.8
+                               + team_bonus.get(index.team_keys[cand_id], 0.0))
+                if upper_bound < best_score:
+                    continue
+                survivors.append(cand_id)
+            
+            # Distanze one-vs-many con cutoff: sotto min_ratio nessuno può battere
+            # il migliore (margine per gli arrotondamenti, il confronto finale è esatto)
+            min_ratio = max((best_score - max_bonus) / 0.8 - 1e-9, 0.0)
+            ratios = levenshtein_ratios(
+                target_clean,
+                [self.ultra_clean_name(index.candidates[cand_id][0]) for cand_id in survivors],
+                min_ratio=min_ratio if min_ratio > 0 else None,
+            )
+            for cand_id, ratio in zip(survivors, ratios):
+                if ratio == 0.0 and min_ratio > 0:
+                    continue
+                consider(cand_id, fuzzy=ratio)
+        
+        if best_id is None:
+            return None
+        return best_id, best_score
+    
+    def top_k_candidates(self, target_name: str, target_team: str,
+                         index: 'CandidateBlockIndex', k: int = 5) -> List[Tuple[int, float]]:
+        """
+        I migliori k candidati disponibili, come lista (id, score) ordinata per
+        score decrescente (a parità, id crescente).
+        
+        Come in find_best_match_indexed i candidati fuori blocco (al massimo
+        fuzzy * 0.8) vengono cercati solo se il blocco non offre uno score
+        >= 0.8, con la soglia data dal k-esimo score: il primo della lista
+        coincide sempre con il risultato di find_best_match_indexed.
+        """
+        target_variants = self.get_ultra_variants(target_name)
+        block = index.block(target_variants, target_team)
+        
+        # Min-heap sugli ultimi k: (score, -id) così il peggiore è in cima
+        top: List[Tuple[float, int]] = []
+        
+        def consider(cand_id, fuzzy=None):
+            candidate_name, candidate_team = index.candidates[cand_id]
+            total_score = self.score_candidate(target_name, target_variants, target_team,
+                                               candidate_name, index.variants[cand_id], candidate_team,
+                                               fuzzy=fuzzy)
+            index.comparisons += 1
+            if total_score <= 0:
+                return
+            item = (total_score, -cand_id)
+            if len(top) < k:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+        
+        def threshold():
+            return top[0][0] if len(top) == k else 0.0
+        
+        for cand_id in sorted(block):
+            consider(cand_id)
+        
+        # Fuori blocco lo score massimo è fuzzy * 0.8 (più il bonus delle squadre non bloccate)
+        team_bonus = index.unblocked_team_bonus(target_team)
+        max_bonus = max(team_bonus.values(), default=0.0)
+        if not top or max(top)[0] < 0.8 + max_bonus:
+            target_clean = self.ultra_clean_name(target_name)
+            target_len = len(target_clean)
+            survivors = []
+            for cand_id in index.fuzzy_pool(target_clean, block):
+                cand_len = index.clean_lengths[cand_id]
+                max_len = max(target_len, cand_len)
+                if max_len == 0:
+                    continue
+                if ((1 - (abs(target_len - cand_len) / max_len)) * 0.8
+                        + team_bonus.get(index.team_keys[cand_id], 0.0)) < threshold():
+                    continue
+                survivors.append(cand_id)
+            
+            min_ratio = max((threshold() - max_bonus) / 0.8 - 1e-9, 0.0)
+            ratios = levenshtein_ratios(
+                target_clean,
+                [self.ultra_clean_name(index.candidates[cand_id][0]) for cand_id in survivors],
+                min_ratio=min_ratio if min_ratio > 0 else None,
+            )
+            for cand_id, ratio in zip(survivors, ratios):
+                if ratio == 0.0:
+                    continue
+                consider(cand_id, fuzzy=ratio)
+        
+        return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
+
+
+class CandidateBlockIndex:
+    """
+    Indice invertito sui candidati del file più grande: variante del nome -> id
+    e squadra normalizzata -> id. Limita i confronti ai candidati che
+    condividono un blocco con il target.
+    
+    Una squadra con più di team_block_max candidati (più stagioni o campionati
+    nello stesso file) non fa da blocco: altrimenti ogni target verrebbe
+    confrontato con tutta la rosa e il matching diventerebbe quadratico. I suoi
+    candidati restano raggiungibili dal fallback fuori blocco, che ne tiene
+    conto nel limite superiore dello score (bonus squadra).
+    """
+    
+    # Alla scala di una stagione di Serie A (~30 per squadra) tutte le squadre fanno da blocco
+    TEAM_BLOCK_MAX = 64
+    
+    def __init__(self, matcher: PerfectPlayerMatcher, candidates: List[Tuple[str, str]],
+                 use_blocking: bool = True, fuzzy_k: Optional[int] = None,
+                 team_block_max: int = TEAM_BLOCK_MAX):
+        self.matcher = matcher
+        self.candidates = candidates
+        self.use_blocking = use_blocking
+        self.team_block_max = team_block_max
+        self.comparisons = 0
+        
+        # Con fuzzy_k la ricerca fuori blocco valuta solo i fuzzy_k candidati
+        # restituiti dall'indice trigrammi/fonetico invece di tutti i disponibili
+        self.fuzzy_k = fuzzy_k
+        self.ngram_index = (
+            NameNgramIndex([matcher.ultra_clean_name(name) for name, _ in candidates])
+            if fuzzy_k else None
+        )
+        
+        self.variants = [matcher.get_ultra_variants(name) for name, _ in candidates]
+        self.clean_lengths = [len(matcher.ultra_clean_name(name)) for name, _ in candidates]
+        
+        self.by_variant: Dict[str, List[int]] = {}
+        for cand_id, variants in enumerate(self.variants):
+            for variant in variants:
+                self.by_variant.setdefault(variant, []).append(cand_id)
+        
+        # Squadra normalizzata -> id (più un valore grezzo rappresentativo)
+        self.by_team: Dict[str, List[int]] = {}
+        self.team_samples: Dict[str, str] = {}
+        self.team_keys: List[str] = []
+        for cand_id, (_, team) in enumerate(candidates):
+            key = matcher.extract_team_name_from_json(team)
+            self.by_team.setdefault(key, []).append(cand_id)
+            self.team_samples.setdefault(key, team)
+            self.team_keys.append(key)
+        self._related_teams: Dict[str, List[str]] = {}
+        self._unblocked_bonus: Dict[str, Dict[str, float]] = {}
+        
+        self.available = [True] * len(candidates)
+        self.n_available = len(candidates)
+    
+    def mark_used(self, cand_id: int):
+        if self.available[cand_id]:
+            self.available[cand_id] = False
+            self.n_available -= 1
+    
+    def available_ids(self):
+        return (i for i, free in enumerate(self.available) if free)
+    
+    def first_available(self) -> Optional[int]:
+        return next(self.available_ids(), None)
+    
+    def fuzzy_pool(self, clean_name: str, block: Set[int]):
+        """Candidati disponibili fuori blocco da valutare con il fuzzy matching"""
+        if self.ngram_index is None:
+            return (i for i in self.available_ids() if i not in block)
+        return sorted(cand_id for cand_id, _ in self.ngram_index.query(
+            clean_name, self.fuzzy_k, allowed=self.available, exclude=block))
+    
+    def related_teams(self, team: str) -> List[str]:
+        """Chiavi squadra con similarità > 0 rispetto alla squadra indicata"""
+        key = self.matcher.extract_team_name_from_json(team)
+        if key not in self._related_teams:
+            self._related_teams[key] = [
+                other for other, sample in self.team_samples.items()
+                if self.matcher.calculate_team_similarity(team, sample) > 0
+            ]
+        return self._related_teams[key]
+    
+    def unblocked_team_bonus(self, team: str) -> Dict[str, float]:
+        """
+        Bonus squadra (team_weight * similarità) verso le squadre compatibili
+        escluse dai blocchi perché troppo grandi: {chiave squadra: bonus}
+        """
+        if not self.use_blocking:
+            return {}
+        key = self.matcher.extract_team_name_from_json(team)
+        if key not in self._unblocked_bonus:
+            self._unblocked_bonus[key] = {
+                other: self.matcher.team_weight * self.matcher.calculate_team_similarity(team, self.team_samples[other])
+                for other in self.related_teams(team)
+                if len(self.by_team[other]) > self.team_block_max
+            }
+        return self._unblocked_bonus[key]
+    
+    def block(self, variants: Set[str], team: str) -> Set[int]:
+        """Id disponibili che condividono una variante o una squadra compatibile (non troppo grande)"""
+        if not self.use_blocking:
+            return set(self.available_ids())
+        
+        ids = set()
+        for variant in variants:
+            ids.update(self.by_variant.get(variant, ()))
+        for key in self.related_teams(team):
+            if len(self.by_team[key]) <= self.team_block_max:
+                ids.update(self.by_team[key])
+        return {i for i in ids if self.available[i]}
+
+
+def match_rows(matcher: PerfectPlayerMatcher, rows: List[Tuple[int, str, str]],
+               index: CandidateBlockIndex, assignment: str = "greedy", top_k: int = 5,
+               min_score: float = 0.0) -> Tuple[List[Tuple[int, int, float]], List[int]]:
+    """
+    Abbina le righe (idx, nome, squadra) ai candidati disponibili dell'indice.
+    
+    "greedy": miglior candidato libero riga per riga; "optimal": assegnamento
+    a peso massimo sui top_k candidati di ogni riga. Sono accettati solo match
+    con score >= min_score. Restituisce ([(posizione riga, id candidato, score)],
+    [posizioni delle righe rimaste senza match]); i candidati usati vengono
+    marcati nell'indice.
+    """
+    found = []
+    unmatched = []
+    
+    if assignment == "optimal":
+        edges = [
+            [(cand_id, score)
+             for cand_id, score in matcher.top_k_candidates(name, team, index, top_k)
+             if score >= min_score]
+            for _, name, team in rows
+        ]
+        logger.info(f"Grafo candidati: {len(rows)} giocatori, {sum(len(e) for e in edges)} archi (top-{top_k})")
+        assigned = max_weight_matching(edges, n_cols=len(index.candidates))
+        for pos, (row_edges, cand_id) in enumerate(zip(edges, assigned)):
+            if cand_id is None:
+                unmatched.append(pos)
+                continue
+            index.mark_used(cand_id)
+            found.append((pos, cand_id, dict(row_edges)[cand_id]))
+        return found, unmatched
+    
+    for pos, (_, name, team) in enumerate(rows):
+        result = matcher.find_best_match_indexed(name, team, index)
+        if result and result[1] >= min_score:
+            cand_id, score = result
+            index.mark_used(cand_id)
+            found.append((pos, cand_id, score))
+        else:
+            unmatched.append(pos)
+    return found, unmatched
+
+
+def _match_team_partition(task) -> Tuple[List[Tuple[int, int, float]], int]:
+    """Matching dentro una singola squadra (eseguito nei processi del pool): (match, confronti)"""
+    rows, candidates, assignment, top_k, use_blocking, min_score = task
+    matcher = PerfectPlayerMatcher()
+    matcher.build_team_similarity_table([team for _, _, team in rows] + [team for _, team in candidates])
+    index = CandidateBlockIndex(matcher, candidates, use_blocking=use_blocking)
+    found, _ = match_rows(matcher, rows, index, assignment, top_k, min_score)
+    return found, index.comparisons
+
+
+def match_quality(scores) -> np.ndarray:
+    """Etichetta di qualità per un array di score (NaN = non matchato)"""
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [scores >= 0.9, scores >= 0.7, scores >= 0.5, scores >= 0.1, scores < 0.1],
+        ['Eccellente', 'Buono', 'Discreto', 'Incerto', 'Forzato'],
+        default='Non matchato'
+    )
+
+
+def _excel_rows(chunk: pd.DataFrame) -> Iterator[tuple]:
+    """Righe di un blocco come tuple di valori Python (NaN -> cella vuota)"""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
 
 
 class PerfectExcelMerger:
     """Merger perfetto che garantisce 100% copertura"""
     
-    def __init__(self, fpedia_file: str, fstats_file: str, output_dir: str = "data/output"):
+    # Righe per blocco nella costruzione e scrittura in streaming degli sheet
+    CHUNK_ROWS = 2000
+    
+    # Score minimo per accettare un match dentro la partizione di squadra
+    # (con la stessa squadra equivale a fuzzy >= 0.625 o varianti in comune)
+    PARTITION_MIN_SCORE = 0.8
+    
+    # Score minimo per salvare un match automatico nel crosswalk e per
+    # continuare a fidarsi di una coppia automatica alle esecuzioni successive
+    CROSSWALK_MIN_SCORE = PARTITION_MIN_SCORE
+    
+    def __init__(self, fpedia_file: str, fstats_file: str, output_dir: str = "data/output",
+                 use_blocking: bool = True, assignment: str = "greedy", top_k: int = 5,
+                 partition_by_team: bool = False, workers: int = 1,
+                 crosswalk_file: Optional[str] = None, fuzzy_k: Optional[int] = None):
         self.fpedia_file = fpedia_file
         self.fstats_file = fstats_file
         
         # File di analisi originali
-        self.fpedia_analysis_file = "data/output/fpedia_analysis.xlsx"
-        self.fstats_analysis_file = "data/output/FSTATS_analysis.xlsx"
+        self.fpedia_analysis_file = fpedia_file
+        self.fstats_analysis_file = fstats_file
         
         self.output_dir = output_dir
         self.matcher = PerfectPlayerMatcher()
+        self.use_blocking = use_blocking
+        # Candidati fuzzy fuori blocco recuperati dall'indice trigrammi (None = tutti)
+        self.fuzzy_k = fuzzy_k
+        
+        # "greedy": miglior candidato libero in ordine di riga
+        # "optimal": assegnamento a peso massimo sui top_k candidati di ogni giocatore
+        if assignment not in ("greedy", "optimal"):
+            raise ValueError(f"Modalità di assegnamento non valida: {assignment}")
+        self.assignment = assignment
+        self.top_k = top_k
+        
+        # Matching per squadra (in parallelo con workers > 1), poi passata globale sui rimasti
+        self.partition_by_team = partition_by_team
+        self.workers = workers
+        
+        # Crosswalk persistente slug FPEDIA <-> fantacalcioPlayerId (None = disattivato)
+        self.crosswalk = Crosswalk(crosswalk_file) if crosswalk_file else None
         
         # DataFrames
         self.df_fpedia = None
@@ -381,18 +809,21 @@ class PerfectExcelMerger:
         
         # Risultati
         self.matches = []
+        self.comparisons = 0
         self.fpedia_unmatched = []
         self.fstats_unmatched = []
     
     def load_data(self) -> bool:
         """Carica i dati"""
         try:
-            self.df_fpedia = pd.read_excel(self.fpedia_file)
-            self.df_fstats = pd.read_excel(self.fstats_file)
+            self.df_fpedia = leggi_tabella(self.fpedia_file)
+            self.df_fstats = leggi_tabella(self.fstats_file)
             
-            # Carica anche i file di analisi per l'unificazione
-            self.df_fpedia_analysis = pd.read_excel(self.fpedia_analysis_file)
-            self.df_fstats_analysis = pd.read_excel(self.fstats_analysis_file)
+            # Carica anche i file di analisi per l'unificazione (stesso file: una sola lettura)
+            self.df_fpedia_analysis = (self.df_fpedia.copy() if self.fpedia_analysis_file == self.fpedia_file
+                                       else leggi_tabella(self.fpedia_analysis_file))
+            self.df_fstats_analysis = (self.df_fstats.copy() if self.fstats_analysis_file == self.fstats_file
+                                       else leggi_tabella(self.fstats_analysis_file))
             
             logger.info(f"FPEDIA: {len(self.df_fpedia)} giocatori")
             logger.info(f"FSTATS: {len(self.df_fstats)} giocatori")
@@ -417,61 +848,75 @@ class PerfectExcelMerger:
         logger.info(f"Obiettivo: 100% copertura = {len(smaller_df)} match")
         
         # Prepara candidati del file più grande
-        larger_candidates = []
-        for _, row in larger_df.iterrows():
-            name = row['Nome'] if pd.notna(row['Nome']) else ""
-            team = row['Squadra'] if pd.notna(row['Squadra']) else ""
-            larger_candidates.append((name, team, row.name))  # Aggiungi index
+        larger_candidates = list(zip(
+            larger_df['Nome'].fillna("").tolist(),
+            larger_df['Squadra'].fillna("").tolist(),
+            larger_df.index.tolist(),  # Aggiungi index
+        ))
+        
+        # Tabella di similarità tra tutte le squadre presenti nei due file
+        self.matcher.build_team_similarity_table(
+            pd.concat([smaller_df['Squadra'], larger_df['Squadra']]).dropna().unique()
+        )
+        
+        index = CandidateBlockIndex(
+            self.matcher, [(name, team) for name, team, _ in larger_candidates],
+            use_blocking=self.use_blocking, fuzzy_k=self.fuzzy_k
+        )
         
         used_larger_indices = set()
         matches_found = []
         
+        fstats_is_smaller = smaller_df is self.df_fstats
+        
+        def register_match(cand_id, idx, smaller_name, smaller_team, score, phase):
+            matched_name, matched_team, orig_idx = larger_candidates[cand_id]
+            index.mark_used(cand_id)
+            used_larger_indices.add(orig_idx)
+            # Posizioni di riga nei due file, usate per il join posizionale
+            smaller_pos = smaller_df.index.get_loc(idx)
+            larger_pos = larger_df.index.get_loc(orig_idx)
+            matches_found.append({
+                'smaller_idx': idx,
+                'larger_idx': orig_idx,
+                'fpedia_idx': larger_pos if fstats_is_smaller else smaller_pos,
+                'fstats_idx': smaller_pos if fstats_is_smaller else larger_pos,
+                'smaller_name': smaller_name,
+                'larger_name': matched_name,
+                'smaller_team': smaller_team,
+                'larger_team': matched_team,
+                'score': score,
+                'phase': phase
+            })
+        
+        # FASE 0: coppie già note dal crosswalk
+        resolved = set()
+        if self.crosswalk is not None:
+            resolved = self._resolve_crosswalk(smaller_df, larger_df, fstats_is_smaller, register_match)
+        
         # FASE 1: Match di alta qualità
         logger.info("FASE 1: Match di alta qualità...")
-        remaining_smaller = []
-        
-        for idx, row in smaller_df.iterrows():
-            smaller_name = row['Nome'] if pd.notna(row['Nome']) else ""
-            smaller_team = row['Squadra'] if pd.notna(row['Squadra']) else ""
-            
-            if not smaller_name:
-                continue
-            
-            # Candidati disponibili
-            available_candidates = [
-                (name, team) for name, team, orig_idx in larger_candidates
-                if orig_idx not in used_larger_indices
-            ]
-            
-            # Cerca match con soglia alta
-            self.matcher.min_similarity = 0.6
-            result = self.matcher.find_best_match_aggressive(
-                smaller_name, smaller_team, available_candidates
+        smaller_rows = [
+            (idx, smaller_name, smaller_team)
+            for idx, smaller_name, smaller_team in zip(
+                smaller_df.index.tolist(),
+                smaller_df['Nome'].fillna("").tolist(),
+                smaller_df['Squadra'].fillna("").tolist(),
             )
-            
-            if result:
-                matched_name, matched_team, score = result
-                
-                # Trova l'indice originale
-                for name, team, orig_idx in larger_candidates:
-                    if name == matched_name and team == matched_team and orig_idx not in used_larger_indices:
-                        used_larger_indices.add(orig_idx)
-                        
-                        matches_found.append({
-                            'smaller_idx': idx,
-                            'larger_idx': orig_idx,
-                            'smaller_name': smaller_name,
-                            'larger_name': matched_name,
-                            'smaller_team': smaller_team,
-                            'larger_team': matched_team,
-                            'score': score,
-                            'phase': 'HIGH_QUALITY'
-                        })
-                        break
-                else:
-                    remaining_smaller.append((idx, smaller_name, smaller_team))
-            else:
-                remaining_smaller.append((idx, smaller_name, smaller_team))
+            if smaller_name and idx not in resolved
+        ]
+        
+        phase = 'OPTIMAL' if self.assignment == "optimal" else 'HIGH_QUALITY'
+        if self.partition_by_team:
+            smaller_rows = self._team_partition_matching(smaller_rows, index, register_match, phase)
+        
+        # Cerca match con soglia alta
+        self.matcher.min_similarity = 0.6
+        found, unmatched = match_rows(self.matcher, smaller_rows, index, self.assignment, self.top_k)
+        for pos, cand_id, score in found:
+            idx, smaller_name, smaller_team = smaller_rows[pos]
+            register_match(cand_id, idx, smaller_name, smaller_team, score, phase)
+        remaining_smaller = [smaller_rows[pos] for pos in unmatched]
         
         logger.info(f"FASE 1 completata: {len(matches_found)} match di alta qualità")
         
@@ -479,79 +924,55 @@ class PerfectExcelMerger:
         logger.info("FASE 2: Match aggressivi per garantire 100% copertura...")
         
         for idx, smaller_name, smaller_team in remaining_smaller:
-            # Candidati ancora disponibili
-            available_candidates = [
-                (name, team) for name, team, orig_idx in larger_candidates
-                if orig_idx not in used_larger_indices
-            ]
-            
-            if not available_candidates:
+            if index.n_available == 0:
                 logger.warning(f"Nessun candidato disponibile per {smaller_name}")
                 continue
             
             # Match ultra-aggressivo con soglia molto bassa
             self.matcher.min_similarity = 0.1
-            result = self.matcher.find_best_match_aggressive(
-                smaller_name, smaller_team, available_candidates
-            )
+            result = self.matcher.find_best_match_indexed(smaller_name, smaller_team, index)
             
             if result:
-                matched_name, matched_team, score = result
+                cand_id, score = result
             else:
                 # Forza match con il primo disponibile
-                matched_name, matched_team = available_candidates[0]
+                cand_id = index.first_available()
                 score = 0.05  # Score molto basso per indicare match forzato
-                logger.warning(f"Match forzato: {smaller_name} → {matched_name}")
+                logger.warning(f"Match forzato: {smaller_name} → {larger_candidates[cand_id][0]}")
             
-            # Trova e segna come usato
-            for name, team, orig_idx in larger_candidates:
-                if name == matched_name and team == matched_team and orig_idx not in used_larger_indices:
-                    used_larger_indices.add(orig_idx)
-                    
-                    matches_found.append({
-                        'smaller_idx': idx,
-                        'larger_idx': orig_idx,
-                        'smaller_name': smaller_name,
-                        'larger_name': matched_name,
-                        'smaller_team': smaller_team,
-                        'larger_team': matched_team,
-                        'score': score,
-                        'phase': 'AGGRESSIVE' if score > 0.1 else 'FORCED'
-                    })
-                    break
+            register_match(cand_id, idx, smaller_name, smaller_team, score,
+                           'AGGRESSIVE' if score > 0.1 else 'FORCED')
         
+        full_scan = len(smaller_df) * len(larger_candidates)
+        self.comparisons = index.comparisons
+        metrics.incrementa("match_comparisons", self.comparisons)
+        logger.info(f"Confronti eseguiti: {index.comparisons} (scansione completa: ~{full_scan})")
         logger.info(f"FASE 2 completata: {len(matches_found)} match totali")
         
         # Organizza risultati
         self.matches = matches_found
         
-        # Trova unmatched del file più grande
-        unmatched_larger_indices = set(range(len(larger_df))) - used_larger_indices
+        if self.crosswalk is not None:
+            self._update_crosswalk()
+        
+        # Trova unmatched del file più grande (posizioni di riga non usate)
+        used = np.zeros(len(larger_df), dtype=bool)
+        used[[match['fpedia_idx' if fstats_is_smaller else 'fstats_idx'] for match in self.matches]] = True
+        unmatched_pos = np.flatnonzero(~used)
+        unmatched_rows = larger_df[['Nome', 'Squadra', 'Ruolo']].take(unmatched_pos)
+        larger_unmatched = [
+            {'index': pos, 'name': name, 'team': team, 'role': role}
+            for pos, name, team, role in zip(unmatched_pos.tolist(), *(unmatched_rows[col].tolist() for col in unmatched_rows))
+        ]
         
         if smaller_df is self.df_fstats:
             # FSTATS è più piccolo - dovrebbe avere 100% copertura
             self.fstats_unmatched = []  # Dovrebbe essere vuoto
-            self.fpedia_unmatched = [
-                {
-                    'index': idx,
-                    'name': larger_df.iloc[idx]['Nome'],
-                    'team': larger_df.iloc[idx]['Squadra'],
-                    'role': larger_df.iloc[idx]['Ruolo']
-                }
-                for idx in unmatched_larger_indices
-            ]
+            self.fpedia_unmatched = larger_unmatched
         else:
             # FPEDIA è più piccolo - dovrebbe avere 100% copertura  
             self.fpedia_unmatched = []  # Dovrebbe essere vuoto
-            self.fstats_unmatched = [
-                {
-                    'index': idx,
-                    'name': larger_df.iloc[idx]['Nome'],
-                    'team': larger_df.iloc[idx]['Squadra'], 
-                    'role': larger_df.iloc[idx]['Ruolo']
-                }
-                for idx in unmatched_larger_indices
-            ]
+            self.fstats_unmatched = larger_unmatched
         
         logger.info(f"Match totali: {len(self.matches)}")
         logger.info(f"FPEDIA unmatched: {len(self.fpedia_unmatched)}")
@@ -565,334 +986,416 @@ class PerfectExcelMerger:
         if coverage < 100:
             logger.error(f"ERRORE: Copertura {smaller_name} non è 100%!")
     
+    def _player_keys(self) -> Tuple[List[str], List[str]]:
+        """Id stabili per posizione di riga: slug URL FPEDIA e fantacalcioPlayerId FSTATS"""
+        fpedia_keys = ([fpedia_slug(url) for url in self.df_fpedia['URL']]
+                       if 'URL' in self.df_fpedia.columns else [""] * len(self.df_fpedia))
+        fstats_keys = ([fstats_key(pid) for pid in self.df_fstats['fantacalcioPlayerId']]
+                       if 'fantacalcioPlayerId' in self.df_fstats.columns else [""] * len(self.df_fstats))
+        return fpedia_keys, fstats_keys
+    
+    def _resolve_crosswalk(self, smaller_df: pd.DataFrame, larger_df: pd.DataFrame,
+                           fstats_is_smaller: bool, register_match) -> Set:
+        """
+        Abbina con lookup O(1) le coppie del crosswalk presenti in entrambi i
+        file (prima le correzioni manuali). Le coppie automatiche vengono
+        ricontrollate su nome e squadra attuali: sotto CROSSWALK_MIN_SCORE
+        (trasferimento, cambio di nome, vecchio match sbagliato) vengono tolte
+        dal crosswalk e i due giocatori tornano al matcher. Restituisce gli
+        indici del file più piccolo già risolti.
+        """
+        fpedia_keys, fstats_keys = self._player_keys()
+        fpedia_pos = {key: pos for pos, key in enumerate(fpedia_keys) if key}
+        fstats_pos = {key: pos for pos, key in enumerate(fstats_keys) if key}
+        
+        resolved = set()
+        used_larger = set()
+        stale = []
+        for slug, player_id, row in self.crosswalk.pairs():
+            if slug not in fpedia_pos or player_id not in fstats_pos:
+                continue
+            if fstats_is_smaller:
+                smaller_pos, larger_pos = fstats_pos[player_id], fpedia_pos[slug]
+            else:
+                smaller_pos, larger_pos = fpedia_pos[slug], fstats_pos[player_id]
+            idx = smaller_df.index[smaller_pos]
+            if idx in resolved or larger_pos in used_larger:
+                continue
+            smaller_row = smaller_df.iloc[smaller_pos]
+            smaller_name = smaller_row['Nome'] if pd.notna(smaller_row['Nome']) else ""
+            smaller_team = smaller_row['Squadra'] if pd.notna(smaller_row['Squadra']) else ""
+            if row['source'] == 'manual':
+                phase = 'MANUAL'
+                score = row['score'] if pd.notna(row['score']) else 1.0
+            else:
+                phase = 'CROSSWALK'
+                larger_row = larger_df.iloc[larger_pos]
+                larger_name = larger_row['Nome'] if pd.notna(larger_row['Nome']) else ""
+                larger_team = larger_row['Squadra'] if pd.notna(larger_row['Squadra']) else ""
+                score = self.matcher.score_candidate(
+                    smaller_name, self.matcher.get_ultra_variants(smaller_name), smaller_team,
+                    larger_name, self.matcher.get_ultra_variants(larger_name), larger_team,
+                )
+                if score < self.CROSSWALK_MIN_SCORE:
+                    stale.append(slug)
+                    continue
+            register_match(larger_pos, idx, smaller_name, smaller_team, float(score), phase)
+            resolved.add(idx)
+            used_larger.add(larger_pos)
+        
+        for slug in stale:
+            self.crosswalk.remove(slug)
+        if stale:
+            self.crosswalk.save()
+        logger.info(f"Crosswalk: {len(resolved)} coppie risolte senza matching, "
+                    f"{len(stale)} coppie automatiche non più valide, "
+                    f"{len(smaller_df) - len(resolved)} giocatori al matcher")
+        return resolved
+    
+    def _update_crosswalk(self):
+        """
+        Salva nel crosswalk i nuovi match accettati con score >= CROSSWALK_MIN_SCORE
+        (i match incerti restano al matcher anche alle esecuzioni successive)
+        """
+        fpedia_keys, fstats_keys = self._player_keys()
+        changed = 0
+        for match in self.matches:
+            if match['phase'] in ('FORCED', 'CROSSWALK', 'MANUAL'):
+                continue
+            if match['score'] < self.CROSSWALK_MIN_SCORE:
+                continue
+            changed += self.crosswalk.record(fpedia_keys[match['fpedia_idx']],
+                                             fstats_keys[match['fstats_idx']],
+                                             match['score'], match['phase'])
+        if changed:
+            self.crosswalk.save()
+        logger.info(f"Crosswalk aggiornato: {changed} nuove coppie ({len(self.crosswalk)} totali)")
+    
+    def _team_partition_matching(self, rows: List[Tuple[int, str, str]], index: CandidateBlockIndex,
+                                 register_match, phase: str) -> List[Tuple[int, str, str]]:
+        """
+        Abbina i giocatori dentro la propria squadra canonica, una partizione per
+        processo, accettando solo match con score >= PARTITION_MIN_SCORE.
+        Restituisce le righe rimaste (trasferimenti, squadra mancante) per la
+        passata globale. Il risultato non dipende dal numero di worker.
+        """
+        rows_by_team: Dict[str, List[int]] = {}
+        for pos, (_, _, team) in enumerate(rows):
+            rows_by_team.setdefault(self.matcher.canonical_team(team), []).append(pos)
+        cands_by_team: Dict[str, List[int]] = {}
+        for cand_id in index.available_ids():
+            team = index.candidates[cand_id][1]
+            cands_by_team.setdefault(self.matcher.canonical_team(team), []).append(cand_id)
+        
+        teams = sorted(t for t in rows_by_team if t and t in cands_by_team)
+        tasks = [
+            ([rows[pos] for pos in rows_by_team[team]],
+             [index.candidates[cand_id] for cand_id in cands_by_team[team]],
+             self.assignment, self.top_k, self.use_blocking, self.PARTITION_MIN_SCORE)
+            for team in teams
+        ]
+        
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                # Partizioni più grandi per prime, risultati raccolti in ordine di squadra
+                order = sorted(range(len(tasks)), key=lambda i: -len(tasks[i][0]) * len(tasks[i][1]))
+                futures = {i: pool.submit(_match_team_partition, tasks[i]) for i in order}
+                results = [futures[i].result() for i in range(len(tasks))]
+        else:
+            results = [_match_team_partition(task) for task in tasks]
+        
+        matched_positions = set()
+        for team, (result, comparisons) in zip(teams, results):
+            index.comparisons += comparisons
+            for local_row, local_cand, score in result:
+                pos = rows_by_team[team][local_row]
+                idx, name, row_team = rows[pos]
+                register_match(cands_by_team[team][local_cand], idx, name, row_team, score, phase)
+                matched_positions.add(pos)
+        
+        logger.info(f"Matching per squadra: {len(matched_positions)} match in {len(teams)} squadre "
+                    f"({self.workers} worker), {len(rows) - len(matched_positions)} alla passata globale")
+        return [row for pos, row in enumerate(rows) if pos not in matched_positions]
+    
+    def _matched_positions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Posizioni di riga (FPEDIA, FSTATS) dei match nei file di analisi"""
+        fpedia_pos = np.array([match['fpedia_idx'] for match in self.matches], dtype=np.intp)
+        fstats_pos = np.array([match['fstats_idx'] for match in self.matches], dtype=np.intp)
+        return fpedia_pos, fstats_pos
+    
+    def iter_unified_analysis(self, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Analisi unificata a blocchi di chunk_size match (almeno un blocco, anche vuoto)"""
+        chunk_size = chunk_size or self.CHUNK_ROWS
+        fpedia_pos, fstats_pos = self._matched_positions()
+        
+        # Colonne FPEDIA da escludere (come richiesto dall'utente)
+        fpedia_cols_to_exclude = {
+            'Nome', 'Ruolo', 'Squadra',  # Base (aggiunti senza prefisso)
+            'Fantamedia anno 2024-2025',
+            'Presenze campionato corrente', 
+            'Fantamedia anno 2023-2024',
+            'FM su tot gare 2024-2025',
+            'Ruolo.1',
+            'Skills.1', 
+            'Buon investimento.1',
+            'Resistenza infortuni.1',
+            'Consigliato prossima giornata.1',
+            'Infortunato.1',
+            'Squadra.1',
+            'Trend.1',
+            'Presenze campionato corrente.1',
+            'URL'
+        }
+        fpedia_cols = [col for col in self.df_fpedia_analysis.columns if col not in fpedia_cols_to_exclude]
+        
+        # Solo campi specifici da FSTATS (solo quelli richiesti)
+        fstats_allowed_cols = {
+            'Prezzo Massimo Consigliato': 'FSTATS_Prezzo_Massimo_Consigliato',
+            'Convenienza': 'FSTATS_Convenienza', 
+            'Convenienza Potenziale': 'FSTATS_Convenienza_Potenziale'
+        }
+        fstats_cols = [col for col in fstats_allowed_cols if col in self.df_fstats_analysis.columns]
+        
+        for start in range(0, max(len(fpedia_pos), 1), chunk_size):
+            # Righe abbinate allineate per posizione (una take per file e blocco)
+            fpedia_rows = self.df_fpedia_analysis.take(fpedia_pos[start:start + chunk_size]).reset_index(drop=True)
+            fstats_rows = self.df_fstats_analysis.take(fstats_pos[start:start + chunk_size]).reset_index(drop=True)
+            yield pd.concat([
+                fpedia_rows[['Nome', 'Ruolo', 'Squadra']],
+                fpedia_rows[fpedia_cols].add_prefix('FPEDIA_'),
+                fstats_rows[fstats_cols].rename(columns=fstats_allowed_cols),
+            ], axis=1)
+    
     def create_unified_analysis(self) -> pd.DataFrame:
         """Crea analisi unificata combinando dati FPEDIA e FSTATS"""
         
         logger.info("Creando analisi unificata...")
         
-        unified_data = []
+        unified_df = pd.concat(self.iter_unified_analysis(), ignore_index=True)
         
-        for match in self.matches:
-            # Determina quale è smaller e larger
-            if len(self.df_fstats) <= len(self.df_fpedia):
-                # FSTATS è più piccolo
-                fstats_idx = match['smaller_idx']
-                fpedia_idx = match['larger_idx']
-                
-                # Trova le righe corrispondenti nei file di analisi
-                fstats_analysis_row = self.df_fstats_analysis.iloc[fstats_idx]
-                
-                # Cerca la riga FPEDIA corrispondente per nome
-                fpedia_name = match['larger_name']
-                fpedia_analysis_row = self.df_fpedia_analysis[
-                    self.df_fpedia_analysis['Nome'].str.contains(fpedia_name, case=False, na=False)
-                ]
-                
-                if len(fpedia_analysis_row) > 0:
-                    fpedia_analysis_row = fpedia_analysis_row.iloc[0]
-                else:
-                    # Fallback: usa l'indice
-                    fpedia_analysis_row = self.df_fpedia_analysis.iloc[fpedia_idx]
-            else:
-                # FPEDIA è più piccolo
-                fpedia_idx = match['smaller_idx']
-                fstats_idx = match['larger_idx']
-                
-                fpedia_analysis_row = self.df_fpedia_analysis.iloc[fpedia_idx]
-                
-                # Cerca la riga FSTATS corrispondente per nome
-                fstats_name = match['larger_name']
-                fstats_analysis_row = self.df_fstats_analysis[
-                    self.df_fstats_analysis['Nome'].str.contains(fstats_name, case=False, na=False)
-                ]
-                
-                if len(fstats_analysis_row) > 0:
-                    fstats_analysis_row = fstats_analysis_row.iloc[0]
-                else:
-                    # Fallback: usa l'indice
-                    fstats_analysis_row = self.df_fstats_analysis.iloc[fstats_idx]
-            
-            # Combina i dati
-            unified_row = {}
-            
-            # Campi base da FPEDIA
-            unified_row['Nome'] = fpedia_analysis_row['Nome']
-            unified_row['Ruolo'] = fpedia_analysis_row['Ruolo']
-            unified_row['Squadra'] = fpedia_analysis_row['Squadra']
-            
-            # Colonne FPEDIA da escludere (come richiesto dall'utente)
-            fpedia_cols_to_exclude = {
-                'Nome', 'Ruolo', 'Squadra',  # Base (già aggiunti)
-                'Fantamedia anno 2024-2025',
-                'Presenze campionato corrente', 
-                'Fantamedia anno 2023-2024',
-                'FM su tot gare 2024-2025',
-                'Ruolo.1',
-                'Skills.1', 
-                'Buon investimento.1',
-                'Resistenza infortuni.1',
-                'Consigliato prossima giornata.1',
-                'Infortunato.1',
-                'Squadra.1',
-                'Trend.1',
-                'Presenze campionato corrente.1'
-            }
-            
-            # Aggiungi campi FPEDIA (escludendo quelli non voluti)
-            for col in self.df_fpedia_analysis.columns:
-                if col not in fpedia_cols_to_exclude:
-                    unified_row[f'FPEDIA_{col}'] = fpedia_analysis_row[col]
-            
-            # Solo campi specifici da FSTATS (solo quelli richiesti)
-            fstats_allowed_cols = {
-                'Prezzo Massimo Consigliato': 'FSTATS_Prezzo_Massimo_Consigliato',
-                'Convenienza': 'FSTATS_Convenienza', 
-                'Convenienza Potenziale': 'FSTATS_Convenienza_Potenziale'
-            }
-            
-            for fstats_col, unified_col in fstats_allowed_cols.items():
-                if fstats_col in self.df_fstats_analysis.columns:
-                    unified_row[unified_col] = fstats_analysis_row[fstats_col]
-            
-            unified_data.append(unified_row)
-        
-        unified_df = pd.DataFrame(unified_data)
         logger.info(f"Analisi unificata creata: {len(unified_df)} righe, {len(unified_df.columns)} colonne")
         
         return unified_df
     
+    def iter_complete_merge(self, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Merge completo a blocchi: match, poi solo FPEDIA, poi solo FSTATS"""
+        chunk_size = chunk_size or self.CHUNK_ROWS
+        
+        base_cols = ['Nome', 'Ruolo', 'Squadra']
+        fpedia_cols = [col for col in self.df_fpedia_analysis.columns if col not in base_cols]
+        fstats_cols = [col for col in self.df_fstats_analysis.columns if col not in base_cols]
+        
+        def block(base_rows, status, scores, fpedia_rows=None, fstats_rows=None):
+            """Un blocco di righe con le colonne prefissate (NaN per la fonte mancante)"""
+            n = len(base_rows)
+            scores = np.asarray(scores, dtype=float)
+            quality = match_quality(scores)
+            parts = [
+                base_rows[base_cols].reset_index(drop=True),
+                pd.DataFrame({
+                    'Match_Status': [status] * n,
+                    'Match_Score': scores,
+                    'Match_Quality': quality,
+                }),
+            ]
+            for rows, cols, prefix in [(fpedia_rows, fpedia_cols, 'FPEDIA_'),
+                                       (fstats_rows, fstats_cols, 'FSTATS_')]:
+                if rows is not None:
+                    parts.append(rows[cols].reset_index(drop=True).add_prefix(prefix))
+                else:
+                    parts.append(pd.DataFrame(np.nan, index=range(n),
+                                              columns=[prefix + col for col in cols]))
+            return pd.concat(parts, axis=1)
+        
+        # Giocatori matchati: join posizionale sulle righe abbinate
+        fpedia_pos, fstats_pos = self._matched_positions()
+        scores = np.array([match['score'] for match in self.matches], dtype=float)
+        for start in range(0, max(len(fpedia_pos), 1), chunk_size):
+            fpedia_matched = self.df_fpedia_analysis.take(fpedia_pos[start:start + chunk_size])
+            yield block(fpedia_matched, 'MATCHED', scores[start:start + chunk_size],
+                        fpedia_rows=fpedia_matched,
+                        fstats_rows=self.df_fstats_analysis.take(fstats_pos[start:start + chunk_size]))
+        
+        # Giocatori non matchati di ciascuna fonte
+        for unmatched, df, status, side in [
+            (self.fpedia_unmatched, self.df_fpedia_analysis, 'FPEDIA_ONLY', 'fpedia_rows'),
+            (self.fstats_unmatched, self.df_fstats_analysis, 'FSTATS_ONLY', 'fstats_rows'),
+        ]:
+            positions = [item['index'] for item in unmatched]
+            for start in range(0, len(positions), chunk_size):
+                rows = df.take(positions[start:start + chunk_size])
+                yield block(rows, status, np.full(len(rows), np.nan), **{side: rows})
+    
     def create_complete_merge(self) -> pd.DataFrame:
         """Crea merge completo con tutti i giocatori di entrambe le fonti"""
         
         logger.info("Creando merge completo con tutti i giocatori...")
         
-        complete_data = []
-        
-        # Aggiungi tutti i giocatori matchati con dati completi
-        for match in self.matches:
-            # Determina quale è smaller e larger
-            if len(self.df_fstats) <= len(self.df_fpedia):
-                # FSTATS è più piccolo
-                fstats_idx = match['smaller_idx']
-                fpedia_idx = match['larger_idx']
-                
-                # Trova le righe corrispondenti nei file di analisi
-                fstats_analysis_row = self.df_fstats_analysis.iloc[fstats_idx]
-                
-                # Cerca la riga FPEDIA corrispondente per nome
-                fpedia_name = match['larger_name']
-                fpedia_analysis_row = self.df_fpedia_analysis[
-                    self.df_fpedia_analysis['Nome'].str.contains(fpedia_name, case=False, na=False)
-                ]
-                
-                if len(fpedia_analysis_row) > 0:
-                    fpedia_analysis_row = fpedia_analysis_row.iloc[0]
-                else:
-                    fpedia_analysis_row = self.df_fpedia_analysis.iloc[fpedia_idx]
-            else:
-                # FPEDIA è più piccolo
-                fpedia_idx = match['smaller_idx']
-                fstats_idx = match['larger_idx']
-                
-                fpedia_analysis_row = self.df_fpedia_analysis.iloc[fpedia_idx]
-                
-                fstats_name = match['larger_name']
-                fstats_analysis_row = self.df_fstats_analysis[
-                    self.df_fstats_analysis['Nome'].str.contains(fstats_name, case=False, na=False)
-                ]
-                
-                if len(fstats_analysis_row) > 0:
-                    fstats_analysis_row = fstats_analysis_row.iloc[0]
-                else:
-                    fstats_analysis_row = self.df_fstats_analysis.iloc[fstats_idx]
-            
-            # Combina tutti i dati
-            complete_row = {}
-            
-            # Informazioni base
-            complete_row['Nome'] = fpedia_analysis_row['Nome']
-            complete_row['Ruolo'] = fpedia_analysis_row['Ruolo'] 
-            complete_row['Squadra'] = fpedia_analysis_row['Squadra']
-            complete_row['Match_Status'] = 'MATCHED'
-            complete_row['Match_Score'] = match['score']
-            complete_row['Match_Quality'] = 'Eccellente' if match['score'] >= 0.9 else \
-                                          'Buono' if match['score'] >= 0.7 else \
-                                          'Discreto' if match['score'] >= 0.5 else \
-                                          'Incerto' if match['score'] >= 0.1 else 'Forzato'
-            
-            # Tutte le colonne FPEDIA (con prefisso)
-            fpedia_base_cols = {'Nome', 'Ruolo', 'Squadra'}
-            for col in self.df_fpedia_analysis.columns:
-                if col not in fpedia_base_cols:
-                    complete_row[f'FPEDIA_{col}'] = fpedia_analysis_row[col]
-            
-            # Tutte le colonne FSTATS (con prefisso)
-            fstats_base_cols = {'Nome', 'Ruolo', 'Squadra'}
-            for col in self.df_fstats_analysis.columns:
-                if col not in fstats_base_cols:
-                    complete_row[f'FSTATS_{col}'] = fstats_analysis_row[col]
-            
-            complete_data.append(complete_row)
+        complete_df = pd.concat(self.iter_complete_merge(), ignore_index=True)
         
-        # Aggiungi giocatori FPEDIA non matchati
-        for item in self.fpedia_unmatched:
-            fpedia_row = self.df_fpedia_analysis.iloc[item['index']]
-            
-            complete_row = {}
-            complete_row['Nome'] = fpedia_row['Nome']
-            complete_row['Ruolo'] = fpedia_row['Ruolo']
-            complete_row['Squadra'] = fpedia_row['Squadra'] 
-            complete_row['Match_Status'] = 'FPEDIA_ONLY'
-            complete_row['Match_Score'] = np.nan
-            complete_row['Match_Quality'] = 'Non matchato'
-            
-            # Colonne FPEDIA
-            fpedia_base_cols = {'Nome', 'Ruolo', 'Squadra'}
-            for col in self.df_fpedia_analysis.columns:
-                if col not in fpedia_base_cols:
-                    complete_row[f'FPEDIA_{col}'] = fpedia_row[col]
-            
-            # Colonne FSTATS vuote
-            for col in self.df_fstats_analysis.columns:
-                if col not in fstats_base_cols:
-                    complete_row[f'FSTATS_{col}'] = np.nan
-                    
-            complete_data.append(complete_row)
-        
-        # Aggiungi giocatori FSTATS non matchati  
-        for item in self.fstats_unmatched:
-            fstats_row = self.df_fstats_analysis.iloc[item['index']]
-            
-            complete_row = {}
-            complete_row['Nome'] = fstats_row['Nome']
-            complete_row['Ruolo'] = fstats_row['Ruolo'] 
-            complete_row['Squadra'] = fstats_row['Squadra']
-            complete_row['Match_Status'] = 'FSTATS_ONLY'
-            complete_row['Match_Score'] = np.nan
-            complete_row['Match_Quality'] = 'Non matchato'
-            
-            # Colonne FPEDIA vuote
-            for col in self.df_fpedia_analysis.columns:
-                if col not in {'Nome', 'Ruolo', 'Squadra'}:
-                    complete_row[f'FPEDIA_{col}'] = np.nan
-            
-            # Colonne FSTATS
-            fstats_base_cols = {'Nome', 'Ruolo', 'Squadra'}
-            for col in self.df_fstats_analysis.columns:
-                if col not in fstats_base_cols:
-                    complete_row[f'FSTATS_{col}'] = fstats_row[col]
-                    
-            complete_data.append(complete_row)
-        
-        complete_df = pd.DataFrame(complete_data)
         logger.info(f"Merge completo creato: {len(complete_df)} righe, {len(complete_df.columns)} colonne")
         
         return complete_df
     
-    def create_perfect_excel(self, output_filename: str = "perfect_merged_analysis.xlsx"):
-        """Crea Excel con la struttura richiesta"""
+    def create_matched_sheet(self) -> pd.DataFrame:
+        """Sheet Matched: nomi e squadre delle coppie abbinate (join posizionale)"""
+        fpedia_pos, fstats_pos = self._matched_positions()
+        fpedia_rows = self.df_fpedia[['Nome', 'Squadra']].take(fpedia_pos).reset_index(drop=True)
+        fstats_rows = self.df_fstats[['Nome', 'Squadra']].take(fstats_pos).reset_index(drop=True)
+        scores = np.array([match['score'] for match in self.matches], dtype=float)
+        
+        matched_df = pd.DataFrame({
+            'FPEDIA_Nome': fpedia_rows['Nome'],
+            'FSTATS_Nome': fstats_rows['Nome'],
+            'FPEDIA_Squadra': fpedia_rows['Squadra'],
+            'FSTATS_Squadra': fstats_rows['Squadra'],
+            'Similarity_Score': scores,
+            'Match_Phase': [match['phase'] for match in self.matches],
+            'Match_Quality': match_quality(scores),
+        })
+        return matched_df
+    
+    def create_unmatched_sheet(self) -> pd.DataFrame:
+        """Sheet Unmatched: giocatori senza corrispondenza"""
+        columns = ['Source', 'Nome', 'Squadra', 'Ruolo', 'Reason']
+        parts = []
+        for source, other, unmatched, df in [
+            ('FPEDIA', 'FSTATS', self.fpedia_unmatched, self.df_fpedia),
+            ('FSTATS', 'FPEDIA', self.fstats_unmatched, self.df_fstats),
+        ]:
+            if not unmatched:
+                continue
+            rows = df[['Nome', 'Squadra', 'Ruolo']].take([item['index'] for item in unmatched])
+            parts.append(rows.assign(Source=source, Reason=f'No suitable match found in {other}')[columns])
         
-        output_path = f"{self.output_dir}/{output_filename}"
+        if not parts:
+            return pd.DataFrame()
+        unmatched_df = pd.concat(parts, ignore_index=True)
+        return unmatched_df
+    
+    def create_statistics_sheet(self) -> pd.DataFrame:
+        """Sheet Statistics: statistiche riassuntive"""
+        scores = np.array([match['score'] for match in self.matches], dtype=float)
+        stats_data = {
+            'Metric': [
+                'Total FPEDIA Players',
+                'Total FSTATS Players', 
+                'Total Matches Found',
+                'FPEDIA Coverage',
+                'FSTATS Coverage',
+                'Smaller File Coverage',
+                'High Quality Matches (>0.9)',
+                'Good Matches (0.7-0.9)',
+                'Uncertain Matches (0.1-0.7)',
+                'Forced Matches (<0.1)',
+                'Average Score',
+                'Unified Analysis Rows',
+                'Complete Merge Rows'
+            ],
+            'Value': [
+                len(self.df_fpedia),
+                len(self.df_fstats),
+                len(self.matches),
+                f"{len(self.matches)/len(self.df_fpedia)*100:.1f}%",
+                f"{len(self.matches)/len(self.df_fstats)*100:.1f}%",
+                f"{len(self.matches)/min(len(self.df_fpedia), len(self.df_fstats))*100:.1f}%",
+                int((scores >= 0.9).sum()),
+                int(((scores >= 0.7) & (scores < 0.9)).sum()),
+                int(((scores >= 0.1) & (scores < 0.7)).sum()),
+                int((scores < 0.1).sum()),
+                f"{np.mean(scores):.3f}",
+                len(self.matches),
+                len(self.matches) + len(self.fpedia_unmatched) + len(self.fstats_unmatched)
+            ]
+        }
         
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            
+        stats_df = pd.DataFrame(stats_data)
+        return stats_df
+    
+    def sheet_builders(self) -> Dict[str, Callable[[], Iterable[pd.DataFrame]]]:
+        """Sheet del file finale: nome -> funzione che produce i blocchi di righe"""
+        return {
             # 1. ANALISI UNIFICATA (ottimizzata)
-            unified_df = self.create_unified_analysis()
-            unified_df.to_excel(writer, sheet_name='Unified_Analysis', index=False)
-            
+            'Unified_Analysis': self.iter_unified_analysis,
             # 2. MERGE COMPLETO (sostituisce FPEDIA_All e FSTATS_All)
-            complete_df = self.create_complete_merge()
-            complete_df.to_excel(writer, sheet_name='Complete_Merge', index=False)
-            
+            'Complete_Merge': self.iter_complete_merge,
             # 3. NOMI MATCHATI (mantenuto per compatibilità)
-            matched_data = []
-            for match in self.matches:
-                matched_data.append({
-                    'FPEDIA_Nome': match['fpedia_name'] if 'fpedia_name' in match else 
-                                  (match['smaller_name'] if self.df_fstats.__len__() < self.df_fpedia.__len__() else match['larger_name']),
-                    'FSTATS_Nome': match['fstats_name'] if 'fstats_name' in match else
-                                  (match['smaller_name'] if self.df_fstats.__len__() <= self.df_fpedia.__len__() else match['larger_name']),
-                    'FPEDIA_Squadra': match['fpedia_team'] if 'fpedia_team' in match else
-                                     (match['smaller_team'] if self.df_fstats.__len__() < self.df_fpedia.__len__() else match['larger_team']),
-                    'FSTATS_Squadra': match['fstats_team'] if 'fstats_team' in match else
-                                     (match['smaller_team'] if self.df_fstats.__len__() <= self.df_fpedia.__len__() else match['larger_team']),
-                    'Similarity_Score': match['score'],
-                    'Match_Phase': match['phase'],
-                    'Match_Quality': 'Eccellente' if match['score'] >= 0.9 else
-                                   'Buono' if match['score'] >= 0.7 else
-                                   'Discreto' if match['score'] >= 0.5 else
-                                   'Incerto' if match['score'] >= 0.1 else 'Forzato'
-                })
-            
-            matched_df = pd.DataFrame(matched_data)
-            matched_df.to_excel(writer, sheet_name='Matched', index=False)
-            
+            'Matched': lambda: [self.create_matched_sheet()],
             # 4. NOMI NON MATCHATI
-            unmatched_data = []
-            
-            # Aggiungi FPEDIA unmatched
-            for item in self.fpedia_unmatched:
-                unmatched_data.append({
-                    'Source': 'FPEDIA',
-                    'Nome': item['name'],
-                    'Squadra': item['team'],
-                    'Ruolo': item['role'],
-                    'Reason': 'No suitable match found in FSTATS'
-                })
-            
-            # Aggiungi FSTATS unmatched
-            for item in self.fstats_unmatched:
-                unmatched_data.append({
-                    'Source': 'FSTATS', 
-                    'Nome': item['name'],
-                    'Squadra': item['team'],
-                    'Ruolo': item['role'],
-                    'Reason': 'No suitable match found in FPEDIA'
-                })
-            
-            unmatched_df = pd.DataFrame(unmatched_data)
-            unmatched_df.to_excel(writer, sheet_name='Unmatched', index=False)
-            
+            'Unmatched': lambda: [self.create_unmatched_sheet()],
             # 5. STATISTICHE RIASSUNTIVE
-            stats_data = {
-                'Metric': [
-                    'Total FPEDIA Players',
-                    'Total FSTATS Players', 
-                    'Total Matches Found',
-                    'FPEDIA Coverage',
-                    'FSTATS Coverage',
-                    'Smaller File Coverage',
-                    'High Quality Matches (>0.9)',
-                    'Good Matches (0.7-0.9)',
-                    'Uncertain Matches (0.1-0.7)',
-                    'Forced Matches (<0.1)',
-                    'Average Score',
-                    'Unified Analysis Rows',
-                    'Complete Merge Rows'
-                ],
-                'Value': [
-                    len(self.df_fpedia),
-                    len(self.df_fstats),
-                    len(self.matches),
-                    f"{len(self.matches)/len(self.df_fpedia)*100:.1f}%",
-                    f"{len(self.matches)/len(self.df_fstats)*100:.1f}%",
-                    f"{len(self.matches)/min(len(self.df_fpedia), len(self.df_fstats))*100:.1f}%",
-                    len([m for m in self.matches if m['score'] >= 0.9]),
-                    len([m for m in self.matches if 0.7 <= m['score'] < 0.9]),
-                    len([m for m in self.matches if 0.1 <= m['score'] < 0.7]),
-                    len([m for m in self.matches if m['score'] < 0.1]),
-                    f"{np.mean([m['score'] for m in self.matches]):.3f}",
-                    len(unified_df),
-                    len(complete_df)
-                ]
-            }
-            
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='Statistics', index=False)
+            'Statistics': lambda: [self.create_statistics_sheet()],
+        }
+    
+    def create_perfect_excel(self, output_filename: str = "perfect_merged_analysis.xlsx",
+                             streaming: bool = True):
+        """
+        Crea Excel con la struttura richiesta.
+        
+        Con streaming (default) le righe vengono scritte man mano che i blocchi
+        sono prodotti, con openpyxl in modalità write-only: la memoria non cresce
+        con il numero di celle. streaming=False usa pandas.ExcelWriter
+        (intestazioni formattate, tutti gli sheet in memoria).
+        """
+        
+        output_path = f"{self.output_dir}/{output_filename}"
+        
+        if streaming:
+            workbook = Workbook(write_only=True)
+            for sheet_name, chunks in self.sheet_builders().items():
+                with metrics.misura(f"merger.sheet.{sheet_name}") as misura:
+                    sheet = workbook.create_sheet(sheet_name)
+                    header_written = False
+                    for chunk in chunks():
+                        if not header_written and len(chunk.columns):
+                            sheet.append(list(chunk.columns))
+                            header_written = True
+                        for row in _excel_rows(chunk):
+                            sheet.append(row)
+                        misura["righe"] += len(chunk)
+            with metrics.misura("merger.save"):
+                workbook.save(output_path)
+        else:
+            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+                for sheet_name, chunks in self.sheet_builders().items():
+                    with metrics.misura(f"merger.sheet.{sheet_name}") as misura:
+                        sheet_df = pd.concat(chunks(), ignore_index=True)
+                        sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+                        misura["righe"] = len(sheet_df)
         
         logger.info(f"Excel perfetto salvato: {output_path}")
         return output_path
     
+    def export_sheets(self, fmt: str = "csv", output_stem: str = "perfect_merged_analysis",
+                      workers: Optional[int] = None) -> List[str]:
+        """
+        Esporta ogni sheet in un file separato (<stem>_<Sheet>.csv / .parquet),
+        scrivendo gli sheet in parallelo. Il CSV viene scritto a blocchi; il
+        Parquet richiede pyarrow o fastparquet.
+        """
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Formato non supportato: {fmt}")
+        if fmt == "parquet" and not (importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")):
+            raise ImportError("L'export Parquet richiede pyarrow o fastparquet")
+        
+        def write_sheet(sheet_name, chunks):
+            path = f"{self.output_dir}/{output_stem}_{sheet_name}.{fmt}"
+            if fmt == "parquet":
+                pd.concat(chunks(), ignore_index=True).to_parquet(path, index=False)
+                return path
+            with open(path, "w", newline="", encoding="utf-8") as fp:
+                for i, chunk in enumerate(chunks()):
+                    chunk.to_csv(fp, index=False, header=(i == 0))
+            return path
+        
+        builders = self.sheet_builders()
+        with ThreadPoolExecutor(max_workers=workers or len(builders)) as executor:
+            futures = [executor.submit(write_sheet, name, chunks) for name, chunks in builders.items()]
+            paths = [future.result() for future in futures]
+        
+        logger.info(f"Sheet esportati in {fmt}: {', '.join(paths)}")
+        return paths
+    
     def print_perfect_summary(self):
         """Stampa riassunto perfetto"""
         
@@ -939,20 +1442,34 @@ class PerfectExcelMerger:
         
         print("="*60)
     
-    def run_perfect(self, output_filename: str = "perfect_merged_analysis.xlsx") -> bool:
-        """Esegue processo perfetto"""
+    def run_perfect(self, output_filename: str = "perfect_merged_analysis.xlsx",
+                    sheets_format: Optional[str] = None) -> bool:
+        """
+        Esegue processo perfetto. Con sheets_format ("csv" o "parquet") gli
+        sheet vengono esportati come file separati invece dell'Excel.
+        """
         
         logger.info("🎯 INIZIO PERFECT MERGER")
         
         # 1. Carica dati
-        if not self.load_data():
-            return False
+        with metrics.misura("merger.load") as misura:
+            if not self.load_data():
+                return False
+            misura["righe"] = len(self.df_fpedia) + len(self.df_fstats)
         
         # 2. Esegui matching perfetto
-        self.perform_perfect_matching()
-        
-        # 3. Crea Excel perfetto
-        excel_path = self.create_perfect_excel(output_filename)
+        with metrics.misura("merger.matching") as misura:
+            self.perform_perfect_matching()
+            misura["righe"] = len(self.matches)
+        
+        # 3. Crea Excel perfetto (o un file per sheet)
+        with metrics.misura("merger.export") as misura:
+            if sheets_format:
+                self.export_sheets(sheets_format, os.path.splitext(output_filename)[0])
+            else:
+                self.create_perfect_excel(output_filename)
+            # Righe del merge completo (lo sheet più grande)
+            misura["righe"] = len(self.matches) + len(self.fpedia_unmatched) + len(self.fstats_unmatched)
         
         # 4. Stampa riassunto
         self.print_perfect_summary()
@@ -0,0 +1,365 @@
+# ranking_server.py
+"""
+Server HTTP locale, in sola lettura, sulle classifiche calcolate dalla pipeline.
+
+Durante l'asta più persone interrogano le stesse classifiche ("miglior CEN
+sotto i 15 crediti non infortunato"): il server carica una volta
+fpedia_analysis e FSTATS_analysis e risponde in JSON con filtri e top-k.
+
+Per ogni fonte mantiene:
+- l'ordine di ogni ruolo (e di tutti i giocatori) per ciascun criterio di
+  ordinamento, più il rango di ogni giocatore in quell'ordine
+- un indice per prezzo (prezzi ordinati per ruolo, ricerca con bisect)
+- un indice per squadra
+Una query parte dall'indice più selettivo e scorre i candidati in ordine di
+rango fino a k risultati. I record JSON sono serializzati al caricamento.
+
+Hot-reload: main.py pubblica uno snapshot (config.SNAPSHOT_FILE, con i path
+delle tabelle appena esportate); un thread controlla il file e, quando
+cambia, ricostruisce gli indici e li sostituisce in blocco. Le query in
+corso continuano a usare lo snapshot precedente.
+
+/simili risponde con i giocatori tecnicamente più simili a un bersaglio
+(similarita.IndiceSimilarita sugli indici FSTATS, ricostruito a ogni reload).
+
+Solo libreria standard + pandas (già dipendenza del progetto):
+    python ranking_server.py --port 8765
+    curl 'http://127.0.0.1:8765/giocatori?fonte=fpedia&ruolo=CEN&max_prezzo=15&infortunato=false&k=5'
+    curl 'http://127.0.0.1:8765/simili?giocatore=Dimarco&k=5&piu_economici=true'
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from loguru import logger
+
+import config
+from exporter import leggi_tabella
+from similarita import IndiceSimilarita
+
+# Colonne specifiche di ciascuna fonte
+FONTI = {
+    "fpedia": {"tabella": "fpedia_analysis", "squadra": "Squadra", "infortunato": "Infortunato"},
+    "fstats": {"tabella": "FSTATS_analysis", "squadra": "fantacalcioTeamName", "infortunato": "injured"},
+}
+
+# Ruoli FSTATS (P/D/C/A) ricondotti a quelli FPEDIA
+RUOLI = {"P": "POR", "D": "DIF", "C": "CEN", "A": "ATT"}
+
+ORDINAMENTI = ("Convenienza Potenziale", "Convenienza", "Prezzo Massimo Consigliato")
+PREZZO = "Prezzo Massimo Consigliato"
+TUTTI = "*"
+
+
+def _ruolo(valore) -> str:
+    ruolo = str(valore).strip().upper()
+    return RUOLI.get(ruolo, ruolo)
+
+
+def _squadra(valore) -> str:
+    return str(valore).strip().lower() if isinstance(valore, str) else ""
+
+
+def pubblica_snapshot(path: str, tabelle: Dict[str, str]):
+    """
+    Pubblica un nuovo snapshot per il server: tabelle = {fonte: path}.
+    Il file viene sostituito atomicamente, così il server non legge mai
+    uno snapshot scritto a metà.
+    """
+    snapshot = {"versione": datetime.now().isoformat(timespec="seconds"), "tabelle": tabelle}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(snapshot, fp, indent=2)
+    os.replace(tmp, path)
+    logger.info(f"Snapshot pubblicato: {path}")
+
+
+class Classifica:
+    """Indici in memoria su una tabella di analisi (una fonte)."""
+
+    def __init__(self, df: pd.DataFrame, fonte: str):
+        colonne = FONTI[fonte]
+        self.fonte = fonte
+        self.n = len(df)
+        df = df.reset_index(drop=True)
+
+        # Record già serializzati (NaN -> null)
+        valori = df.astype(object).where(df.notna(), None)
+        self.record: List[dict] = valori.to_dict("records")
+        self.json: List[str] = [json.dumps(r, ensure_ascii=False, default=str) for r in self.record]
+
+        # Colonne usate dai filtri, come liste Python (accesso O(1) senza pandas)
+        self.ruolo = [_ruolo(v) for v in df["Ruolo"].tolist()]
+        self.squadra = [_squadra(v) for v in df.get(colonne["squadra"], pd.Series([None] * self.n)).tolist()]
+        self.infortunato = [bool(v) if pd.notna(v) else False
+                            for v in df.get(colonne["infortunato"], pd.Series([False] * self.n)).tolist()]
+        prezzi = pd.to_numeric(df.get(PREZZO, pd.Series([None] * self.n)), errors="coerce")
+        self.prezzo = prezzi.tolist()
+
+        gruppi = {TUTTI: list(range(self.n))}
+        for pos, ruolo in enumerate(self.ruolo):
+            gruppi.setdefault(ruolo, []).append(pos)
+
+        # Ordine per (ruolo, criterio) e rango globale per criterio (decrescente, NaN in fondo)
+        self.ordine: Dict[tuple, List[int]] = {}
+        self.rango: Dict[str, List[int]] = {}
+        for criterio in ORDINAMENTI:
+            if criterio not in df.columns:
+                continue
+            valori = pd.to_numeric(df[criterio], errors="coerce")
+            ordine = valori.sort_values(ascending=False, kind="mergesort", na_position="last").index.tolist()
+            rango = [0] * self.n
+            for r, pos in enumerate(ordine):
+                rango[pos] = r
+            self.rango[criterio] = rango
+            for ruolo, posizioni in gruppi.items():
+                self.ordine[(ruolo, criterio)] = sorted(posizioni, key=rango.__getitem__)
+
+        # Prezzi ordinati per ruolo: (prezzi, posizioni) allineati
+        self.per_prezzo: Dict[str, tuple] = {}
+        for ruolo, posizioni in gruppi.items():
+            coppie = sorted((self.prezzo[pos], pos) for pos in posizioni if pd.notna(self.prezzo[pos]))
+            self.per_prezzo[ruolo] = ([p for p, _ in coppie], [pos for _, pos in coppie])
+
+        self.per_squadra: Dict[str, List[int]] = {}
+        for pos, squadra in enumerate(self.squadra):
+            self.per_squadra.setdefault(squadra, []).append(pos)
+
+    def cerca(self, ruolo: Optional[str] = None, squadra: Optional[str] = None,
+              min_prezzo: Optional[float] = None, max_prezzo: Optional[float] = None,
+              infortunato: Optional[bool] = None, ordina: str = ORDINAMENTI[0],
+              k: int = 20) -> List[int]:
+        """Posizioni dei primi k giocatori che soddisfano i filtri, in ordine di `ordina`."""
+        if k < 1:
+            raise ValueError(f"k deve essere almeno 1: {k}")
+        if ordina not in self.rango:
+            raise ValueError(f"Ordinamento non disponibile: {ordina}")
+        ruolo = _ruolo(ruolo) if ruolo else TUTTI
+        squadra = _squadra(squadra) if squadra else None
+        ordine = self.ordine.get((ruolo, ordina), [])
+
+        # Candidati dall'indice più selettivo; altrimenti si scorre l'ordine del ruolo
+        candidati = None
+        if squadra is not None:
+            candidati = self.per_squadra.get(squadra, [])
+        if min_prezzo is not None or max_prezzo is not None:
+            prezzi, posizioni = self.per_prezzo.get(ruolo, ([], []))
+            lo = bisect_left(prezzi, min_prezzo) if min_prezzo is not None else 0
+            hi = bisect_right(prezzi, max_prezzo) if max_prezzo is not None else len(prezzi)
+            if candidati is None or hi - lo < len(candidati):
+                candidati = posizioni[lo:hi]
+        if candidati is not None and len(candidati) < len(ordine):
+            sequenza = sorted(candidati, key=self.rango[ordina].__getitem__)
+        else:
+            sequenza = ordine
+
+        risultati = []
+        for pos in sequenza:
+            if ruolo != TUTTI and self.ruolo[pos] != ruolo:
+                continue
+            if squadra is not None and self.squadra[pos] != squadra:
+                continue
+            if infortunato is not None and self.infortunato[pos] != infortunato:
+                continue
+            if min_prezzo is not None or max_prezzo is not None:
+                prezzo = self.prezzo[pos]
+                if pd.isna(prezzo) or (min_prezzo is not None and prezzo < min_prezzo) \
+                        or (max_prezzo is not None and prezzo > max_prezzo):
+                    continue
+            risultati.append(pos)
+            if len(risultati) == k:
+                break
+        return risultati
+
+
+class RankingStore:
+    """
+    Snapshot corrente delle classifiche ({fonte: Classifica}), ricaricato
+    quando il file di snapshot (o, in sua assenza, una tabella) cambia.
+    """
+
+    def __init__(self, snapshot_file: str = config.SNAPSHOT_FILE, output_dir: str = config.OUTPUT_DIR):
+        self.snapshot_file = snapshot_file
+        self.output_dir = output_dir
+        self.classifiche: Dict[str, Classifica] = {}
+        self.simili: Optional[IndiceSimilarita] = None
+        self.versione: Optional[str] = None
+        self._firma = None
+        self._lock = threading.Lock()
+
+    def _tabelle(self) -> Dict[str, str]:
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, encoding="utf-8") as fp:
+                return json.load(fp)["tabelle"]
+        return {fonte: os.path.join(self.output_dir, f"{c['tabella']}.xlsx") for fonte, c in FONTI.items()}
+
+    def _firma_corrente(self):
+        files = [self.snapshot_file] if os.path.exists(self.snapshot_file) else list(self._tabelle().values())
+        return tuple(os.path.getmtime(f) if os.path.exists(f) else None for f in files)
+
+    def ricarica(self, forza: bool = False) -> bool:
+        """Ricostruisce gli indici se lo snapshot è cambiato; True se ricaricato."""
+        with self._lock:
+            firma = self._firma_corrente()
+            if not forza and firma == self._firma:
+                return False
+            start = time.perf_counter()
+            classifiche = {}
+            simili = None
+            for fonte, path in self._tabelle().items():
+                if fonte in FONTI and os.path.exists(path):
+                    df = leggi_tabella(path)
+                    classifiche[fonte] = Classifica(df, fonte)
+                    if fonte == "fstats":
+                        try:
+                            simili = IndiceSimilarita(df, partizioni=config.SIMILARITA_PARTIZIONI)
+                        except (KeyError, ValueError) as e:
+                            logger.warning(f"Indice similarità non disponibile: {e}")
+            versione = None
+            if os.path.exists(self.snapshot_file):
+                with open(self.snapshot_file, encoding="utf-8") as fp:
+                    versione = json.load(fp).get("versione")
+            # Sostituzione in blocco: le richieste in corso tengono il riferimento vecchio
+            self.classifiche, self.simili, self.versione, self._firma = classifiche, simili, versione, firma
+            logger.info(f"Classifiche caricate in {time.perf_counter() - start:.2f}s: "
+                        + ", ".join(f"{f}={c.n}" for f, c in classifiche.items()))
+            return True
+
+    def avvia_controllo(self, intervallo: float = 2.0):
+        """Thread demone che controlla lo snapshot ogni `intervallo` secondi."""
+        def ciclo():
+            while True:
+                time.sleep(intervallo)
+                try:
+                    self.ricarica()
+                except Exception as e:
+                    logger.error(f"Ricaricamento snapshot fallito: {e}")
+
+        threading.Thread(target=ciclo, daemon=True).start()
+
+
+def _bool(valore: str) -> bool:
+    return valore.strip().lower() in ("1", "true", "si", "sì", "yes")
+
+
+def _k(params: Dict[str, str], default: int) -> int:
+    k = int(params.get("k", default))
+    if k < 1:
+        raise ValueError(f"k deve essere almeno 1: {k}")
+    return k
+
+
+class RankingHandler(BaseHTTPRequestHandler):
+    store: RankingStore = None
+
+    def _rispondi(self, status: int, corpo: str):
+        dati = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dati)))
+        self.end_headers()
+        self.wfile.write(dati)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        classifiche = self.store.classifiche
+        try:
+            if url.path == "/health":
+                corpo = json.dumps({"versione": self.store.versione,
+                                    "giocatori": {f: c.n for f, c in classifiche.items()}})
+            elif url.path == "/giocatori":
+                corpo = self._giocatori(classifiche, params)
+            elif url.path == "/simili":
+                corpo = self._simili(self.store.simili, params)
+            else:
+                return self._rispondi(404, json.dumps({"errore": f"percorso sconosciuto: {url.path}"}))
+        except (KeyError, ValueError) as e:
+            return self._rispondi(400, json.dumps({"errore": e.args[0] if e.args else str(e)}, ensure_ascii=False))
+        self._rispondi(200, corpo)
+
+    def _giocatori(self, classifiche: Dict[str, Classifica], params: Dict[str, str]) -> str:
+        fonte = params.get("fonte", "fpedia").lower()
+        if fonte not in classifiche:
+            raise KeyError(f"fonte non disponibile: {fonte}")
+        classifica = classifiche[fonte]
+        start = time.perf_counter()
+        posizioni = classifica.cerca(
+            ruolo=params.get("ruolo"),
+            squadra=params.get("squadra"),
+            min_prezzo=float(params["min_prezzo"]) if "min_prezzo" in params else None,
+            max_prezzo=float(params["max_prezzo"]) if "max_prezzo" in params else None,
+            infortunato=_bool(params["infortunato"]) if "infortunato" in params else None,
+            ordina=params.get("ordina", ORDINAMENTI[0]),
+            k=_k(params, 20),
+        )
+        if "campi" in params:
+            campi = params["campi"].split(",")
+            giocatori = ",".join(json.dumps({c: classifica.record[p].get(c) for c in campi},
+                                            ensure_ascii=False, default=str) for p in posizioni)
+        else:
+            giocatori = ",".join(classifica.json[p] for p in posizioni)
+        tempo_ms = (time.perf_counter() - start) * 1000
+        return (f'{{"versione": {json.dumps(self.store.versione)}, "fonte": "{fonte}", '
+                f'"n": {len(posizioni)}, "tempo_ms": {tempo_ms:.3f}, "giocatori": [{giocatori}]}}')
+
+    def _simili(self, indice: Optional[IndiceSimilarita], params: Dict[str, str]) -> str:
+        if indice is None:
+            raise KeyError("indice similarità non disponibile (serve FSTATS_analysis)")
+        if "giocatore" not in params:
+            raise KeyError("parametro obbligatorio: giocatore (nome o fantacalcioPlayerId)")
+        start = time.perf_counter()
+        risultato = indice.simili(
+            params["giocatore"],
+            k=_k(params, 10),
+            max_prezzo=float(params["max_prezzo"]) if "max_prezzo" in params else None,
+            piu_economici=_bool(params.get("piu_economici", "false")),
+            stesso_ruolo=not _bool(params.get("tutti_i_ruoli", "false")),
+        )
+        giocatori = risultato.astype(object).where(risultato.notna(), None).to_dict("records")
+        return json.dumps({"versione": self.store.versione, "bersaglio": risultato.attrs["bersaglio"],
+                           "n": len(giocatori), "tempo_ms": round((time.perf_counter() - start) * 1000, 3),
+                           "giocatori": giocatori}, ensure_ascii=False, default=str)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def crea_server(store: RankingStore, host: str = config.RANKING_SERVER_HOST,
+                port: int = config.RANKING_SERVER_PORT) -> ThreadingHTTPServer:
+    handler = type("Handler", (RankingHandler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server locale delle classifiche (sola lettura)")
+    parser.add_argument("--host", default=config.RANKING_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.RANKING_SERVER_PORT)
+    parser.add_argument("--snapshot", default=config.SNAPSHOT_FILE)
+    parser.add_argument("--intervallo", type=float, default=2.0, help="secondi tra i controlli dello snapshot")
+    args = parser.parse_args()
+
+    store = RankingStore(args.snapshot)
+    store.ricarica(forza=True)
+    store.avvia_controllo(args.intervallo)
+
+    server = crea_server(store, args.host, args.port)
+    logger.info(f"Server classifiche su http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+# scoring_rules.py
+"""
+Motore dichiarativo per lo score complessivo usato nel calcolo del prezzo
+massimo consigliato.
+
+Un ruleset è un semplice dict (caricabile anche da JSON o TOML) che descrive
+i termini dello score: da quale colonna prendere il valore, come
+normalizzarlo, con che peso sommarlo e con quali parametri per ruolo.
+`compila_regole` lo trasforma in una funzione vettoriale che valuta il
+frame di un ruolo con sole operazioni pandas/NumPy.
+
+Formato di un termine:
+
+    {
+        "nome": "fantamedia",
+        "sorgente": {"colonna": "fanta_avg", "fillna": 0},
+        "trasformazioni": [{"sottrai": 4.5}, {"dividi": 3.0}, {"clip": [0, 1]}],
+        "peso": {"per_ruolo": {"ATT": 30, "default": 45}},
+    }
+
+Sorgenti supportate:
+- {"colonna": col, "fillna": v}          valore della colonna
+- {"rapporto": [num, den]}               num / den per partita (den >= 1)
+- {"media": [col, ...], "fillna": v}     media riga per riga delle colonne presenti
+- {"skills": mappa, "colonna": col}      somma dei bonus delle skill
+- {"booleano": col}                      flag 0/1
+
+Trasformazioni (applicate in ordine): "sottrai", "dividi", "clip",
+"soglie" (lista di [soglia, valore] decrescenti, con "altrimenti").
+Un termine con "termini" al posto di "sorgente" è un gruppo: i suoi
+sotto-termini vengono sommati, poi trasformati, pesati e sommati (o
+sottratti se "segno" è -1) allo score.
+
+Qualunque valore numerico può essere reso dipendente dal ruolo con
+{"per_ruolo": {"ATT": ..., "CEN": ..., "default": ...}}.
+"""
+import ast
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+
+# Alias dei ruoli: FPEDIA usa ATT/CEN/DIF/POR, FSTATS usa A/C/D/P
+RUOLI_CANONICI = {
+    "ATT": "ATT",
+    "A": "ATT",
+    "CEN": "CEN",
+    "C": "CEN",
+    "DIF": "DIF",
+    "D": "DIF",
+    "POR": "POR",
+    "P": "POR",
+}
+
+
+# --- Ruleset di default (riproducono esattamente gli score storici) ---
+
+REGOLE_FPEDIA = {
+    "nome": "fpedia_default",
+    "moltiplicatore_ruolo": {
+        "per_ruolo": {"ATT": 1.2, "CEN": 1.0, "DIF": 0.9, "POR": 0.8, "default": 1.0}
+    },
+    "clip_finale": [0, 100],
+    "termini": [
+        # 1. FANTAMEDIA (peso 50%)
+        {
+            "nome": "fantamedia",
+            "sorgente": {"colonna": "Fantamedia anno 2024-2025", "fillna": 0},
+            "trasformazioni": [{"sottrai": 4.5}, {"dividi": 2.5}, {"clip": [0, 1]}],
+            "peso": 50,
+        },
+        # 2. PRESENZE/AFFIDABILITÀ (peso 35%)
+        {
+            "nome": "affidabilita",
+            "sorgente": {"colonna": "Presenze campionato corrente", "fillna": 0},
+            "trasformazioni": [
+                {
+                    "soglie": [[30, 1.0], [25, 0.8], [20, 0.6], [15, 0.4], [10, 0.25], [5, 0.1]],
+                    "altrimenti": 0.02,
+                }
+            ],
+            "peso": 35,
+        },
+        # 3. PUNTEGGIO FPEDIA (peso 10%)
+        {
+            "nome": "punteggio",
+            "sorgente": {"colonna": "Punteggio", "fillna": 50},
+            "trasformazioni": [{"sottrai": 30}, {"dividi": 70}, {"clip": [0, 1]}],
+            "peso": 10,
+        },
+        # 4. SKILLS (peso 3%)
+        {
+            "nome": "skills",
+            "sorgente": {
+                "colonna": "Skills",
+                "skills": {
+                    "Rigorista": 8,
+                    "Goleador": 6,
+                    "Titolare": 4,
+                    "Assistman": 3,
+                    "Piazzati": 2,
+                    "Panchinaro": -10,
+                    "Falloso": -5,
+                    "Fuoriclasse": 2,
+                    "Buona Media": 1,
+                },
+            },
+            "trasformazioni": [{"sottrai": -10}, {"dividi": 20}, {"clip": [0, 1]}],
+            "peso": 3,
+        },
+        # 5. BONUS MINORI (peso 2%)
+        {
+            "nome": "bonus_minori",
+            "termini": [
+                {
+                    "nome": "resistenza",
+                    "sorgente": {"colonna": "Resistenza infortuni", "fillna": 50},
+                    "trasformazioni": [{"sottrai": 50}, {"dividi": 50}, {"clip": [0, 1]}],
+                    "peso": 1,
+                },
+                {
+                    "nome": "investimento",
+                    "sorgente": {"colonna": "Buon investimento", "fillna": 0},
+                    "trasformazioni": [{"sottrai": 50}, {"dividi": 50}, {"clip": [0, 1]}],
+                    "peso": 1,
+                },
+            ],
+        },
+    ],
+}
+
+
+def _rate_offensivo(nome, colonna, scala_att, clip_att, scala, peso):
+    """Termine 'statistica per partita' con normalizzazione diversa per ATT."""
+    return {
+        "nome": nome,
+        "sorgente": {"rapporto": [colonna, "presences"]},
+        "trasformazioni": [
+            {"dividi": {"per_ruolo": {"ATT": scala_att, "default": scala}}},
+            {"clip": {"per_ruolo": {"ATT": [0, clip_att], "default": [0, 1.0]}}},
+        ],
+        "peso": peso,
+    }
+
+
+REGOLE_FSTATS = {
+    "nome": "fstats_default",
+    "moltiplicatore_ruolo": {
+        "per_ruolo": {"ATT": 1.0, "CEN": 1.0, "DIF": 0.85, "POR": 0.8, "default": 1.0}
+    },
+    "clip_finale": {
+        "per_ruolo": {"ATT": [0, 200], "CEN": [0, 150], "DIF": [0, 120], "default": [0, 100]}
+    },
+    "termini": [
+        # 1. FANTAMEDIA (peso variabile per ruolo)
+        {
+            "nome": "fantamedia",
+            "sorgente": {"colonna": "fanta_avg", "fillna": 0},
+            "trasformazioni": [{"sottrai": 4.5}, {"dividi": 3.0}, {"clip": [0, 1]}],
+            "peso": {"per_ruolo": {"ATT": 30, "default": 45}},
+        },
+        # 2. AFFIDABILITÀ E UTILIZZO (presenze + titolarità)
+        {
+            "nome": "utilizzo",
+            "termini": [
+                {
+                    "nome": "presenze",
+                    "sorgente": {"colonna": "presences", "fillna": 0},
+                    "trasformazioni": [
+                        {
+                            "per_ruolo": {
+                                # Per centrocampisti: meno penalizzante sulle presenze
+                                "CEN": {
+                                    "soglie": [[30, 1.0], [25, 0.85], [20, 0.7], [15, 0.55], [10, 0.4], [5, 0.25]],
+                                    "altrimenti": 0.1,
+                                },
+                                "default": {
+                                    "soglie": [[30, 1.0], [25, 0.75], [20, 0.5], [15, 0.3], [10, 0.15], [5, 0.05]],
+                                    "altrimenti": 0.01,
+                                },
+                            }
+                        }
+                    ],
+                    "peso": {"per_ruolo": {"ATT": 15, "default": 20}},
+                },
+                {
+                    "nome": "titolarita",
+                    "sorgente": {"colonna": "perc_matchesStarted", "fillna": 0},
+                    "trasformazioni": [
+                        {"dividi": 100},
+                        {
+                            "soglie": [[0.85, 1.0], [0.7, 0.7], [0.5, 0.4], [0.3, 0.2]],
+                            "altrimenti": 0.05,
+                        },
+                    ],
+                    "peso": 10,
+                },
+            ],
+        },
+        # 3. STATISTICHE OFFENSIVE (peso variabile per ruolo)
+        {
+            "nome": "offensive",
+            "termini": [
+                _rate_offensivo("gol", "goals", 0.5, 2.0, 0.8, 0.35),
+                _rate_offensivo("xg", "xgFromOpenPlays", 0.4, 1.8, 0.6, 0.25),
+                _rate_offensivo("assist", "assists", 0.25, 1.6, 0.5, 0.2),
+                _rate_offensivo("xa", "xA", 0.2, 1.5, 0.4, 0.15),
+            ],
+            "peso": {"per_ruolo": {"ATT": 35, "CEN": 20, "DIF": 3, "POR": 0, "default": 5}},
+        },
+        # 4. FANTACALCIO INDEX (peso ridotto per ATT)
+        {
+            "nome": "fantaindex",
+            "sorgente": {"colonna": "fantacalcioFantaindex", "fillna": 0},
+            "trasformazioni": [{"sottrai": 60}, {"dividi": 40}, {"clip": [0, 1]}],
+            "peso": {"per_ruolo": {"ATT": 5, "default": 8}},
+        },
+        # 5. INDICI TECNICI
+        {
+            "nome": "indici_tecnici",
+            "sorgente": {
+                "media": [
+                    "Shot_on_goal_Index",
+                    "Offensive_actions_Index",
+                    "Pass_forward_accuracy_Index",
+                    "Attacking_area_Index",
+                    "Pass_leading_chances_Index",
+                    "Dribbles_successful_Index",
+                ],
+                "fillna": 0,
+            },
+            "trasformazioni": [{"dividi": 100}],
+            "peso": {"per_ruolo": {"ATT": 8, "default": 5}},
+        },
+        # 6. PENALITÀ
+        {
+            "nome": "penalita",
+            "termini": [
+                {
+                    "nome": "gialli",
+                    "sorgente": {"rapporto": ["yellowCards", "presences"]},
+                    "trasformazioni": [{"dividi": 0.4}],
+                    "peso": 2,
+                },
+                {"nome": "rossi", "sorgente": {"colonna": "redCards", "fillna": 0}, "peso": 5},
+                {"nome": "infortunato", "sorgente": {"booleano": "injured"}, "peso": 5},
+                {"nome": "squalificato", "sorgente": {"booleano": "banned"}, "peso": 3},
+            ],
+            "trasformazioni": [{"clip": [0, 10]}],
+            "peso": 0.2,
+            "segno": -1,
+        },
+    ],
+}
+
+
+def carica_regole(path: str) -> dict:
+    """Carica un ruleset da file JSON o TOML."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        if tomllib is None:
+            raise RuntimeError("Il supporto TOML richiede Python 3.11+ (tomllib).")
+        with open(path, "rb") as fp:
+            return tomllib.load(fp)
+    with open(path, "r", encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _risolvi(valore, ruolo: str):
+    """Risolve i valori {"per_ruolo": {...}} per il ruolo indicato."""
+    if isinstance(valore, dict) and "per_ruolo" in valore:
+        per_ruolo = valore["per_ruolo"]
+        canonico = RUOLI_CANONICI.get(ruolo, ruolo)
+        if canonico in per_ruolo:
+            return per_ruolo[canonico]
+        return per_ruolo.get("default")
+    return valore
+
+
+def _somma_skills(valore, mappa: dict) -> float:
+    try:
+        skills_list = ast.literal_eval(valore)
+        return sum(mappa.get(skill, 0) for skill in skills_list)
+    except Exception:
+        return 0
+
+
+def _compila_sorgente(sorgente: dict):
+    """Restituisce (colonne_richieste, funzione df -> Series) per una sorgente."""
+    if "skills" in sorgente:
+        col = sorgente.get("colonna", "Skills")
+        mappa = sorgente["skills"]
+
+        def valuta(df):
+            # Molte stringhe si ripetono: parsing una sola volta per valore
+            valori = df[col].astype(object)
+            unici = {v: _somma_skills(v, mappa) for v in pd.unique(valori)}
+            return pd.Series(valori.map(unici).to_numpy(dtype=float), index=df.index)
+
+        return [col], valuta
+
+    if "rapporto" in sorgente:
+        num, den = sorgente["rapporto"]
+
+        def valuta(df):
+            return df[num].fillna(0) / df[den].fillna(1).clip(lower=1)
+
+        return [num, den], valuta
+
+    if "media" in sorgente:
+        colonne = sorgente["media"]
+        fill = sorgente.get("fillna", 0)
+
+        def valuta(df):
+            presenti = [c for c in colonne if c in df.columns]
+            return df[presenti].fillna(fill).mean(axis=1)
+
+        # Basta una colonna disponibile (verificato in _richieste_soddisfatte)
+        return [colonne], valuta
+
+    if "booleano" in sorgente:
+        col = sorgente["booleano"]
+
+        def valuta(df):
+            return df[col].fillna(False).astype(int)
+
+        return [col], valuta
+
+    if "colonna" in sorgente:
+        col = sorgente["colonna"]
+        fill = sorgente.get("fillna")
+
+        def valuta(df):
+            return df[col] if fill is None else df[col].fillna(fill)
+
+        return [col], valuta
+
+    raise ValueError(f"Sorgente non riconosciuta: {sorgente}")
+
+
+def _richieste_soddisfatte(richieste: list, colonne) -> bool:
+    for req in richieste:
+        if isinstance(req, list):
+            if not any(c in colonne for c in req):
+                return False
+        elif req not in colonne:
+            return False
+    return True
+
+
+def _compila_trasformazioni(trasformazioni: list, ruolo: str):
+    passi = []
+    for t in trasformazioni or []:
+        t = _risolvi(t, ruolo)
+        if "sottrai" in t:
+            v = _risolvi(t["sottrai"], ruolo)
+            passi.append(lambda s, v=v: s - v)
+        elif "dividi" in t:
+            v = _risolvi(t["dividi"], ruolo)
+            passi.append(lambda s, v=v: s / v)
+        elif "clip" in t:
+            lo, hi = _risolvi(t["clip"], ruolo)
+            passi.append(lambda s, lo=lo, hi=hi: s.clip(lo, hi))
+        elif "soglie" in t:
+            soglie = _risolvi(t["soglie"], ruolo)
+            altrimenti = _risolvi(t.get("altrimenti", 0.0), ruolo)
+            limiti = [float(s) for s, _ in soglie]
+            valori = [float(v) for _, v in soglie]
+
+            def passo(s, limiti=limiti, valori=valori, altrimenti=float(altrimenti)):
+                x = s.to_numpy()
+                out = np.select([x >= lim for lim in limiti], valori, default=altrimenti)
+                return pd.Series(out, index=s.index)
+
+            passi.append(passo)
+        else:
+            raise ValueError(f"Trasformazione non riconosciuta: {t}")
+    return passi
+
+
+def _compila_termine(termine: dict, ruolo: str):
+    """Compila un termine (o gruppo) per un ruolo. Restituisce (richieste, fn) o None."""
+    peso = _risolvi(termine.get("peso"), ruolo)
+    if peso == 0:
+        return None
+    segno = _risolvi(termine.get("segno", 1), ruolo)
+    passi = _compila_trasformazioni(termine.get("trasformazioni"), ruolo)
+
+    if "termini" in termine:
+        figli = [_compila_termine(t, ruolo) for t in termine["termini"]]
+        figli = [f for f in figli if f is not None]
+
+        def valuta_base(df):
+            acc = pd.Series(0.0, index=df.index)
+            for richieste, fn in figli:
+                if _richieste_soddisfatte(richieste, df.columns):
+                    acc = acc - fn(df) if fn.segno == -1 else acc + fn(df)
+            return acc
+
+        richieste = []
+    else:
+        richieste, valuta_base = _compila_sorgente(termine["sorgente"])
+
+    def valuta(df):
+        valore = valuta_base(df)
+        for passo in passi:
+            valore = passo(valore)
+        if peso is not None:
+            valore = valore * peso
+        return valore
+
+    valuta.segno = segno
+    return richieste, valuta
+
+
+class RegoleCompilate:
+    """
+    Ruleset compilato: per ogni ruolo tiene la lista di funzioni vettoriali
+    pronte all'uso e misura il tempo speso nelle valutazioni.
+    """
+
+    def __init__(self, regole: dict):
+        self.regole = regole
+        self.nome = regole.get("nome", "custom")
+        self._per_ruolo = {}
+        self.chiamate = 0
+        self.tempo_totale = 0.0
+
+    def _compila_ruolo(self, ruolo: str):
+        if ruolo not in self._per_ruolo:
+            termini = [_compila_termine(t, ruolo) for t in self.regole.get("termini", [])]
+            moltiplicatore = _risolvi(self.regole.get("moltiplicatore_ruolo", 1.0), ruolo)
+            clip_finale = _risolvi(self.regole.get("clip_finale"), ruolo)
+            self._per_ruolo[ruolo] = (
+                [t for t in termini if t is not None],
+                1.0 if moltiplicatore is None else moltiplicatore,
+                clip_finale,
+            )
+        return self._per_ruolo[ruolo]
+
+    def __call__(self, df_ruolo: pd.DataFrame, ruolo: str) -> pd.Series:
+        inizio = time.perf_counter()
+        termini, moltiplicatore, clip_finale = self._compila_ruolo(ruolo)
+
+        score = pd.Series(0.0, index=df_ruolo.index)
+        for richieste, fn in termini:
+            if not _richieste_soddisfatte(richieste, df_ruolo.columns):
+                continue
+            valore = fn(df_ruolo)
+            score = score - valore if fn.segno == -1 else score + valore
+
+        score = score * moltiplicatore
+        if clip_finale is not None:
+            score = score.clip(*clip_finale)
+
+        elapsed = time.perf_counter() - inizio
+        self.chiamate += 1
+        self.tempo_totale += elapsed
+        logger.debug(
+            f"Ruleset '{self.nome}' ruolo {ruolo}: {len(df_ruolo)} giocatori in {elapsed * 1000:.2f} ms"
+        )
+        return score
+
+
+def compila_regole(regole: dict) -> RegoleCompilate:
+    """Compila un ruleset (dict, o path a un file JSON/TOML)."""
+    if isinstance(regole, str):
+        regole = carica_regole(regole)
+    return RegoleCompilate(regole)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# similarita.py
+"""
+Ricerca dei giocatori più simili (k-nearest-neighbour) sugli indici tecnici FSTATS.
+
+Quando un obiettivo viene venduto all'asta serve "chi gioca come lui e costa
+meno". Ogni giocatore è descritto da tutti gli indici `*_Index` di FSTATS più
+xG/xA per 90 minuti, standardizzati per ruolo (z-score sulla distribuzione
+del ruolo: un indice di passaggio vale diversamente per un DIF e per un ATT).
+I valori -1 di FSTATS (indice non disponibile) valgono come media del ruolo;
+gli indici senza varianza nel ruolo vengono ignorati.
+
+Due modalità:
+- esatta: distanza euclidea vettorizzata dal bersaglio a tutti i giocatori
+  del ruolo (|x|² + |q|² - 2 x·q con i quadrati precalcolati), poi
+  argpartition per i primi k. Alla scala di una stagione è la scelta giusta.
+- partizionata: per pool grandi (più stagioni o campionati) ogni ruolo è
+  diviso con k-means in `partizioni` gruppi; la query valuta esattamente solo
+  i giocatori delle `sonde` partizioni con il centroide più vicino
+  (aggiungendone altre se i filtri lasciano meno di k risultati).
+
+Uso:
+    python similarita.py "Lautaro Martinez" --k 10 --piu-economici
+    python similarita.py 4730 --max-prezzo 20 --partizioni 16
+"""
+import argparse
+import unicodedata
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import config
+
+PREZZO = "Prezzo Massimo Consigliato"
+
+# Rate offensivi aggiunti agli *_Index
+FEATURE_RATE = ["xgFromOpenPlays/90min", "xA90min"]
+
+# Colonne restituite per ogni giocatore simile (se presenti)
+COLONNE_RISULTATO = ["Nome", "Ruolo", "fantacalcioTeamName", PREZZO, "Convenienza Potenziale",
+                     "Convenienza", "fantacalcioFantaindex", "fantacalcioPlayerId"]
+
+
+def feature_fstats(df: pd.DataFrame) -> List[str]:
+    """Indici tecnici FSTATS (*_Index) e rate xG/xA presenti nella tabella"""
+    indici = [c for c in df.columns if isinstance(c, str) and c.endswith("_Index")]
+    return indici + [c for c in FEATURE_RATE if c in df.columns]
+
+
+def _normalizza(nome) -> str:
+    nome = unicodedata.normalize("NFKD", str(nome))
+    return " ".join("".join(c for c in nome if not unicodedata.combining(c)).lower().split())
+
+
+def _kmeans(x: np.ndarray, k: int, iterazioni: int = 20, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Lloyd con inizializzazione k-means++: (centroidi, etichette)"""
+    rng = np.random.default_rng(seed)
+    centroidi = [x[rng.integers(len(x))]]
+    distanze = ((x - centroidi[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        totale = distanze.sum()
+        scelto = rng.choice(len(x), p=distanze / totale) if totale > 0 else rng.integers(len(x))
+        centroidi.append(x[scelto])
+        distanze = np.minimum(distanze, ((x - x[scelto]) ** 2).sum(axis=1))
+    centroidi = np.array(centroidi)
+    etichette = np.zeros(len(x), dtype=np.int64)
+    for _ in range(iterazioni):
+        d = (x ** 2).sum(axis=1)[:, None] + (centroidi ** 2).sum(axis=1)[None, :] - 2 * x @ centroidi.T
+        nuove = d.argmin(axis=1)
+        if np.array_equal(nuove, etichette) and _ > 0:
+            break
+        etichette = nuove
+        for c in range(k):
+            membri = x[etichette == c]
+            if len(membri):
+                centroidi[c] = membri.mean(axis=0)
+    return centroidi, etichette
+
+
+class _Ruolo:
+    """Vettori standardizzati dei giocatori di un ruolo (e partizioni opzionali)."""
+
+    def __init__(self, valori: np.ndarray, posizioni: np.ndarray, partizioni: Optional[int], seed: int):
+        # -1 = indice non disponibile in FSTATS
+        valori = np.where(valori == -1, np.nan, valori)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.media = np.nanmean(valori, axis=0)
+            self.dev = np.nanstd(valori, axis=0)
+        # Indici senza varianza (o mai presenti) nel ruolo: peso zero
+        self.attive = np.isfinite(self.dev) & (self.dev > 0)
+        self.posizioni = posizioni
+        self.x = self.standardizza(valori)
+        self.norme = (self.x ** 2).sum(axis=1)
+
+        self.centroidi = self.membri = None
+        if partizioni and partizioni > 1 and len(posizioni) > partizioni:
+            self.centroidi, etichette = _kmeans(self.x, partizioni, seed=seed)
+            self.membri = [np.flatnonzero(etichette == c) for c in range(partizioni)]
+
+    def standardizza(self, valori: np.ndarray) -> np.ndarray:
+        valori = np.where(valori == -1, np.nan, np.atleast_2d(valori))
+        z = np.zeros(valori.shape)
+        z[:, self.attive] = (valori[:, self.attive] - self.media[self.attive]) / self.dev[self.attive]
+        return np.nan_to_num(z, nan=0.0)
+
+    @property
+    def dimensioni(self) -> int:
+        return max(int(self.attive.sum()), 1)
+
+    def distanze(self, q: np.ndarray, righe: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distanze euclidee da q ai giocatori (tutti o solo `righe`)"""
+        x, norme = (self.x, self.norme) if righe is None else (self.x[righe], self.norme[righe])
+        return np.sqrt(np.maximum(norme + q @ q - 2 * x @ q, 0.0))
+
+
+class IndiceSimilarita:
+    """Indice k-NN per ruolo su una tabella FSTATS (FSTATS_analysis)."""
+
+    def __init__(self, df: pd.DataFrame, feature: Optional[List[str]] = None,
+                 partizioni: Optional[int] = None, sonde: int = config.SIMILARITA_SONDE,
+                 min_presenze: int = config.SIMILARITA_MIN_PRESENZE, seed: int = 0):
+        self.df = df.reset_index(drop=True)
+        self.feature = feature or feature_fstats(self.df)
+        if not self.feature:
+            raise ValueError("Nessun indice tecnico (*_Index) nella tabella")
+        self.sonde = sonde
+        self.valori = self.df[self.feature].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        self.ruolo = self.df["Ruolo"].astype(str).to_numpy()
+        self.prezzo = pd.to_numeric(self.df.get(PREZZO, pd.Series(np.nan, index=self.df.index)),
+                                    errors="coerce").to_numpy()
+        self.nomi = [_normalizza(n) for n in self.df["Nome"].tolist()]
+        self.id = ([str(v) for v in self.df["fantacalcioPlayerId"].tolist()]
+                   if "fantacalcioPlayerId" in self.df.columns else [])
+
+        # Nell'indice solo chi ha giocato abbastanza (indici più affidabili)
+        presenze = pd.to_numeric(self.df.get("presences", pd.Series(np.inf, index=self.df.index)),
+                                 errors="coerce").fillna(0).to_numpy()
+        self.ruoli: Dict[str, _Ruolo] = {}
+        for ruolo in pd.unique(self.ruolo):
+            posizioni = np.flatnonzero((self.ruolo == ruolo) & (presenze >= min_presenze))
+            if len(posizioni) < 2:
+                continue
+            n_partizioni = partizioni if partizioni != "auto" else int(np.sqrt(len(posizioni)))
+            self.ruoli[ruolo] = _Ruolo(self.valori[posizioni], posizioni, n_partizioni, seed)
+        logger.debug(f"Indice similarità: {len(self.feature)} feature, "
+                     + ", ".join(f"{r}={len(i.posizioni)}" for r, i in self.ruoli.items()))
+
+    def trova(self, giocatore) -> int:
+        """Posizione del giocatore: fantacalcioPlayerId o nome (anche parziale, senza accenti)"""
+        chiave = str(giocatore).strip()
+        if chiave in self.id:
+            return self.id.index(chiave)
+        nome = _normalizza(chiave)
+        esatti = [i for i, n in enumerate(self.nomi) if n == nome]
+        if len(esatti) == 1:
+            return esatti[0]
+        parole = nome.split()
+        parziali = esatti or [i for i, n in enumerate(self.nomi) if all(p in n.split() for p in parole)]
+        if len(parziali) == 1:
+            return parziali[0]
+        if not parziali:
+            raise KeyError(f"giocatore non trovato: {giocatore}")
+        nomi = ", ".join(str(self.df.at[i, "Nome"]) for i in parziali[:5])
+        raise KeyError(f"nome ambiguo: {giocatore} ({nomi}{', ...' if len(parziali) > 5 else ''})")
+
+    def vicini(self, pos: int, k: int = 10, max_prezzo: Optional[float] = None,
+               stesso_ruolo: bool = True) -> List[Tuple[int, float]]:
+        """(posizione, distanza RMS per feature) dei k più vicini, escluso il giocatore stesso"""
+        ruoli = [self.ruolo[pos]] if stesso_ruolo else list(self.ruoli)
+        trovati: List[Tuple[int, float]] = []
+        for ruolo in ruoli:
+            indice = self.ruoli.get(ruolo)
+            if indice is None:
+                continue
+            q = indice.standardizza(self.valori[pos])[0]
+            trovati.extend(self._vicini_ruolo(indice, q, pos, k, max_prezzo))
+        trovati.sort(key=lambda t: t[1])
+        return trovati[:k]
+
+    def _vicini_ruolo(self, indice: _Ruolo, q: np.ndarray, escluso: int, k: int,
+                      max_prezzo: Optional[float]) -> List[Tuple[int, float]]:
+        if indice.centroidi is None:
+            ordine_partizioni = [None]
+        else:
+            d_centroidi = np.sqrt(np.maximum(((indice.centroidi - q) ** 2).sum(axis=1), 0.0))
+            ordine_partizioni = list(np.argsort(d_centroidi))
+
+        risultati: List[Tuple[int, float]] = []
+        valutate = 0
+        while valutate < len(ordine_partizioni):
+            # Prima le `sonde` partizioni più vicine, poi una alla volta se i filtri scartano troppo
+            passo = self.sonde if valutate == 0 else 1
+            gruppo = ordine_partizioni[valutate:valutate + passo]
+            valutate += len(gruppo)
+            righe = None if gruppo == [None] else np.concatenate([indice.membri[c] for c in gruppo])
+            if righe is not None and not len(righe):
+                continue
+            distanze = indice.distanze(q, righe)
+            posizioni = indice.posizioni if righe is None else indice.posizioni[righe]
+            validi = posizioni != escluso
+            if max_prezzo is not None:
+                validi &= self.prezzo[posizioni] <= max_prezzo
+            posizioni, distanze = posizioni[validi], distanze[validi]
+            if len(posizioni) > k:
+                primi = np.argpartition(distanze, k)[:k]
+                posizioni, distanze = posizioni[primi], distanze[primi]
+            risultati.extend(zip(posizioni.tolist(), (distanze / np.sqrt(indice.dimensioni)).tolist()))
+            if len(risultati) >= k:
+                break
+        return risultati
+
+    def simili(self, giocatore, k: int = 10, max_prezzo: Optional[float] = None,
+               piu_economici: bool = False, stesso_ruolo: bool = True) -> pd.DataFrame:
+        """
+        I k giocatori più simili con prezzo e score. `piu_economici` limita ai
+        giocatori con Prezzo Massimo Consigliato inferiore a quello del bersaglio.
+        similarita = 1 / (1 + distanza), distanza = RMS degli scarti standardizzati.
+        """
+        if k < 1:
+            raise ValueError(f"k deve essere almeno 1: {k}")
+        pos = self.trova(giocatore)
+        if piu_economici and np.isfinite(self.prezzo[pos]):
+            soglia = self.prezzo[pos] - 1e-9
+            max_prezzo = soglia if max_prezzo is None else min(max_prezzo, soglia)
+        trovati = self.vicini(pos, k, max_prezzo, stesso_ruolo)
+        colonne = [c for c in COLONNE_RISULTATO if c in self.df.columns]
+        risultato = self.df.loc[[p for p, _ in trovati], colonne].reset_index(drop=True)
+        risultato["distanza"] = [d for _, d in trovati]
+        risultato["similarita"] = 1 / (1 + risultato["distanza"])
+        risultato.attrs["bersaglio"] = self.df.at[pos, "Nome"]
+        return risultato
+
+
+def main():
+    from exporter import leggi_tabella
+
+    parser = argparse.ArgumentParser(description="Giocatori più simili (indici tecnici FSTATS)")
+    parser.add_argument("giocatore", help="nome (anche parziale) o fantacalcioPlayerId")
+    parser.add_argument("--file", default=f"{config.OUTPUT_DIR}/FSTATS_analysis.xlsx")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-prezzo", type=float)
+    parser.add_argument("--piu-economici", action="store_true", help="solo chi costa meno del bersaglio")
+    parser.add_argument("--tutti-i-ruoli", action="store_true")
+    parser.add_argument("--partizioni", type=lambda v: v if v == "auto" else int(v),
+                        default=config.SIMILARITA_PARTIZIONI, help="k-means per ruolo (numero o 'auto')")
+    args = parser.parse_args()
+
+    indice = IndiceSimilarita(leggi_tabella(args.file), partizioni=args.partizioni)
+    try:
+        risultato = indice.simili(args.giocatore, args.k, args.max_prezzo, args.piu_economici,
+                                  not args.tutti_i_ruoli)
+    except KeyError as e:
+        parser.error(e.args[0])
+    print(f"Più simili a {risultato.attrs['bersaglio']}:")
+    print(risultato.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
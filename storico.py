@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# storico.py
+"""
+Storico giornaliero dei giocatori: una base più delta colonnari per giorno.
+
+Di giorno in giorno cambiano pochi valori (infortuni, Trend, Punteggio,
+presenze, prezzi): invece di una copia completa per data, ogni fonte tiene
+
+    <cartella>/base.json     stato completo alla prima data (colonnare)
+    <cartella>/delta.jsonl   una riga per data registrata successiva:
+                             {"data": ..., "colonne": {colonna: {"chiavi": [...], "valori": [...]}},
+                              "aggiunti": [...], "rimossi": [...]}
+
+quindi lo spazio cresce con il numero di valori cambiati, non con i giorni.
+I giocatori sono identificati da una chiave stabile (URL FPEDIA,
+fantacalcioPlayerId FSTATS; Nome se la colonna manca).
+
+- `stato(data)` ricostruisce la tabella a una data applicando alla base i
+  delta fino a quella data (aggiornamenti di dizionari, un passaggio)
+- `differenze(da, a)` legge solo i delta tra le due date, più i valori
+  precedenti delle sole celle toccate: nessuna copia completa in memoria
+
+Uso:
+    python storico.py date --fonte fpedia
+    python storico.py stato --fonte fpedia --data 2025-10-12 --output stato.csv
+    python storico.py diff --fonte fstats --da 2025-10-01 --a 2025-10-12
+    python storico.py registra --fonte fpedia --file data/output/fpedia_analysis.xlsx --data 2025-10-12
+"""
+import argparse
+import json
+import os
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+import config
+from exporter import leggi_tabella
+
+# Fonte -> chiave preferita e colonne tracciate (Nome sempre, per leggere i diff)
+FONTI = {
+    "fpedia": {"chiave": "URL", "colonne": config.STORICO_COLONNE_FPEDIA},
+    "fstats": {"chiave": "fantacalcioPlayerId", "colonne": config.STORICO_COLONNE_FSTATS},
+}
+
+
+def _valore(v):
+    """Valore JSON: tipi numpy -> Python, NaN -> None"""
+    if v is None:
+        return None
+    if hasattr(v, "item"):
+        v = v.item()
+    if isinstance(v, float) and v != v:
+        return None
+    return v
+
+
+def _valori(serie: pd.Series) -> list:
+    return [_valore(v) for v in serie.tolist()]
+
+
+def _data(valore) -> str:
+    """Data ISO (accetta str, date, Timestamp)"""
+    return pd.Timestamp(valore).date().isoformat()
+
+
+class StoricoSnapshot:
+    """Base + delta colonnari per giorno di una fonte."""
+
+    def __init__(self, cartella: str, chiave: str = "URL", colonne: Optional[List[str]] = None):
+        self.cartella = cartella
+        self.base_path = os.path.join(cartella, "base.json")
+        self.delta_path = os.path.join(cartella, "delta.jsonl")
+        self._chiave = chiave
+        self._colonne = colonne
+        self._base: Optional[dict] = None
+
+    # --- lettura ------------------------------------------------------------
+
+    def esiste(self) -> bool:
+        return os.path.exists(self.base_path)
+
+    def base(self) -> dict:
+        if self._base is None:
+            with open(self.base_path, encoding="utf-8") as fp:
+                self._base = json.load(fp)
+        return self._base
+
+    @property
+    def chiave(self) -> str:
+        return self.base()["chiave"] if self.esiste() else self._chiave
+
+    @property
+    def colonne(self) -> List[str]:
+        return self.base()["colonne"] if self.esiste() else list(self._colonne or [])
+
+    def delta(self) -> Iterator[dict]:
+        """Delta in ordine di data"""
+        if not os.path.exists(self.delta_path):
+            return
+        with open(self.delta_path, encoding="utf-8") as fp:
+            for riga in fp:
+                if riga.strip():
+                    yield json.loads(riga)
+
+    def date(self) -> List[str]:
+        if not self.esiste():
+            return []
+        return [self.base()["data"]] + [d["data"] for d in self.delta()]
+
+    def _stato_dict(self, data: Optional[str] = None) -> Tuple[str, Dict[str, dict]]:
+        """(data effettiva, colonna -> {chiave: valore}) all'ultima data <= data"""
+        base = self.base()
+        if data is not None and data < base["data"]:
+            raise ValueError(f"Nessuno snapshot prima del {base['data']} (richiesto {data})")
+        chiavi = base["chiavi"]
+        stato = {col: dict(zip(chiavi, base["valori"][col])) for col in base["colonne"]}
+        presenti = dict.fromkeys(chiavi)
+        effettiva = base["data"]
+        for delta in self.delta():
+            if data is not None and delta["data"] > data:
+                break
+            for col, cambi in delta["colonne"].items():
+                stato[col].update(zip(cambi["chiavi"], cambi["valori"]))
+            presenti.update(dict.fromkeys(delta["aggiunti"]))
+            for chiave in delta["rimossi"]:
+                presenti.pop(chiave, None)
+                for valori in stato.values():
+                    valori.pop(chiave, None)
+            effettiva = delta["data"]
+        return effettiva, {col: {k: valori.get(k) for k in presenti} for col, valori in stato.items()}
+
+    def stato(self, data=None) -> pd.DataFrame:
+        """Tabella (chiave + colonne tracciate) all'ultima data registrata <= data"""
+        data = _data(data) if data is not None else None
+        effettiva, stato = self._stato_dict(data)
+        chiavi = list(next(iter(stato.values())).keys()) if stato else []
+        df = pd.DataFrame({self.chiave: chiavi, **{col: list(stato[col].values()) for col in self.colonne}})
+        df.attrs["data"] = effettiva
+        return df
+
+    def differenze(self, da, a) -> pd.DataFrame:
+        """
+        Celle cambiate tra le date `da` e `a` (da < a): chiave, Nome, colonna,
+        prima, dopo. Giocatori aggiunti/rimossi hanno colonna "+" / "-".
+        """
+        da, a = _data(da), _data(a)
+        if da >= a:
+            raise ValueError(f"Intervallo non valido: {da} >= {a}")
+
+        # 1. Ultimo valore di ogni cella toccata dai delta in (da, a]
+        dopo: Dict[Tuple[str, str], object] = {}
+        aggiunti, rimossi = set(), set()
+        for delta in self.delta():
+            if delta["data"] <= da:
+                continue
+            if delta["data"] > a:
+                break
+            for col, cambi in delta["colonne"].items():
+                dopo.update(((k, col), v) for k, v in zip(cambi["chiavi"], cambi["valori"]))
+            for chiave in delta["aggiunti"]:
+                aggiunti.add(chiave)
+                rimossi.discard(chiave)
+            for chiave in delta["rimossi"]:
+                rimossi.add(chiave)
+                aggiunti.discard(chiave)
+                # Come in stato(): la rimozione azzera le celle, e un nuovo inserimento
+                # riporta solo i valori non nulli
+                dopo.update(((chiave, col), None) for col in self.colonne)
+
+        # 2. Valori a `da` delle sole celle toccate (e dei nomi da mostrare)
+        toccate = {k for k, _ in dopo} | aggiunti | rimossi
+        prima: Dict[Tuple[str, str], object] = {}
+        nomi: Dict[str, object] = {}
+        base = self.base()
+        for col in base["colonne"]:
+            for k, v in zip(base["chiavi"], base["valori"][col]):
+                if k in toccate:
+                    prima[k, col] = v
+                    if col == "Nome":
+                        nomi[k] = v
+        presenti_a_da = {k for k in base["chiavi"] if k in toccate}
+        for delta in self.delta():
+            if delta["data"] > da:
+                break
+            for col, cambi in delta["colonne"].items():
+                for k, v in zip(cambi["chiavi"], cambi["valori"]):
+                    if k in toccate:
+                        prima[k, col] = v
+                        if col == "Nome":
+                            nomi[k] = v
+            presenti_a_da.update(k for k in delta["aggiunti"] if k in toccate)
+            presenti_a_da.difference_update(delta["rimossi"])
+        for (k, col), v in dopo.items():
+            if col == "Nome" and v is not None:
+                nomi[k] = v
+
+        righe = []
+        for chiave in sorted(aggiunti - presenti_a_da, key=str):
+            righe.append((chiave, nomi.get(chiave), "+", None, None))
+        for chiave in sorted(rimossi & presenti_a_da, key=str):
+            righe.append((chiave, nomi.get(chiave), "-", None, None))
+        # Righe per colonna solo per chi è presente sia a `da` sia ad `a`:
+        # aggiunti e rimossi hanno già la loro riga "+" / "-"
+        for (chiave, col), valore in dopo.items():
+            precedente = prima.get((chiave, col))
+            if chiave not in presenti_a_da or chiave in rimossi or precedente == valore:
+                continue
+            righe.append((chiave, nomi.get(chiave), col, precedente, valore))
+        return pd.DataFrame(righe, columns=[self.chiave, "Nome", "colonna", "prima", "dopo"])
+
+    # --- scrittura ------------------------------------------------------------
+
+    def _prepara(self, df: pd.DataFrame) -> pd.DataFrame:
+        chiave = self.chiave
+        if chiave not in df.columns:
+            raise KeyError(f"Colonna chiave '{chiave}' assente nella tabella")
+        colonne = [c for c in self.colonne if c in df.columns]
+        mancanti = [c for c in self.colonne if c not in df.columns]
+        if mancanti:
+            logger.warning(f"Storico {self.cartella}: colonne assenti {mancanti} (valori a None)")
+        df = df.loc[df[chiave].notna(), [chiave] + colonne]
+        duplicati = df[chiave].duplicated()
+        if duplicati.any():
+            logger.warning(f"Storico {self.cartella}: {int(duplicati.sum())} chiavi duplicate ignorate")
+            df = df[~duplicati]
+        df = df.assign(**{c: None for c in mancanti})
+        # Chiavi come stringhe: JSON non distingue 4730 da "4730"
+        return df.assign(**{chiave: df[chiave].map(lambda v: str(_valore(v)))})
+
+    def registra(self, df: pd.DataFrame, data=None) -> dict:
+        """
+        Registra la tabella del giorno `data` (default oggi). Registrare di
+        nuovo l'ultima data la sostituisce; date precedenti non sono ammesse.
+        Restituisce il numero di celle cambiate per colonna.
+        """
+        data = _data(data if data is not None else date.today())
+        os.makedirs(self.cartella, exist_ok=True)
+
+        if not self.esiste() or (data == self.base()["data"] and not any(True for _ in self.delta())):
+            if self._colonne is None and not self.esiste():
+                raise ValueError("Colonne da tracciare non indicate")
+            self._scrivi_base(self._prepara(df), data)
+            return {"base": len(df)}
+
+        date_registrate = self.date()
+        if data < date_registrate[-1]:
+            raise ValueError(f"Data {data} precedente all'ultima registrata ({date_registrate[-1]})")
+        if data == date_registrate[-1]:
+            self._rimuovi_ultimo_delta()
+
+        df = self._prepara(df)
+        _, stato = self._stato_dict()
+        chiavi = df[self.chiave].tolist()
+        precedenti = next(iter(stato.values()))
+        nuove = set(chiavi)
+
+        delta = {"data": data, "colonne": {}, "aggiunti": [k for k in chiavi if k not in precedenti],
+                 "rimossi": [k for k in precedenti if k not in nuove]}
+        for col in self.colonne:
+            vecchi = stato[col]
+            cambi_chiavi, cambi_valori = [], []
+            for k, v in zip(chiavi, _valori(df[col])):
+                # I nuovi giocatori entrano con tutti i valori non nulli
+                if (k in vecchi and vecchi[k] != v) or (k not in vecchi and v is not None):
+                    cambi_chiavi.append(k)
+                    cambi_valori.append(v)
+            if cambi_chiavi:
+                delta["colonne"][col] = {"chiavi": cambi_chiavi, "valori": cambi_valori}
+
+        with open(self.delta_path, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(delta, ensure_ascii=False, separators=(",", ":")) + "\n")
+        riepilogo = {col: len(c["chiavi"]) for col, c in delta["colonne"].items()}
+        riepilogo.update(aggiunti=len(delta["aggiunti"]), rimossi=len(delta["rimossi"]))
+        return riepilogo
+
+    def _scrivi_base(self, df: pd.DataFrame, data: str):
+        chiave = df.columns[0]
+        base = {
+            "data": data,
+            "chiave": chiave,
+            "colonne": list(df.columns[1:]),
+            "chiavi": df[chiave].tolist(),
+            "valori": {col: _valori(df[col]) for col in df.columns[1:]},
+        }
+        tmp = f"{self.base_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(base, fp, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.base_path)
+        if os.path.exists(self.delta_path):
+            os.remove(self.delta_path)
+        self._base = base
+
+    def _rimuovi_ultimo_delta(self):
+        with open(self.delta_path, encoding="utf-8") as fp:
+            righe = [r for r in fp if r.strip()]
+        tmp = f"{self.delta_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            fp.writelines(righe[:-1])
+        os.replace(tmp, self.delta_path)
+
+    def dimensioni(self) -> dict:
+        """Byte occupati da base e delta, e celle cambiate in totale"""
+        celle = sum(len(c["chiavi"]) for d in self.delta() for c in d["colonne"].values())
+        return {
+            "base_byte": os.path.getsize(self.base_path) if self.esiste() else 0,
+            "delta_byte": os.path.getsize(self.delta_path) if os.path.exists(self.delta_path) else 0,
+            "celle_cambiate": celle,
+        }
+
+
+def storico_fonte(fonte: str, df: Optional[pd.DataFrame] = None) -> StoricoSnapshot:
+    """Storico di una fonte in config.STORICO_DIR; chiave Nome se la tabella non ha quella stabile"""
+    impostazioni = FONTI[fonte]
+    chiave = impostazioni["chiave"]
+    if df is not None and chiave not in df.columns:
+        chiave = "Nome"
+    colonne = ["Nome"] + [c for c in impostazioni["colonne"] if c != "Nome"]
+    return StoricoSnapshot(os.path.join(config.STORICO_DIR, fonte), chiave, colonne)
+
+
+def registra_fonte(fonte: str, df: pd.DataFrame, data=None) -> dict:
+    """Registra la tabella finale di una catena (chiamato da main.py)"""
+    storico = storico_fonte(fonte, df)
+    riepilogo = storico.registra(df, data)
+    logger.info(f"Storico {fonte} aggiornato: {riepilogo}")
+    return riepilogo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storico giornaliero dei giocatori")
+    comandi = parser.add_subparsers(dest="comando", required=True)
+    for nome in ("date", "stato", "diff", "registra"):
+        sub = comandi.add_parser(nome)
+        sub.add_argument("--fonte", choices=list(FONTI), required=True)
+        if nome == "stato":
+            sub.add_argument("--data", help="YYYY-MM-DD (default ultima)")
+            sub.add_argument("--output", help="salva in CSV invece di stampare")
+        elif nome == "diff":
+            sub.add_argument("--da", required=True)
+            sub.add_argument("--a", required=True)
+            sub.add_argument("--colonne", nargs="+", help="solo queste colonne")
+        elif nome == "registra":
+            sub.add_argument("--file", required=True, help="tabella di analisi (xlsx/csv/parquet/jsonl)")
+            sub.add_argument("--data", help="YYYY-MM-DD (default oggi)")
+    args = parser.parse_args()
+
+    if args.comando == "registra":
+        registra_fonte(args.fonte, leggi_tabella(args.file), args.data)
+        return
+
+    storico = storico_fonte(args.fonte)
+    if not storico.esiste():
+        parser.error(f"Nessuno storico per {args.fonte} in {storico.cartella}")
+
+    if args.comando == "date":
+        for data in storico.date():
+            print(data)
+        print(storico.dimensioni())
+    elif args.comando == "stato":
+        df = storico.stato(args.data)
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"Stato al {df.attrs['data']} ({len(df)} giocatori) salvato in {args.output}")
+        else:
+            print(f"Stato al {df.attrs['data']}")
+            print(df.to_string(index=False))
+    else:
+        diff = storico.differenze(args.da, args.a)
+        if args.colonne:
+            diff = diff[diff["colonna"].isin(args.colonne + ["+", "-"])]
+        print(diff.to_string(index=False) if not diff.empty else "Nessuna differenza")
+
+
+if __name__ == "__main__":
+    main()